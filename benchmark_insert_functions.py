@@ -0,0 +1,86 @@
+# This script times the data insert functions writing cell by cell against writing in bulk
+## run it from the repo folder with: python benchmark_insert_functions.py
+
+import io
+import time
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from formatting_functions_open_source import insert_data, insert_row_multiindex_data
+
+
+def make_benchmark_df(num_rows=50000, null_share=0.05, seed=0):
+
+    # This function will make a synthetic dataframe of mixed data types with some nulls sprinkled in
+
+    # ARGUMENTS
+
+    ## OPTIONAL:
+    ### num_rows is the number of rows in the dataframe. defaults to 50000
+    ### null_share is the share of cells in each column that are null. defaults to 0.05
+    ### seed is the random seed so every run uses the same data. defaults to 0
+
+    rng = np.random.default_rng(seed)
+
+    df = pd.DataFrame({
+        'Region': rng.choice(['North','South','East','West'], num_rows),
+        'Store': rng.integers(1, 251, num_rows),
+        'Units': rng.integers(0, 5000, num_rows).astype(float),
+        'Revenue': rng.normal(25000, 8000, num_rows),
+        'Margin': rng.random(num_rows),
+        'Order Date': pd.date_range('2020-01-01', periods=num_rows, freq='h'),
+        'Notes': rng.choice(['ok','late','returned','damaged'], num_rows),
+    })
+
+    # blank out a share of each numeric column
+    for col in ['Units','Revenue','Margin']:
+        df.loc[rng.random(num_rows) < null_share, col] = np.nan
+
+    return df.sort_values(['Region','Store']).set_index(['Region','Store'])
+
+
+def time_insert(insert_function, df, repeats=3, **kwargs):
+
+    # This function will return the best time in seconds of writing df to an in memory workbook with insert_function
+
+    # ARGUMENTS
+
+    ## MANDATORY:
+    ### insert_function is the insert function to time
+    ### df is your data from your dataframe
+
+    ## OPTIONAL:
+    ### repeats is how many times to run the insert. defaults to 3
+    ### kwargs are passed on to insert_function
+
+    times = []
+
+    for _ in range(repeats):
+        # the workbook is written to memory so disk speed does not affect the timing
+        wb = xlsxwriter.Workbook(io.BytesIO(), {'in_memory': True})
+        sheet = wb.add_worksheet()
+        start = time.perf_counter()
+        insert_function(df, wb, sheet, **kwargs)
+        times.append(time.perf_counter() - start)
+        wb.close()
+
+    return min(times)
+
+
+if __name__ == '__main__':
+
+    df = make_benchmark_df()
+    # insert_row_multiindex_data needs the same number of rows per major index category
+    mi_df = df.groupby(level=[0,1]).head(40).groupby(level=0).head(8000)
+
+    print(f"insert_data: {df.shape[0]:,} rows x {df.shape[1]} columns")
+    for bulk_write in [False, True]:
+        seconds = time_insert(insert_data, df, bulk_write=bulk_write)
+        print(f"    bulk_write={bulk_write}: {seconds:.3f}s")
+
+    print(f"insert_row_multiindex_data: {mi_df.shape[0]:,} rows x {mi_df.shape[1]} columns")
+    for bulk_write in [False, True]:
+        seconds = time_insert(insert_row_multiindex_data, mi_df, bulk_write=bulk_write)
+        print(f"    bulk_write={bulk_write}: {seconds:.3f}s")
@@ -8,7 +8,7 @@ from textwrap import wrap
 
 
 def format_header(df, wb, sheet,  header_bgcolor = '#002387', header_fontcolor = '#FFFFFF', index_bgcolor =  '#002387', \
-index_fontcolor = '#FFFFFF', header_offset=0, column_offset=0, clean_header=False, text_wrap=False):
+index_fontcolor = '#FFFFFF', header_offset=0, column_offset=0, clean_header=False, text_wrap=False, layout=None):
 
     # This function will apply formatting to your header row    
     ## Index is same color as normal column headers, but this can be changed if desired w/ index_color optional args
@@ -32,24 +32,26 @@ index_fontcolor = '#FFFFFF', header_offset=0, column_offset=0, clean_header=Fals
     ### clean_header will give your columns title format names (ex: Birth Date) instead of underscore (birth_date)
     ###     or CamelCase (BirthDate)
     ### text_wrap will wrap the column header labels 
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
     
-    from utility_functions import clean_header_string
+    from utility_functions import clean_header_string, get_format, get_table_layout
 
     # getting count of number of row indices to set range for index formatting
     
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     # create format templates
     if text_wrap == True:
-        header_format = wb.add_format({'bold':True,'bg_color':header_bgcolor,'font_color':header_fontcolor,'align':'center',\
+        header_format = get_format(wb, {'bold':True,'bg_color':header_bgcolor,'font_color':header_fontcolor,'align':'center',\
         'bottom':True, 'text_wrap':True, 'valign':'vcenter'})
     else:
-        header_format = wb.add_format({'bold':True,'bg_color':header_bgcolor,'font_color':header_fontcolor,'align':'center',\
+        header_format = get_format(wb, {'bold':True,'bg_color':header_bgcolor,'font_color':header_fontcolor,'align':'center',\
             'bottom':True})
 
     # optional clean header labels
@@ -91,30 +93,23 @@ index_fontcolor = '#FFFFFF', header_offset=0, column_offset=0, clean_header=Fals
         # else raise an error message that an incorrect argument has been given
         raise ValueError(f"{clean_header} is not a valid clean_header option. Valid arguments are True, False.")         
 
-     
-    ## the header_format template is applied in the first row for all columns, which also keeps the value from the df header row
-    ## the for loop goes over all columns. this prevents the formatting being applied to empty cells
-    ### using enumerate and calling values will extract the column value (in this case, column header)
-    for col_num, value in enumerate(df.columns.values):
-        # normal header formatting is applied to all header columns
-        ## col_num + num_row_indices here is so that formatting is applied to the column headers only
-        ## fixed_col_names[col_num] will retrieve the correct name based on its position in the list
-        sheet.write(header_offset, col_num + num_row_indices + column_offset, fixed_col_names[col_num], header_format)
 
-    # the header loop cannot be applied to the index, so formatting is manually applied by overwriting the cell 
+    # the header loop cannot be applied to the index, so formatting is manually applied to the index cells
     ## also allowing me to add R border to the rightmost index only
+    ## the index cells are written before the column headers so the header row is filled left to right, which keeps
+    ## this function usable on constant_memory worksheets
 
     if text_wrap == True:
-        index_format = wb.add_format({'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left','bottom':True,\
+        index_format = get_format(wb, {'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left','bottom':True,\
             'right':True,'text_wrap':True, 'valign':'vcenter'}) 
         # the index headers to the left lack the right border
-        index_left_format = wb.add_format({'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
+        index_left_format = get_format(wb, {'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
             'bottom':True,'text_wrap':True, 'valign':'vcenter'})
     else:
-        index_format = wb.add_format({'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left','bottom':True,\
+        index_format = get_format(wb, {'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left','bottom':True,\
             'right':True}) 
         # the index headers to the left lack the right border
-        index_left_format = wb.add_format({'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
+        index_left_format = get_format(wb, {'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
             'bottom':True})
 
     # iterating over the number of row indices present:
@@ -130,11 +125,20 @@ index_fontcolor = '#FFFFFF', header_offset=0, column_offset=0, clean_header=Fals
             # else insert the index name and apply no right border index format
             sheet.write(header_offset, col_num + column_offset, fixed_index_names[col_num], index_left_format)
 
+    ## the header_format template is applied in the first row for all columns, which also keeps the value from the df header row
+    ## the for loop goes over all columns. this prevents the formatting being applied to empty cells
+    ### using enumerate and calling values will extract the column value (in this case, column header)
+    for col_num, value in enumerate(df.columns.values):
+        # normal header formatting is applied to all header columns
+        ## col_num + num_row_indices here is so that formatting is applied to the column headers only
+        ## fixed_col_names[col_num] will retrieve the correct name based on its position in the list
+        sheet.write(header_offset, col_num + num_row_indices + column_offset, fixed_col_names[col_num], header_format)
+
 
 
 def last_col_highlight_header(df, wb, sheet, header_bgcolor = '#002387', header_fontcolor = '#FFFFFF',\
     hilite_bgcolor = '#00A111', hilite_fontcolor = '#FFFFFF', index_bgcolor = '#002387', index_fontcolor = '#FFFFFF', \
-    header_offset=0, column_offset=0, clean_header=False, text_wrap=False):
+    header_offset=0, column_offset=0, clean_header=False, text_wrap=False, layout=None):
 
     # This function will apply formatting to your headers that will automatically apply a different color to your last column to highlight it
     ## This is especially useful for time series: highlighting most recent year etc
@@ -161,8 +165,10 @@ def last_col_highlight_header(df, wb, sheet, header_bgcolor = '#002387', header_
     ### clean_header will give your columns title format names (ex: Birth Date) instead of underscore (birth_date) 
     ###      or CamelCase (BirthDate)
     ### text_wrap will wrap the column header labels
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
-    from utility_functions import clean_header_string
+    from utility_functions import clean_header_string, get_format, get_table_layout
     
     # getting column count of the data to use to set upper bound for formatting
     ## the len function provides the length of objects--in this case, the list of columns
@@ -170,12 +176,12 @@ def last_col_highlight_header(df, wb, sheet, header_bgcolor = '#002387', header_
 
     # getting count of number of row indices to set range for index formatting
     
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     # optional clean header labels
 
@@ -220,14 +226,14 @@ def last_col_highlight_header(df, wb, sheet, header_bgcolor = '#002387', header_
     # create format templates
 
     if text_wrap == True:
-        header_format = wb.add_format({'bold':True,'bg_color':header_bgcolor,'font_color':header_fontcolor,'align':'center',\
+        header_format = get_format(wb, {'bold':True,'bg_color':header_bgcolor,'font_color':header_fontcolor,'align':'center',\
             'bottom':True,'text_wrap':True,'valign':'vcenter'})
-        last_col_format = wb.add_format({'bold':True,'bg_color':hilite_bgcolor,'font_color':hilite_fontcolor,'align':'center',\
+        last_col_format = get_format(wb, {'bold':True,'bg_color':hilite_bgcolor,'font_color':hilite_fontcolor,'align':'center',\
             'bottom':True,'text_wrap':True,'valign':'vcenter'})    
     else:
-        header_format = wb.add_format({'bold':True,'bg_color':header_bgcolor,'font_color':header_fontcolor,'align':'center',\
+        header_format = get_format(wb, {'bold':True,'bg_color':header_bgcolor,'font_color':header_fontcolor,'align':'center',\
             'bottom':True})
-        last_col_format = wb.add_format({'bold':True,'bg_color':hilite_bgcolor,'font_color':hilite_fontcolor,'align':'center',\
+        last_col_format = get_format(wb, {'bold':True,'bg_color':hilite_bgcolor,'font_color':hilite_fontcolor,'align':'center',\
             'bottom':True})
 
     ## the header_format template is applied in the first row for all columns, which also keeps the value from the df header row
@@ -251,16 +257,16 @@ def last_col_highlight_header(df, wb, sheet, header_bgcolor = '#002387', header_
     ## also allowing me to add R border to the rightmost index only
     
     if text_wrap == True:
-        index_format = wb.add_format({'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
+        index_format = get_format(wb, {'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
             'bottom':True,'right':True,'text_wrap':True,'valign':'vcenter'}) 
         # the index headers to the left lack the right border
-        index_left_format = wb.add_format({'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
+        index_left_format = get_format(wb, {'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
             'bottom':True,'text_wrap':True,'valign':'vcenter'})
     else:    
-        index_format = wb.add_format({'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
+        index_format = get_format(wb, {'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
             'bottom':True,'right':True}) 
         # the index headers to the left lack the right border
-        index_left_format = wb.add_format({'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
+        index_left_format = get_format(wb, {'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'align':'left',\
             'bottom':True})
 
     # iterating over the number of row indices present:
@@ -276,15 +282,16 @@ def last_col_highlight_header(df, wb, sheet, header_bgcolor = '#002387', header_
             # else insert the index name and apply no right border index format
             sheet.write(header_offset, col_num + column_offset, fixed_index_names[col_num], index_left_format)
 
-###                 ANY NUMBER ROW INDICES AND TWO LEVEL COLUMN MULITINDEX DATAFRAMES                 ###
+###                 ANY NUMBER ROW INDICES AND TWO OR MORE LEVEL COLUMN MULITINDEX DATAFRAMES                 ###
 
 def format_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002387', header1_fontcolor = '#FFFFFF', \
     header2_bgcolor = '#137A78', header2_fontcolor = '#FFFFFF', index1_bgcolor =  '#002387', index2_bgcolor = '#137A78', \
-    index2_fontcolor = '#FFFFFF', header_offset=0, column_offset=0, clean_header=False, merge_cells=False, text_wrap=False):
+    index2_fontcolor = '#FFFFFF', header_offset=0, column_offset=0, clean_header=False, merge_cells=False, text_wrap=False, \
+    layout=None, center_across=False, sparse_labels=False):
 
      # This function will apply formatting to your header rows    
     ## Index is same color as normal column headers, but this can be changed if desired w/ index_color optional args
-    ### Meant only for dataframes with any number of row indices and two header rows (2 level column multiindex) 
+    ### Meant only for dataframes with any number of row indices and two or more header rows (column multiindex) 
 
     # ARGUMENTS
     
@@ -305,11 +312,19 @@ def format_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002387', header
     ### header_offset is the number of rows to skip if you want blank rows on top for title etc. defaults to 0
     ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
     ### clean_header will give your columns title format names (ex: Birth Date) instead of underscore (birth_date) or CamelCase (BirthDate)
-    ### merge_cells will merge the cells of the first header row
+    ### merge_cells will merge the cells of each run of the same label in the header rows above the last one
     ####    this MUST be used if you are not using to_excel to import data!
-    ### text_wrap will wrap the column header labels for the second header row
-    
-    from utility_functions import clean_header_string, return_divisible_ints
+    ### text_wrap will wrap the column header labels for the last header row
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+    ### center_across will center each label across its run of columns with a 'center_across' format instead of merging the
+    ###     cells. used with merge_cells=True. the label is written once and no merged ranges are made, which keeps large
+    ###     headers fast to write and open. defaults to False
+    ### sparse_labels will write each label of the header rows above the last one only in the first column of its run when
+    ###     merge_cells is False, and give the rest of the run the format with no value. defaults to False, which writes
+    ###     the label in every column of the run
+    
+    from utility_functions import clean_header_string, get_format, get_table_layout, write_header_runs
 
     # raise an error if the header_offset input is not valid
     if isinstance(header_offset, int) == False:
@@ -339,71 +354,81 @@ def format_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002387', header
     else:
         raise ValueError(f"{text_wrap} is not a valid text_wrap option. Valid arguments are True, False.")
 
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1  
+    # raise an error if the center_across input is not valid    
+    if center_across == True:
+        pass
+    elif center_across == False:
+        pass
+    else:
+        raise ValueError(f"{center_across} is not a valid center_across option. Valid arguments are True, False.")
 
-    # error if there are not 2 column header rows
-    if num_col_indices == 2:
+    # raise an error if the sparse_labels input is not valid    
+    if sparse_labels == True:
+        pass
+    elif sparse_labels == False:
+        pass
+    else:
+        raise ValueError(f"{sparse_labels} is not a valid sparse_labels option. Valid arguments are True, False.")
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
+
+    # error if there are not at least 2 column header rows
+    if num_col_indices >= 2:
         pass 
     else:
-        raise Exception(f"Function is only meant for datasets with two header rows. \
+        raise Exception(f"Function is only meant for datasets with two or more header rows. \
             The number of header rows your data has is {num_col_indices}.")
 
     # getting count of number of row indices to set range for index formatting
     
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     # create format templates
-    ## the 'last' format templates apply a right border to the last column of the second header row before the columns start repeating again
+    ## the 'last' format templates apply a right border to the last column of the last header row before the columns start repeating again
     ## and to the last index column before the data columns start
 
-    header1_format = wb.add_format({'bold':True,'bg_color':header1_bgcolor,'font_color':header1_fontcolor,'align':'center',\
-        'right':True})
+    ## the header rows above the last one are given as format properties so each run can be merged or centered across
+    header1_properties = {'bold':True,'bg_color':header1_bgcolor,'font_color':header1_fontcolor,'align':'center','right':True}
     
     if text_wrap == True:
-        header2_format = wb.add_format({'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
+        header2_format = get_format(wb, {'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
             'bottom':True, 'text_wrap':True,'valign':'vcenter'})
-        header2_last_format = wb.add_format({'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
+        header2_last_format = get_format(wb, {'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
             'bottom':True, 'right':True, 'text_wrap':True,'valign':'vcenter'})
     else: 
-        header2_format = wb.add_format({'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
+        header2_format = get_format(wb, {'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
             'bottom':True})
-        header2_last_format = wb.add_format({'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
+        header2_last_format = get_format(wb, {'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
             'bottom':True, 'right':True})
   
-    index1_format = wb.add_format({'bg_color':index1_bgcolor})
-    index1_last_format = wb.add_format({'bg_color':index1_bgcolor,'right':True})
+    index1_format = get_format(wb, {'bg_color':index1_bgcolor})
+    index1_last_format = get_format(wb, {'bg_color':index1_bgcolor,'right':True})
 
     if text_wrap == True:
-        index2_format = wb.add_format({'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'bottom':True,\
+        index2_format = get_format(wb, {'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'bottom':True,\
             'valign':'vcenter','text_wrap':True})
-        index2_last_format = wb.add_format({'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'right':True,\
+        index2_last_format = get_format(wb, {'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'right':True,\
             'bottom':True,'valign':'vcenter','text_wrap':True})
     else:
-        index2_format = wb.add_format({'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'bottom':True,\
+        index2_format = get_format(wb, {'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'bottom':True,\
             'valign':'vcenter'})
-        index2_last_format = wb.add_format({'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'right':True,\
+        index2_last_format = get_format(wb, {'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'right':True,\
             'bottom':True,'valign':'vcenter'})
 
     # optional clean header labels
     
     # if clean_header option is enabled:
     if clean_header == True:
-        # create a list of column names
-        col_list1 = [col_name for col_name in df.columns.get_level_values(0).unique()]
-        col_list2 = [col_name for col_name in df.columns.get_level_values(1)]
-        # iterate through col_names and apply clean_header_string function
-        fixed_col_names1 = [clean_header_string(col_name) for col_name in col_list1]
-        fixed_col_names2 = [clean_header_string(col_name) for col_name in col_list2]
+        # create a list of cleaned column names for each header row
+        ## every column keeps its own label so the labels line up with the column numbers
+        fixed_col_names = [[clean_header_string(col_name) for col_name in df.columns.get_level_values(level)] \
+            for level in range(num_col_indices)]
         # if there are no row indices:
         if num_row_indices == 0:
             # skip this step
@@ -418,9 +443,8 @@ def format_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002387', header
             fixed_index_names =  [clean_header_string(name) for name in df.index.names]
     # if clean_header is false:
     elif clean_header == False:
-        # have a list of the regular col names
-        fixed_col_names1 = [col_name for col_name in df.columns.get_level_values(0)]
-        fixed_col_names2 = [col_name for col_name in df.columns.get_level_values(1)]
+        # have a list of the regular col names for each header row
+        fixed_col_names = [[col_name for col_name in df.columns.get_level_values(level)] for level in range(num_col_indices)]
         # if there are no row indices:
         if num_row_indices == 0: 
             # skip this step
@@ -438,61 +462,48 @@ def format_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002387', header
 
     # get values to use in formatting
 
-    ## number of header row 1 values
-    header1_n = df.columns.levshape[0]
-    ## number of header row 2 values
-    header2_n = df.columns.levshape[1]
-    ## total number of data columns
-    total_columns = header1_n * header2_n
-    ## number of cells that need to be merged for header one if merge_cells = True
-    cells_to_merge = header2_n - 1 
+    ## the last column of each run of the same header row 1 value
+    ### header row 1 values can have different numbers of columns under them
+    column_group_ends = layout.column_group_ends[0].tolist()
+    ## the row of the last header row
+    last_header_row = header_offset + num_col_indices - 1
      
-    # merge cells for first row of headers
+    # check the merge_cells option against the table placement
     if merge_cells == True:    
-        # get the columns each cell needs to start the merge on by getting divisible numbers between 0 and the number of columns
-        ## divided by the number of header row 2 values
-        merge_cols = return_divisible_ints(0, total_columns, header2_n)
-        # drop the last (and extra) value
-        merge_cols.pop()
-
-        # iterating through our list of merge col numbers:
-        for col_num in merge_cols:
-            # merge the starting column to start column + cells to merge cells together on the first header row
-            sheet.merge_range(header_offset, col_num + num_row_indices + column_offset, header_offset, \
-                col_num + num_row_indices + column_offset + cells_to_merge,'-')
+        pass
     elif header_offset != 0:
         # raise an error if the header_offset option is enabled but cells are not being merged
-        raise Exception(f"Cells will needs to be merged if header_offset does not equal 0. Current header_offset = {header_offset}. Data cannot be imported with to_excel.")
+        raise Exception(f"Cells will needs to be merged if header_offset does not equal 0. \
+            Current header_offset = {header_offset}. Data cannot be imported with to_excel.")
     elif num_row_indices != 0:
-        # else if there is a row index hide the extra row that will contain its label (when importing with to_excel())
-        sheet.set_row(2,options={'hidden':True})
-        print('Third row of Excel hidden to hide extra row index label when importing with to_excel.\
+        # else if there is a row index hide the extra row under the headers that will contain its label (when importing with to_excel())
+        sheet.set_row(num_col_indices, options={'hidden':True})
+        print(f'Row {num_col_indices + 1} of Excel hidden to hide extra row index label when importing with to_excel.\
             If data has not been imported with to_excel, rerun code with merge_cells=True in this function.')
     else:
         # else do nothing
         pass
     
-    # formatting first header row
+    # formatting the header rows above the last one
 
-    # iterating though the columns
-    for col_num, value in enumerate(df.columns.values):
-        # insert col name and apply header1 format
-        sheet.write(header_offset, col_num + num_row_indices + column_offset, fixed_col_names1[col_num], header1_format)
+    # iterating through the upper header rows:
+    for level in range(num_col_indices - 1):
+        # get the runs of columns with the same label in the header row
+        run_starts, run_lengths = layout.column_runs[level]
+        # write each label over its run of columns
+        write_header_runs(wb, sheet, header_offset + level, num_row_indices + column_offset, fixed_col_names[level], \
+            run_starts, run_lengths, header1_properties, merge_cells, center_across, sparse_labels)
 
-    
-    # formatting second header row
+    # formatting last header row
     ## interating through the columns:
-    for col_num, value in enumerate(df.columns.values):
-        # if the remainder of the col_num divided by the count of how many values there are = 0:
-        ## the last column per header1 category will always have a remainder 0
-        if (col_num + 1)%header2_n == 0:
+    for col_num in range(len(df.columns)):
+        # if it is the last column per header1 category:
+        if column_group_ends[col_num]:
             # apply header2_last_format and insert col name value
-            ## header_offset + 1 to not overwrite header1
-            sheet.write(header_offset + 1, col_num + num_row_indices + column_offset, fixed_col_names2[col_num], header2_last_format)
+            sheet.write(last_header_row, col_num + num_row_indices + column_offset, fixed_col_names[-1][col_num], header2_last_format)
         else:
             # else apply regular header2_format
-            ## header_offset + 1 to not overwrite header1
-            sheet.write(header_offset + 1, col_num + num_row_indices + column_offset, fixed_col_names2[col_num], header2_format)
+            sheet.write(last_header_row, col_num + num_row_indices + column_offset, fixed_col_names[-1][col_num], header2_format)
 
     # index formatting
 
@@ -500,26 +511,29 @@ def format_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002387', header
     for col_num in range(num_row_indices):
         # if the index is the last index in the range:
         if col_num == max(range(num_row_indices)):
-            # insert the index name and apply the right border index format
+            # apply the right border index format to the upper header rows
+            for level in range(num_col_indices - 1):
+                sheet.write(header_offset + level, col_num + column_offset, "", index1_last_format)
+            # insert the index name on the last header row
             ## fixed_index_names[col_num] will retrieve the correct name based on its position in the list
-            sheet.write(header_offset, col_num + column_offset, "", index1_last_format)
-            ## header_offset + 1 to not overwrite index1
-            sheet.write(header_offset + 1, col_num + column_offset, fixed_index_names[col_num], index2_last_format)
+            sheet.write(last_header_row, col_num + column_offset, fixed_index_names[col_num], index2_last_format)
         else:
-            # else insert the index name and apply no right border index format
-            sheet.write(header_offset, col_num + column_offset, "", index1_format)
-            ## header_offset + 1 to not overwrite index1
-            sheet.write(header_offset + 1, col_num + column_offset, fixed_index_names[col_num], index2_format)
+            # else apply no right border index format to the upper header rows
+            for level in range(num_col_indices - 1):
+                sheet.write(header_offset + level, col_num + column_offset, "", index1_format)
+            # insert the index name on the last header row
+            sheet.write(last_header_row, col_num + column_offset, fixed_index_names[col_num], index2_format)
 
 
 def last_col_highlight_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002387', header1_fontcolor = '#FFFFFF', \
     header1_bghilite = '#00A111', header1_fonthilite = '#FFFFFF', header2_bgcolor = '#137A78', header2_fontcolor = '#FFFFFF',\
     index1_bgcolor =  '#002387', index2_bgcolor = '#137A78', index2_fontcolor = '#FFFFFF', \
-    header_offset=0, column_offset=0, clean_header=False, merge_cells=False, text_wrap=False):
+    header_offset=0, column_offset=0, clean_header=False, merge_cells=False, text_wrap=False, \
+    layout=None, center_across=False, sparse_labels=False):
 
      # This function will apply formatting to your header rows and highlight the last cell of your first header row  
     ## Index is same color as normal column headers, but this can be changed if desired w/ index_color optional args
-    ### Meant only for dataframes with any number of row indices and two header rows (2 level column multiindex) 
+    ### Meant only for dataframes with any number of row indices and two or more header rows (column multiindex) 
 
     # ARGUMENTS
     
@@ -542,11 +556,19 @@ def last_col_highlight_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002
     ### header_offset is the number of rows to skip if you want blank rows on top for title etc. defaults to 0
     ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
     ### clean_header will give your columns title format names (ex: Birth Date) instead of underscore (birth_date) or CamelCase (BirthDate)
-    ### merge_cells will merge the cells of the first header row
+    ### merge_cells will merge the cells of each run of the same label in the header rows above the last one
     ####    this MUST be used if you are not using to_excel to import data!
-    ### text_wrap will wrap the column header labels for the second header row
-    
-    from utility_functions import clean_header_string, return_divisible_ints
+    ### text_wrap will wrap the column header labels for the last header row
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+    ### center_across will center each label across its run of columns with a 'center_across' format instead of merging the
+    ###     cells. used with merge_cells=True. the label is written once and no merged ranges are made, which keeps large
+    ###     headers fast to write and open. defaults to False
+    ### sparse_labels will write each label of the header rows above the last one only in the first column of its run when
+    ###     merge_cells is False, and give the rest of the run the format with no value. defaults to False, which writes
+    ###     the label in every column of the run
+    
+    from utility_functions import clean_header_string, get_format, get_table_layout, write_header_runs
 
     # raise an error if the header_offset input is not valid
     if isinstance(header_offset, int) == False:
@@ -576,74 +598,83 @@ def last_col_highlight_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002
     else:
         raise ValueError(f"{text_wrap} is not a valid text_wrap option. Valid arguments are True, False.")
 
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1  
+    # raise an error if the center_across input is not valid    
+    if center_across == True:
+        pass
+    elif center_across == False:
+        pass
+    else:
+        raise ValueError(f"{center_across} is not a valid center_across option. Valid arguments are True, False.")
+
+    # raise an error if the sparse_labels input is not valid    
+    if sparse_labels == True:
+        pass
+    elif sparse_labels == False:
+        pass
+    else:
+        raise ValueError(f"{sparse_labels} is not a valid sparse_labels option. Valid arguments are True, False.")
 
-    # error if there are not 2 column header rows
-    if num_col_indices == 2:
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
+
+    # error if there are not at least 2 column header rows
+    if num_col_indices >= 2:
         pass 
     else:
-        raise Exception(f"Function is only meant for datasets with two header rows. \
+        raise Exception(f"Function is only meant for datasets with two or more header rows. \
             The number of header rows your data has is {num_col_indices}.")
 
     # getting count of number of row indices to set range for index formatting
     
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     # create format templates
-    ## the 'last' format templates apply a right border to the last column of the second header row before the columns 
+    ## the 'last' format templates apply a right border to the last column of the last header row before the columns 
     ## start repeating again
     ## and to the last index column before the data columns start
 
-    header1_format = wb.add_format({'bold':True,'bg_color':header1_bgcolor,'font_color':header1_fontcolor,'align':'center',\
-        'right':True})
-    header1_last_format = wb.add_format({'bold':True,'bg_color':header1_bghilite,'font_color':header1_fonthilite,'align':'center',\
-        'right':True})
+    ## the header rows above the last one are given as format properties so each run can be merged or centered across
+    header1_properties = {'bold':True,'bg_color':header1_bgcolor,'font_color':header1_fontcolor,'align':'center','right':True}
+    header1_last_properties = {'bold':True,'bg_color':header1_bghilite,'font_color':header1_fonthilite,'align':'center','right':True}
     
     if text_wrap == True:
-        header2_format = wb.add_format({'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
+        header2_format = get_format(wb, {'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
             'bottom':True, 'text_wrap':True,'valign':'vcenter'})
-        header2_last_format = wb.add_format({'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
+        header2_last_format = get_format(wb, {'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
             'bottom':True, 'right':True, 'text_wrap':True,'valign':'vcenter'})
     else: 
-        header2_format = wb.add_format({'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
+        header2_format = get_format(wb, {'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
             'bottom':True})
-        header2_last_format = wb.add_format({'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
+        header2_last_format = get_format(wb, {'bold':True,'bg_color':header2_bgcolor,'font_color':header2_fontcolor,'align':'center',\
             'bottom':True, 'right':True})
   
-    index1_format = wb.add_format({'bg_color':index1_bgcolor})
-    index1_last_format = wb.add_format({'bg_color':index1_bgcolor,'right':True})
+    index1_format = get_format(wb, {'bg_color':index1_bgcolor})
+    index1_last_format = get_format(wb, {'bg_color':index1_bgcolor,'right':True})
     
     if text_wrap==True:
-        index2_format = wb.add_format({'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'bottom':True,\
+        index2_format = get_format(wb, {'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'bottom':True,\
             'valign':'vcenter','text_wrap':True})
-        index2_last_format = wb.add_format({'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'right':True,\
+        index2_last_format = get_format(wb, {'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'right':True,\
             'bottom':True,'valign':'vcenter','text_wrap':True})
     else:
-        index2_format = wb.add_format({'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'bottom':True,\
+        index2_format = get_format(wb, {'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'bottom':True,\
             'valign':'vcenter'})
-        index2_last_format = wb.add_format({'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'right':True,\
+        index2_last_format = get_format(wb, {'bold':True,'bg_color':index2_bgcolor,'font_color':index2_fontcolor,'right':True,\
             'bottom':True,'valign':'vcenter'})
 
     # optional clean header labels
     
     # if clean_header option is enabled:
     if clean_header == True:
-        # create a list of column names
-        col_list1 = [col_name for col_name in df.columns.get_level_values(0).unique()]
-        col_list2 = [col_name for col_name in df.columns.get_level_values(1)]
-        # iterate through col_names and apply clean_header_string function
-        fixed_col_names1 = [clean_header_string(col_name) for col_name in col_list1]
-        fixed_col_names2 = [clean_header_string(col_name) for col_name in col_list2]
+        # create a list of cleaned column names for each header row
+        ## every column keeps its own label so the labels line up with the column numbers
+        fixed_col_names = [[clean_header_string(col_name) for col_name in df.columns.get_level_values(level)] \
+            for level in range(num_col_indices)]
         # if there are no row indices:
         if num_row_indices == 0:
             # skip this step
@@ -658,9 +689,8 @@ def last_col_highlight_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002
             fixed_index_names =  [clean_header_string(name) for name in df.index.names]
     # if clean_header is false:
     elif clean_header == False:
-        # have a list of the regular col names
-        fixed_col_names1 = [col_name for col_name in df.columns.get_level_values(0)]
-        fixed_col_names2 = [col_name for col_name in df.columns.get_level_values(1)]
+        # have a list of the regular col names for each header row
+        fixed_col_names = [[col_name for col_name in df.columns.get_level_values(level)] for level in range(num_col_indices)]
         # if there are no row indices:
         if num_row_indices == 0: 
             # skip this step
@@ -678,68 +708,55 @@ def last_col_highlight_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002
 
     # get values to use in formatting
 
-    ## number of header row 1 values
-    header1_n = df.columns.levshape[0]
-    ## number of header row 2 values
-    header2_n = df.columns.levshape[1]
-    ## total number of data columns
-    total_columns = header1_n * header2_n
-    ## number of cells that need to be merged for header one if merge_cells = True
-    cells_to_merge = header2_n - 1 
-    ## get the number of the column that is the first column of the last level
-    ### we will need this to reference the latest time period
-    first_last_level = total_columns - (header2_n - 1)
+    ## the last column of each run of the same header row 1 value
+    ### header row 1 values can have different numbers of columns under them
+    column_group_ends = layout.column_group_ends[0].tolist()
+    ## the format for each run of header row 1 values, with the last run (the latest time period) highlighted
+    header1_run_properties = [header1_properties] * (len(layout.column_runs[0][0]) - 1) + [header1_last_properties]
+    ## the row of the last header row
+    last_header_row = header_offset + num_col_indices - 1
      
-    # merge cells for first row of headers
+    # check the merge_cells option against the table placement
     if merge_cells == True:    
-        # get the columns each cell needs to start the merge on by getting divisible numbers between 0 and the number of columns
-        ## divided by the number of header row 2 values
-        merge_cols = return_divisible_ints(0, total_columns, header2_n)
-        # drop the last (and extra) value
-        merge_cols.pop()
-
-        # iterating through our list of merge col numbers:
-        for col_num in merge_cols:
-            # merge the starting column to start column + cells to merge cells together on the first header row
-            sheet.merge_range(header_offset, col_num + num_row_indices + column_offset, header_offset, \
-                col_num + num_row_indices + column_offset + cells_to_merge,'-')
+        pass
     elif header_offset != 0:
         # raise an error if the header_offset option is enabled but cells are not being merged
         raise Exception(f"Cells will needs to be merged if header_offset does not equal 0. \
             Current header_offset = {header_offset}. Data cannot be imported with to_excel.")
     elif num_row_indices != 0:
-        # else if there is a row index hide the extra row that will contain its label (when importing with to_excel())
-        sheet.set_row(2,options={'hidden':True})
-        print('Third row of Excel hidden to hide extra row index label when importing with to_excel.\
+        # else if there is a row index hide the extra row under the headers that will contain its label (when importing with to_excel())
+        sheet.set_row(num_col_indices, options={'hidden':True})
+        print(f'Row {num_col_indices + 1} of Excel hidden to hide extra row index label when importing with to_excel.\
             If data has not been imported with to_excel, rerun code with merge_cells=True in this function.')
     else:
         # else do nothing
         pass
     
-    # formatting first header row
+    # formatting the header rows above the last one
 
-    # iterating though the columns
-    for col_num, value in enumerate(df.columns.values):
-        if col_num + 1 == first_last_level:
-            sheet.write(header_offset, col_num + num_row_indices + column_offset, fixed_col_names1[col_num], header1_last_format)
+    # iterating through the upper header rows:
+    for level in range(num_col_indices - 1):
+        # get the runs of columns with the same label in the header row
+        run_starts, run_lengths = layout.column_runs[level]
+        # highlight the last run of the first header row
+        if level == 0:
+            run_properties = header1_run_properties
         else:
-            # insert col name and apply header1 format
-            sheet.write(header_offset, col_num + num_row_indices + column_offset, fixed_col_names1[col_num], header1_format)
+            run_properties = header1_properties
+        # write each label over its run of columns
+        write_header_runs(wb, sheet, header_offset + level, num_row_indices + column_offset, fixed_col_names[level], \
+            run_starts, run_lengths, run_properties, merge_cells, center_across, sparse_labels)
 
-    
-    # formatting second header row
+    # formatting last header row
     ## interating through the columns:
-    for col_num, value in enumerate(df.columns.values):
-        # if the remainder of the col_num divided by the count of how many values there are = 0:
-        ## the last column per header1 category will always have a remainder 0
-        if (col_num + 1)%header2_n == 0:
+    for col_num in range(len(df.columns)):
+        # if it is the last column per header1 category:
+        if column_group_ends[col_num]:
             # apply header2_last_format and insert col name value
-            ## header_offset + 1 to not overwrite header1
-            sheet.write(header_offset + 1, col_num + num_row_indices + column_offset, fixed_col_names2[col_num], header2_last_format)
+            sheet.write(last_header_row, col_num + num_row_indices + column_offset, fixed_col_names[-1][col_num], header2_last_format)
         else:
             # else apply regular header2_format
-            ## header_offset + 1 to not overwrite header1
-            sheet.write(header_offset + 1, col_num + num_row_indices + column_offset, fixed_col_names2[col_num], header2_format)
+            sheet.write(last_header_row, col_num + num_row_indices + column_offset, fixed_col_names[-1][col_num], header2_format)
 
     # index formatting
 
@@ -747,16 +764,18 @@ def last_col_highlight_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002
     for col_num in range(num_row_indices):
         # if the index is the last index in the range:
         if col_num == max(range(num_row_indices)):
-            # insert the index name and apply the right border index format
+            # apply the right border index format to the upper header rows
+            for level in range(num_col_indices - 1):
+                sheet.write(header_offset + level, col_num + column_offset, "", index1_last_format)
+            # insert the index name on the last header row
             ## fixed_index_names[col_num] will retrieve the correct name based on its position in the list
-            sheet.write(header_offset, col_num + column_offset, "", index1_last_format)
-            ## header_offset + 1 to not overwrite index1
-            sheet.write(header_offset + 1, col_num + column_offset, fixed_index_names[col_num], index2_last_format)
+            sheet.write(last_header_row, col_num + column_offset, fixed_index_names[col_num], index2_last_format)
         else:
-            # else insert the index name and apply no right border index format
-            sheet.write(header_offset, col_num + column_offset, "", index1_format)
-            ## header_offset + 1 to not overwrite index1
-            sheet.write(header_offset + 1, col_num + column_offset, fixed_index_names[col_num], index2_format)
+            # else apply no right border index format to the upper header rows
+            for level in range(num_col_indices - 1):
+                sheet.write(header_offset + level, col_num + column_offset, "", index1_format)
+            # insert the index name on the last header row
+            sheet.write(last_header_row, col_num + column_offset, fixed_index_names[col_num], index2_format)
 
 
 ######################## INDEX FORMATTING ##################################
@@ -764,7 +783,7 @@ def last_col_highlight_header_multiindex(df, wb, sheet,  header1_bgcolor = '#002
 
 ###                 SINGLE ROW INDEX AND ANY NUMBER OF COLUMN LEVELS DATAFRAMES                 ###
 
-def format_index(df, wb, sheet, header_offset=0, column_offset=0, set_width=True, text_wrap=False, wrap_rows=2):
+def format_index(df, wb, sheet, header_offset=0, column_offset=0, set_width=True, text_wrap=False, wrap_rows=2, layout=None):
 
     # This function will apply formatting to your index to bold it and give a right border
     ## Meant only for dataframes with single row index and any number of column levels
@@ -783,24 +802,35 @@ def format_index(df, wb, sheet, header_offset=0, column_offset=0, set_width=True
     ### text_wrap specifies if you index headers were wrapped when applying header formatting. default is False
     ### wrap_rows is how many rows wide the wrapped header text should be. default is 2
     ####        should be used if text_wrap is True
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
     from math import ceil
+    from utility_functions import get_format, get_max_width, get_table_layout, set_column_spec, is_streamed_sheet
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
 
     # if there is no index set raise error
-    if None in df.index.names:
+    if layout.num_row_indices == 0:
         raise Exception("No index set for dataframe.")
     else:
         pass
 
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1   
+    # constant_memory worksheets write out each row as soon as a lower row is written, so the index column cannot be
+    ## written on its own without losing the data written next to it
+    if is_streamed_sheet(sheet):
+        raise Exception("format_index cannot be used on a constant_memory worksheet. insert_data writes the index "
+            "with the data on those worksheets.")
+    else:
+        pass
+
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
 
     # create index format
-    index_format = wb.add_format({'bold':True,'right':True})
+    index_format = get_format(wb, {'bold':True,'right':True})
 
     ## this iterates through the rows.  this prevents the formatting being applied to empty cells
     ## it applies formatting with the index value for the first column of the report
@@ -812,8 +842,8 @@ def format_index(df, wb, sheet, header_offset=0, column_offset=0, set_width=True
 
     
     if set_width == True:
-        # gets the length of all the values in the index
-        index_values = [len(value) for row_num, value in enumerate(df.index.values)]
+        # gets the length of the longest value in the index
+        index_width = get_max_width(df.index)
 
         # index name length
         if text_wrap == True and " " in df.index.name:
@@ -823,17 +853,17 @@ def format_index(df, wb, sheet, header_offset=0, column_offset=0, set_width=True
 
         # gets the max of the index values or the name of the index, whichever is greater
         ## + 1 for 'wiggle room'
-        max_index_length = max(max(index_values), name_length) + 1
+        max_index_length = max(index_width, name_length) + 1
 
         # set index column width
-        sheet.set_column(column_offset, column_offset, max_index_length)
+        set_column_spec(sheet, column_offset, column_offset, max_index_length)
     else:
         pass
 
 
 def highlight_last_index(df, wb, sheet, index_bgcolor='#002387', index_fontcolor='FFFFFF', \
     hilite_bgcolor='#00A111', hilite_fontcolor='FFFFFF', header_offset=0, column_offset=0, set_width=True, \
-    text_wrap=False, wrap_rows=2):
+    text_wrap=False, wrap_rows=2, layout=None):
 
     # This function will apply formatting to your index to bold it and give a right border and bottom borders
     ## It will fill one color for all your index row backgrounds and a different color for your last index row value as a highlight
@@ -857,26 +887,37 @@ def highlight_last_index(df, wb, sheet, index_bgcolor='#002387', index_fontcolor
     ### text_wrap specifies if you index headers were wrapped when applying header formatting. default is False
     ### wrap_rows is how many rows wide the wrapped header text should be. default is 2
     ####        should be used if text_wrap is True
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
     from math import ceil
+    from utility_functions import get_format, get_max_width, get_table_layout, set_column_spec, is_streamed_sheet
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
 
     # if there is no index set raise error
-    if None in df.index.names:
+    if layout.num_row_indices == 0:
         raise Exception("No index set for dataframe.")
     else:
         pass
 
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1   
+    # constant_memory worksheets write out each row as soon as a lower row is written, so the index column cannot be
+    ## written on its own without losing the data written next to it
+    if is_streamed_sheet(sheet):
+        raise Exception("highlight_last_index cannot be used on a constant_memory worksheet. insert_data writes the index "
+            "with the data on those worksheets.")
+    else:
+        pass
+
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
     
     # index formats
-    index_format = wb.add_format({'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'right':True,\
+    index_format = get_format(wb, {'bold':True,'bg_color':index_bgcolor,'font_color':index_fontcolor,'right':True,\
         'bottom':True})
-    last_index_format = wb.add_format({'bold':True,'bg_color':hilite_bgcolor,'font_color':hilite_fontcolor,'right':True,\
+    last_index_format = get_format(wb, {'bold':True,'bg_color':hilite_bgcolor,'font_color':hilite_fontcolor,'right':True,\
         'bottom':True})
 
     # getting basic parameters to use in functions
@@ -899,8 +940,8 @@ def highlight_last_index(df, wb, sheet, index_bgcolor='#002387', index_fontcolor
             sheet.write(row_num + num_col_indices + header_offset, column_offset, value, index_format)  
 
     if set_width == True:
-        # gets the length of all the values in the index
-        index_values = [len(value) for row_num, value in enumerate(df.index.values)]
+        # gets the length of the longest value in the index
+        index_width = get_max_width(df.index)
 
         # get length of index name
         if text_wrap == True and " " in df.index.name:
@@ -910,24 +951,23 @@ def highlight_last_index(df, wb, sheet, index_bgcolor='#002387', index_fontcolor
 
         # gets the max of the index values or the name of the index, whichever is greater
         ## + 1 for 'wiggle room'
-        max_index_length = max(max(index_values), name_width) + 1
+        max_index_length = max(index_width, name_width) + 1
 
         # set index column width
-        sheet.set_column(column_offset, column_offset, max_index_length) 
+        set_column_spec(sheet, column_offset, column_offset, max_index_length) 
     else:
         pass
     
 
 ###                ROW MULTIINDEX AND ANY NUMBER OF COLUMN LEVELS DATAFRAMES                 ###
 
-def merge_row_index_cells(df, wb, sheet, header_offset=0, column_offset=0):
+def merge_row_index_cells(df, wb, sheet, header_offset=0, column_offset=0, layout=None):
 
-    from utility_functions import return_divisible_ints
+    from utility_functions import get_table_layout
 
     # This function will merge the cells in your index columns that are from the same category
-    ## Can be used on any row multiindex dataframe
-    ### NOTE: will break if not all index categories are present in each index!
-    ### NOTE: will also break if row indices are not arranged in least categories to most categories order (which is pandas standard)
+    ## Can be used on any row multiindex dataframe, including ones where categories have different numbers of rows (ragged)
+    ### NOTE: cells are merged for each run of rows with the same category, so sort the dataframe by its index first
     ### This function will need to be used if creating a row with row multiindex data and not using to_excel() to import
 
     # ARGUMENTS
@@ -940,15 +980,20 @@ def merge_row_index_cells(df, wb, sheet, header_offset=0, column_offset=0):
     ## OPTIONAL:
     ### header_offset is the number of rows to skip if you want blank rows on top for title etc. defaults to 0
     ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0    
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
     #getting count of row_indices
 
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
     # if there is no index set raise error
-    if None in df.index.names:
+    if layout.num_row_indices == 0:
         raise Exception("No index set for dataframe.")
     else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+        num_row_indices = layout.num_row_indices
 
     # exit function with error if it is not a multiindex
     if num_row_indices == 1:
@@ -956,84 +1001,35 @@ def merge_row_index_cells(df, wb, sheet, header_offset=0, column_offset=0):
     else:
         pass
 
-    # determining how many rows are in the major (leftmost) index by dividing the total row count by index[0] unique values
-    rows_per_major_index = int(len(df)/len(df.index.unique(0)))
-
-    # getting the count of categories per index
-    
-    # create an empty list to hold the values:
-    cat_counts = []
-
-    # iterating over our row indices:
-    for col_num in range(num_row_indices):
-        # get count of unique values
-        cat_count = len(df.index.unique(col_num))
-        # append them to list
-        cat_counts.append(cat_count)
-
-    # get the count of rows per category for each index
-
-    # create a empty list to hold the values
-    cat_row_counts = []
-
-    # iterating through the number of row indices we have:
-    for col_num in range(num_row_indices):
-        # get the category count of the index
-        cat_count = len(df.index.unique(col_num))
-        # if it is the major index[0]:
-        if col_num == 0:
-            # rows_per_cat is the rows_per_major_index
-            rows_per_cat = rows_per_major_index
-        else:
-            # else rows_per_cat of last index divided by the category count of current index
-            rows_per_cat = int(cat_row_counts[col_num-1]/cat_counts[col_num])
-        # append rows_per_cat value to list
-        cat_row_counts.append(rows_per_cat)
-    
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1
-
-    # get the number of rows in the data
-    data_rows = len(df)
-
-    # need a list of rows to start cell merges on
-    
-    # iterating over our numbers of cells to merge per index:
-    for col_num, merge_n in enumerate(cat_row_counts):        
-        #skip if there are no cells to merge
-        if merge_n == 0 or merge_n == 1:
-            pass
-        else:
-            # create a list using return_divisible_ints with 0 as the start_num and our count of data rows as the end_num of range, 
-            # divided by merge_n
-            divisible_rows = [i for i in return_divisible_ints(0, data_rows, merge_n)]
-            # will return 1 too many values--drop the last one
-            divisible_rows.pop()
-            for row_num in divisible_rows:
-                # merge cells     starting cell is row_num + num_col_indices + header_offset
-                sheet.merge_range(row_num + num_col_indices + header_offset,
-                          # the index column
-                          col_num + column_offset,
-                          # row_num + header rows + amount of cells to merge - 1 for our ending cell
-                          ## -1 because the row_num cell is already accounted for
-                          row_num + num_col_indices + header_offset + merge_n - 1,
-                          # the index column
-                          col_num + column_offset,
-                          # message to fill in which will warn user if they forget to import index labels in subsequent steps
-                          'Forgot to Import Data!')
-
-
-def format_row_multiindex(df, wb, sheet, header_offset=0, column_offset=0, set_width=True, text_wrap=False, wrap_rows=2):
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
+
+    # iterating over our indices and the runs of rows with the same category in each:
+    for col_num, (run_starts, run_lengths) in enumerate(layout.index_runs):
+        # only runs of more than one row have cells to merge
+        merge_runs = run_lengths > 1
+        for row_num, merge_n in zip(run_starts[merge_runs].tolist(), run_lengths[merge_runs].tolist()):
+            # merge cells     starting cell is row_num + num_col_indices + header_offset
+            sheet.merge_range(row_num + num_col_indices + header_offset,
+                      # the index column
+                      col_num + column_offset,
+                      # row_num + header rows + amount of cells to merge - 1 for our ending cell
+                      ## -1 because the row_num cell is already accounted for
+                      row_num + num_col_indices + header_offset + merge_n - 1,
+                      # the index column
+                      col_num + column_offset,
+                      # message to fill in which will warn user if they forget to import index labels in subsequent steps
+                      'Forgot to Import Data!')
+
+
+def format_row_multiindex(df, wb, sheet, header_offset=0, column_offset=0, set_width=True, text_wrap=False, wrap_rows=2, \
+    layout=None, sparse_labels=False):
 
     # This function will apply formatting to your index to bold it and give a right border
     ## Meant only for dataframes with row mulitiindex and and number of columns levels
-    ### NOTE: will break if not all index categories are present in each index!
-    ### NOTE: will also break if row indices are not arranged in least categories to most categories order (which is pandas standard)
-    ### if you are not importing with to_excel(), the merge_row_index_cells() function must be applied first
+    ## categories can have different numbers of rows (ragged), borders follow each run of rows with the same category
+    ### NOTE: sort the dataframe by its index first so each category is one run of rows
+    ### if you are not importing with to_excel(), the merge_row_index_cells() function must be applied first (or use sparse_labels)
 
     # ARGUMENTS
     
@@ -1049,19 +1045,34 @@ def format_row_multiindex(df, wb, sheet, header_offset=0, column_offset=0, set_w
     ### text_wrap specifies if you index headers were wrapped when applying header formatting. default is False
     ### wrap_rows is how many rows wide the wrapped header text should be. default is 2
     ####        should be used if text_wrap is True
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+    ### sparse_labels will write each index label once, in the first row of its run of rows, and leave the other rows of
+    ###     the run blank instead of merging them. merge_row_index_cells() is not needed with this option, so no merged
+    ###     ranges are made, which keeps tables with many index categories fast to write and open. defaults to False
 
+    import numpy as np
     from math import ceil
+    from utility_functions import get_format, get_max_width, get_table_layout, set_column_spec
+
+    # raise an error if the sparse_labels input is not valid
+    if sparse_labels == True:
+        pass
+    elif sparse_labels == False:
+        pass
+    else:
+        raise ValueError(f"{sparse_labels} is not a valid sparse_labels option. Valid arguments are True, False.")
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
 
     #getting count of row_indices
     # if there is no index set raise error
-    if None in df.index.names:
+    if layout.num_row_indices == 0:
         raise Exception("No index set for dataframe.")
     else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
-
-    # getting rows per category in first index
-    rows_per_major_index = int(len(df)/len(df.index.unique(0)))
+        num_row_indices = layout.num_row_indices
 
     # exit function with error if it is not a multiindex
     if num_row_indices == 1:
@@ -1069,68 +1080,50 @@ def format_row_multiindex(df, wb, sheet, header_offset=0, column_offset=0, set_w
     else:
         pass
 
-    # getting the count of categories per index:
-    
-    # create an empty list to hold the values:
-    cat_counts = []
+    # getting the last row of each run of the same category for each index
+    index_group_ends = layout.index_group_ends
 
-    # iterating over our row indices:
-    for col_num in range(num_row_indices):
-        # get count of unique values
-        cat_count = len(df.index.unique(col_num))
-        # append them to list
-        cat_counts.append(cat_count)
-        
-    # create a empty list to hold the values
-    cat_row_counts = []
-
-    # iterating through the number of row indices we have:
-    for col_num in range(num_row_indices):
-        # get the category count of the index
-        cat_count = len(df.index.unique(col_num))
-        # if it is the major index[0]:
-        if col_num == 0:
-            # rows_per_cat is the rows_per_major_index
-            rows_per_cat = rows_per_major_index
-        else:
-            # else rows_per_cat of last index divided by the category count of current index
-            rows_per_cat = int(cat_row_counts[col_num-1]/cat_counts[col_num])
-        # append rows_per_cat value to list
-        cat_row_counts.append(rows_per_cat)
-
-   
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1  
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
 
      
     # creating formats
-    index_format = wb.add_format({'bold':True,'valign':'vcenter'})
-    index_bottom_row_format = wb.add_format({'bold':True,'valign':'vcenter','bottom':True})
-    last_index_format = wb.add_format({'bold':True,'valign':'vcenter','right':True})
-    last_index_bottom_format = wb.add_format({'bold':True,'valign':'vcenter','bottom':True,'right':True})
+    index_format = get_format(wb, {'bold':True,'valign':'vcenter'})
+    index_bottom_row_format = get_format(wb, {'bold':True,'valign':'vcenter','bottom':True})
+    last_index_format = get_format(wb, {'bold':True,'valign':'vcenter','right':True})
+    last_index_bottom_format = get_format(wb, {'bold':True,'valign':'vcenter','bottom':True,'right':True})
     
     # iterating over our indices:
     for col_num in range(num_row_indices):
+        # get the values in the index
+        level_values = df.index.get_level_values(col_num).tolist()
+        # with sparse labels, only the first row of each run of the same category keeps its value
+        ## the other rows are written blank with the same formats
+        if sparse_labels == True and col_num != max(range(num_row_indices)):
+            label_rows = np.zeros(len(level_values), dtype=bool)
+            label_rows[layout.index_runs[col_num][0]] = True
+            level_values = [value if label_row else None for value, label_row in zip(level_values, label_rows.tolist())]
+
         # if it is the first (major) index:
         if col_num == 0:
             # iterating over the values in the index:
-            for row_num, value in enumerate(df.index.get_level_values(col_num)):
-                # insert index value and apply bottom border index format to all cells
-                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value, index_bottom_row_format)
+            for row_num, value in enumerate(level_values):
+                # with sparse labels the cells are not merged, so only the last row per category gets the bottom border
+                if sparse_labels == True and not index_group_ends[0][row_num]:
+                    sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value, index_format)
+                else:
+                    # insert index value and apply bottom border index format to all cells
+                    sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value, index_bottom_row_format)
         # if it is the last (one row per category) index:
         elif col_num == max(range(num_row_indices)):
             # raise an error if there is more than one row per each value
-            if cat_row_counts[col_num] != 1:
+            if layout.index_runs[col_num][1].max() != 1:
                 raise Exception('Your final index has more than one row per each value.')
             else:
             # iterating over the values in the index:
-                for row_num, value in enumerate(df.index.get_level_values(col_num)):
+                for row_num, value in enumerate(level_values):
                     # if it is the last row before a new major index category:
-                    if (row_num+1)%rows_per_major_index==0:
+                    if index_group_ends[0][row_num]:
                         # apply the last index bottom format
                         sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value, last_index_bottom_format)
                     else:
@@ -1138,10 +1131,9 @@ def format_row_multiindex(df, wb, sheet, header_offset=0, column_offset=0, set_w
                         sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value, last_index_format) 
         else:        
             # for all other indices iterate over index values:
-            for row_num, value in enumerate(df.index.get_level_values(col_num)):
-                # if it is the last row in the index category:
-                ## as determined by if the row number is divisible by the number of categories times the rows per category
-                if (row_num+1)%(cat_counts[col_num]*cat_row_counts[col_num])==0:
+            for row_num, value in enumerate(level_values):
+                # if it is the last row in the category of the index to its left:
+                if index_group_ends[col_num-1][row_num]:
                     # insert index value and apply bottom border index formatting
                     sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value, index_bottom_row_format)
                 else:
@@ -1157,8 +1149,8 @@ def format_row_multiindex(df, wb, sheet, header_offset=0, column_offset=0, set_w
 
         # iterating over row indices:
         for col_num in range(num_row_indices):
-            # store the length of all index values in a list
-            index_values = [len(value) for i, value in enumerate(df.index.get_level_values(col_num))]
+            # get the length of the longest value in the index level
+            index_width = get_max_width(df.index.get_level_values(col_num))
             # get index name length
             if text_wrap == True and " " in df.index.names[col_num]:
                 name_width = ceil(len(df.index.names[col_num])/wrap_rows)
@@ -1166,27 +1158,160 @@ def format_row_multiindex(df, wb, sheet, header_offset=0, column_offset=0, set_w
                 name_width = len(df.index.names[col_num])
             # get the max width of the longest value or title, whichever is longer
             ## + 1 for 'wiggle room'
-            max_index_length = max(max(index_values), name_width) + 1
+            max_index_length = max(index_width, name_width) + 1
             # add that to the max_index_lengths list
             max_index_lengths.append(max_index_length)
 
         # iterating over row indices again:
         for col_num in range(num_row_indices):
             # set width to matching max index length
-            sheet.set_column(col_num + column_offset, col_num + column_offset, max_index_lengths[col_num])
+            set_column_spec(sheet, col_num + column_offset, col_num + column_offset, max_index_lengths[col_num])
     else: 
         pass
 
     
 
 
+def outline_row_multiindex(df, wb, sheet, header_offset=0, column_offset=0, collapsed=False, data_type=None, \
+    replace_nulls=True, null_value='-', null_align='center', layout=None):
+
+    # This function will write your row multiindex data with a label row above each outer index category, and group the
+    ## rows of each category into Excel row outline groups so they can be collapsed and expanded, as an alternative to
+    ## merged index cells
+    ## Meant only for dataframes with row mulitiindex and and number of columns levels
+    ## every index level but the last is outlined. each category gets its own label row, which is the summary row of
+    ## its outline group, so a collapsed group shows only the category's label and no data from any one of its rows
+    ## the data rows hold the last index level and the data, one outline level below the label rows above them
+    ### NOTE: sort the dataframe by its index first so each category is one run of rows
+    ### this function writes the index and the data, so it replaces merge_row_index_cells(), format_row_multiindex() and
+    ### insert_row_multiindex_data() (or insert_4d_data()). use format_header (or format_header_multiindex) for the headers
+    ### the label rows move the data rows down: there is one label row for each run of rows at every outlined index level
+    ### (ex a 2x2x2 index has 2 first level runs and 4 second level runs, so 6 label rows above its 8 data rows)
+    ### the function returns the worksheet row of the last row of the outlined table, and adds the label rows to the
+    ### layout. pass the same layout to table_bottom_border, table_right_border and table_left_border so they draw
+    ### around the outlined rows instead of the rows the dataframe would take up without label rows
+    ### on worksheets from a constant_memory workbook, pass a PlanSheet so the rows are written in order
+
+    # ARGUMENTS
+    
+    ## MANDATORY:
+    ### df is your data from your dataframe
+    ### wb is your workbook
+    ### sheet is your worksheet
+
+    ## OPTIONAL:
+    ### header_offset is the number of rows to skip if you want blank rows on top for title etc. defaults to 0
+    ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
+    ### collapsed will hide the outlined rows so only the label row of each major index category shows. defaults to False
+    ### data_type is the type of numeric data (see insert_data for the options). defaults to None
+    ### replace_nulls will replace null values with the specified replacement. defaults to true
+    ### null_value is what replaces nulls. defaults to '-'
+    ### null_align is the horizontal alignment for null values. defaults to center
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+
+    from utility_functions import get_format, get_data_type_format, get_null_mask, get_table_layout, write_table_data, \
+        is_streamed_sheet
+
+    # raise an error if the collapsed input is not valid
+    if collapsed == True:
+        pass
+    elif collapsed == False:
+        pass
+    else:
+        raise ValueError(f"{collapsed} is not a valid collapsed option. Valid arguments are True, False.")
+
+    # check for valid alignment input
+    valid_align = ['center','left','right']
+
+    if null_align in valid_align:
+        pass
+    else:
+        raise ValueError(f"{null_align} is not a valid alignment option. Valid options are {valid_align}")
+
+    # check the data_type before anything is written
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    get_data_type_format(wb, data_type)
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
+    #getting count of row_indices
+    # if there is no index set raise error
+    if layout.num_row_indices == 0:
+        raise Exception("No index set for dataframe.")
+    else:
+        num_row_indices = layout.num_row_indices
+
+    # exit function with error if it is not a multiindex
+    if num_row_indices == 1:
+        raise Exception("Function is not meant for single row index datasets.")
+    else:
+        pass
+
+    # Excel only allows 7 outline levels, and the data rows sit one level below the last outlined index level
+    if num_row_indices - 1 > 7:
+        raise Exception(f"Excel only allows 7 outline levels and your dataframe has {num_row_indices - 1} outer index levels.")
+    else:
+        pass
+
+    # the label rows are written above data rows that come before them, which a constant_memory worksheet cannot do
+    if is_streamed_sheet(sheet):
+        raise Exception("outline_row_multiindex cannot write to a constant_memory worksheet directly. Pass a PlanSheet \
+of the worksheet instead and flush it before closing the workbook.")
+    else:
+        pass
+
+    # getting the row of each data row and label row from the runs of each outer index level
+    data_rows, label_rows, label_levels, label_positions = layout.index_outline_rows
+    data_rows, label_rows = data_rows.tolist(), label_rows.tolist()
+    label_levels, label_positions = label_levels.tolist(), label_positions.tolist()
+    # the data rows sit one level below the deepest label rows
+    data_level = num_row_indices - 1
+    first_row = layout.first_data_row
+
+    # creating formats
+    label_format = get_format(wb, {'bold':True})
+    last_index_format = get_format(wb, {'bold':True,'right':True})
+
+    # the summary rows sit above their groups, so the expand/collapse buttons go above too
+    ## the outline settings are for the whole worksheet
+    sheet.outline_settings(True, False, True, False)
+
+    # iterating over the label rows:
+    for row_num, level, position in zip(label_rows, label_levels, label_positions):
+        # write the category label in its index level's column
+        sheet.write(row_num + first_row, level + column_offset, df.index.get_level_values(level)[position], label_format)
+        # the label row is the summary row of the group below it, and is in the group of the label row above it
+        sheet.set_row(row_num + first_row, None, None, {'level':level, 'hidden':collapsed == True and level > 0, \
+            'collapsed':collapsed == True})
+
+    # iterating over the data rows:
+    last_level_values = df.index.get_level_values(num_row_indices - 1).tolist()
+    for row_num, value in zip(data_rows, last_level_values):
+        # write the last index level next to the data
+        sheet.write(row_num + first_row, num_row_indices - 1 + column_offset, value, last_index_format)
+        sheet.set_row(row_num + first_row, None, None, {'level':data_level, 'hidden':collapsed == True})
+
+    # write the data on the data rows, with no borders
+    write_table_data(wb, sheet, df, layout, data_type, replace_nulls, null_value, null_align, \
+        null_mask=get_null_mask(df, replace_nulls), data_rows=data_rows)
+
+    # the layout now covers the label rows too, so the functions given it find the real last row of the table
+    layout.num_label_rows = len(label_rows)
+
+    return layout.last_data_row
+
+
 ######################## DATA FORMATTING ##################################
 
 
 ###                ANY NUMBER ROW INDICES AND SINGLE COLUMNS INDEX DATAFRAMES                 ###
 
 
-def set_col_width(df, wb, sheet, col_name, method='headers', column_offset=0, text_wrap=False, wrap_rows=2):
+def set_col_width(df, wb, sheet, col_name, method='headers', column_offset=0, text_wrap=False, wrap_rows=2, \
+    sample_size=1000, sample_quantile=1.0, sample_cap=255, layout=None):
 
     # adapted from a solution from dfresh22 found at 
     # https://stackoverflow.com/questions/29463274/simulate-autofit-column-in-xslxwriter
@@ -1208,13 +1333,22 @@ def set_col_width(df, wb, sheet, col_name, method='headers', column_offset=0, te
     #       'header' sets width based on the length of column names. is default
     #       'data' sets width based on the length of the longest data point in the column
     #       'all' sets width based off the column name or longest data point, whichever is larger
+    #       'sample' sets width like 'all', but estimates the longest data point from a sample of the column's values.
+    #           meant for very large dataframes
     ### text_wrap specifies if you index headers were wrapped when applying header formatting. default is False
     ### wrap_rows is how many rows wide the wrapped header text should be. default is 2
     ####        should be used if text_wrap is True
+    ### sample_size is the number of values sampled from the column when method is 'sample'. defaults to 1000
+    ### sample_quantile is the quantile of the sampled value lengths used when method is 'sample', ex 0.99 ignores the
+    ###     longest 1% of values. defaults to 1.0 (the longest sampled value)
+    ### sample_cap is the widest a column can be set from its data when method is 'sample'. defaults to 255
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
     # error if entered col_name not in dataframe
 
     from math import ceil
+    from utility_functions import get_max_width, estimate_max_width, get_table_layout, set_column_spec
 
     # create list of all col_names
     col_name_list = [col_name for col_name in df.columns]
@@ -1225,7 +1359,7 @@ def set_col_width(df, wb, sheet, col_name, method='headers', column_offset=0, te
         pass
 
     # list of valid method args
-    valid_methods = ['headers', 'data', 'all']
+    valid_methods = ['headers', 'data', 'all', 'sample']
 
     # error if valid method arg not used
     if method not in valid_methods:
@@ -1240,45 +1374,33 @@ def set_col_width(df, wb, sheet, col_name, method='headers', column_offset=0, te
     else:
         col_name_length = len(df[col_name].name) + 1
 
-    # getting length of longest data point
-
-    # list of all column values
-    values = df[col_name].tolist()
-    # create empty list to store the lengths
-    value_lengths = []
-    # iterating over the values list:
-    for row_num, value in enumerate(values):
-            # get the length in characters of each value
-            length = len(str(value))
-            # add it to the value_lengths list
-            value_lengths.append(length)
-            if row_num + 1 == len(values):
-                # get the max width value
-                ## + 1 for 'wiggle room'
-                max_data_width = max(value_lengths) + 1
-
-    # get max of headers and data
-    max_all_lengths = max(col_name_length, max_data_width)
-
+    # getting length of longest data point, only when the method uses it
+    ## + 1 for 'wiggle room'
     if method == 'headers':
         col_width = col_name_length
-    elif method == 'data':
-        col_width = max_data_width
-    elif method == 'all':
-        col_width = max_all_lengths
+    elif method == 'sample':
+        # estimate it from a sample of the column, then take the max of headers and data
+        col_width = max(col_name_length, estimate_max_width(df[col_name], sample_size, sample_quantile, sample_cap) + 1)
+    else:
+        max_data_width = get_max_width(df[col_name]) + 1
+        if method == 'data':
+            col_width = max_data_width
+        elif method == 'all':
+            # get max of headers and data
+            col_width = max(col_name_length, max_data_width)
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, column_offset=column_offset, layout=layout)
+    column_offset = layout.column_offset
 
     # get the count of how many row indices they are so we can skip those columns in the for loop
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     for col_num, df_col_name in enumerate(df.columns):
         # if the specified column name matches 
         if df_col_name == col_name:    
-            sheet.set_column(col_num + num_row_indices + column_offset, col_num + num_row_indices + column_offset, col_width)  
+            set_column_spec(sheet, col_num + num_row_indices + column_offset, col_num + num_row_indices + column_offset, col_width)  
         else:
             pass
 
@@ -1288,7 +1410,7 @@ def set_col_width(df, wb, sheet, col_name, method='headers', column_offset=0, te
 
 
 def insert_data(df, wb, sheet, header_offset=0, column_offset=0, data_type=None, replace_nulls=True, null_value='-', \
-    null_align='center'):
+    null_align='center', row_major=False, bulk_write=True, col_width_method=None, set_widths=True, layout=None):
     
     # This function will insert your data in desired cells with a header_offset
     ## Can be used on any dataframe
@@ -1321,8 +1443,25 @@ def insert_data(df, wb, sheet, header_offset=0, column_offset=0, data_type=None,
     ### replace_nulls will replace null values with the specified replacement. defaults to true
     ### null_value is what replaces nulls. defaults to '-'
     ### null_align is the horizontal alignment for null values. defaults to center
+    ### row_major will write the data one full row at a time instead of one full column at a time. defaults to False
+    ####    this is always used on worksheets from a workbook created with the constant_memory option, which can only be
+    ####    written top to bottom. on those worksheets call insert_title, format_header, insert_data then table_bottom_border
+    ####    in that order, since rows above the last written row cannot be changed. the row index is written by insert_data
+    ####    on those worksheets, in format_index's format, since format_index cannot write the index column on its own
+    ### bulk_write will write each run of cells that share a format with one write_column (or write_row) call instead of
+    ###     one write call per cell. defaults to True
+    ### col_width_method will measure each data column (in one vectorized pass, using the null mask made for writing) so
+    ###     set_column_widths does not need to be called after the insert. the widths are returned as a list, one per data
+    ###     column. defaults to None (no widths):
+    #       'headers' sets width based on the length of column names
+    #       'data' sets width based on the length of the longest data point in the column (in its data_type format)
+    #       'all' sets width based off the column name or longest data point, whichever is larger
+    ### set_widths will apply the measured widths with set_column. set to False to only return them. defaults to True
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
-    import pandas as pd
+    from utility_functions import get_null_mask, get_data_type_format, get_insert_widths, get_table_layout, write_table_data, \
+        set_column_spec, get_format, is_streamed_sheet
 
     # check for valid alignment input
     valid_align = ['center','left','right']
@@ -1332,100 +1471,256 @@ def insert_data(df, wb, sheet, header_offset=0, column_offset=0, data_type=None,
     else:
         raise ValueError(f"{null_align} is not a valid alignment option. Valid options are {valid_align}")
 
-    if null_align == 'center':
-        null_format = wb.add_format({'align':'center'})
-    elif null_align == 'left':
-        null_format = wb.add_format({'align':'left'})
-    elif null_align == 'right':
-        null_format = wb.add_format({'align':'right'})
-
-    # list of valid dtype args
-    valid_dtypes = ['numeric','decimal_1','decimal_2','dollar','dollar_cents','percent','percent_1','percent_2','date',\
-        'date_alt','datetime','datetime_alt']
-
-    # this if statement sets the formatting based off the data_type argument
-    ## it will raise an error to tell the user if they have entered an invalid data_type argument
-    if data_type == 'numeric':
-        data_format = wb.add_format({'num_format':'#,##0'})
-    elif data_type == 'decimal_1':
-        data_format = wb.add_format({'num_format':'#,##0.0'})
-    elif data_type == 'decimal_2':
-        data_format = wb.add_format({'num_format':'#,##0.00'})
-    elif data_type == 'dollar':
-        data_format = wb.add_format({'num_format':'$#,##0'})
-    elif data_type == 'dollar_cents':
-        data_format = wb.add_format({'num_format':'$#,##0.00'})
-    elif data_type == 'percent':
-        data_format = wb.add_format({'num_format':'0%'})
-    elif data_type == 'percent_1':
-        data_format = wb.add_format({'num_format':'0.0%'})
-    elif data_type == 'percent_2':
-        data_format = wb.add_format({'num_format':'0.00%'})
-    elif data_type == 'date':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd'})
-    elif data_type == 'date_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy'})
-    elif data_type == 'datetime':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm'})
-    elif data_type == 'datetime_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM'})
-    elif data_type == 'text':
-        raise Exception('Data types are text by default! Function not needed.')
-    elif data_type == None:
+    # raise an error if the row_major input is not valid
+    if row_major == True:
+        pass
+    elif row_major == False:
         pass
     else:
-        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {valid_dtypes}")
+        raise ValueError(f"{row_major} is not a valid row_major option. Valid arguments are True, False.")
 
-    # getting the column count
+    # raise an error if the bulk_write input is not valid
+    if bulk_write == True:
+        pass
+    elif bulk_write == False:
+        pass
+    else:
+        raise ValueError(f"{bulk_write} is not a valid bulk_write option. Valid arguments are True, False.")
+
+    # check for valid col_width_method input
+    valid_width_methods = [None,'headers','data','all']
+
+    if col_width_method in valid_width_methods:
+        pass
+    else:
+        raise ValueError(f"{col_width_method} is not a valid col_width_method option. Valid options are {valid_width_methods}")
+
+    # raise an error if the set_widths input is not valid
+    if set_widths == True:
+        pass
+    elif set_widths == False:
+        pass
+    else:
+        raise ValueError(f"{set_widths} is not a valid set_widths option. Valid arguments are True, False.")
+
+    # check the data_type before anything is written
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    if data_type == 'text':
+        raise Exception('Data types are text by default! Function not needed.')
+    get_data_type_format(wb, data_type)
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
 
     # getting the count of row index columns
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
     # getting the count of regular columns
     num_cols = len(df.columns)
     # adding them together for total column count
     total_cols = num_row_indices + num_cols
 
-    # getting row count of the data to use to set lower bound for formatting
+    # find the cells to be replaced with null_value once for the whole dataframe
+    null_mask = get_null_mask(df, replace_nulls)
+
+    # measure the data columns from the same null mask that is used for writing
+    if col_width_method == None:
+        col_widths = None
+    else:
+        col_widths = get_insert_widths(df, null_mask, data_type, null_value, col_width_method)
+        if set_widths == True:
+            # iterating over data columns excluding row index columns:
+            for col_num in range(num_row_indices, total_cols):
+                set_column_spec(sheet, col_num + column_offset, col_num + column_offset, col_widths[col_num-num_row_indices])
+
+    # the index of a constant_memory worksheet is written with the data, one row at a time, in format_index's format
+    if is_streamed_sheet(sheet) and num_row_indices > 0:
+        index_format = get_format(wb, {'bold':True,'right':True})
+    else:
+        index_format = None
+
+    # write the data, with no borders
+    write_table_data(wb, sheet, df, layout, data_type, replace_nulls, null_value, null_align, row_major=row_major, \
+        bulk_write=bulk_write, null_mask=null_mask, index_format=index_format)
+
+    return col_widths
+
+
+def insert_excel_table(df, wb, sheet, header_offset=0, column_offset=0, data_type=None, col_data_types=None, \
+    header_bgcolor='#002387', header_fontcolor='#FFFFFF', table_style='Table Style Light 1', total_row=None, \
+    replace_nulls=True, null_value='-', null_align='center', col_width_method=None, table_name=None, layout=None):
+
+    # This function will insert your data as a native Excel table (worksheet.add_table), with a styled header row,
+    ## column formats, banded rows, filter buttons and an optional total row
+    ## it is an alternative to format_header + insert_data + set_col_data_type + the table border functions, where the
+    ## column formats and banding live in the one table definition instead of a format on every cell
+    ## the row index (if it has a name) is written as the first columns of the table
+    ### Meant only for dataframes with a single row of column headers
+    ### Note: Excel tables cannot be added to worksheets from a workbook created with the constant_memory option
+
+    # ARGUMENTS
     
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1
-
-    # iterating over data columns excluding row index columns:
-    for col_num in range(num_row_indices, total_cols):
-        # iterating over rows containing data:
-        for row_num, value in enumerate(df.values):
-            # no data_type is specified:
-            if data_type == None:
-                # if data is null
-                if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                    # insert null value and apply null formatting
-                    sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_format)
-                else:
-                    # insert the data into the cell matching the postion in the datatframe
-                    ## value[] has num_row_indices subtracted from it for indexing since that was added to the col_num in range()
-                    sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value[col_num-num_row_indices])
+    ## MANDATORY:
+    ### df is your data from your dataframe
+    ### wb is your workbook
+    ### sheet is your worksheet
+
+    ## OPTIONAL:
+    ### header_offset is the number of rows to skip if you want blank rows on top for title etc. defaults to 0
+    ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
+    ### data_type is the type of data of every data column that is not in col_data_types (see insert_data for the options).
+    ###     the index columns are written as they are unless they are in col_data_types. defaults to None
+    ### col_data_types is a dictionary of {col_name: data_type} to give columns their own data_type. defaults to None
+    ### header_bgcolor is the background color for your column headers. defaults to '#002387'
+    ### header_fontcolor is the font color for your column headers. defaults to '#FFFFFF'
+    ### table_style is the name of the Excel table style used for banding, ex 'Table Style Medium 2'. defaults to
+    ###     'Table Style Light 1'
+    ### total_row is a dictionary of {col_name: total} to add a total row under the table. defaults to None (no total row)
+    #### a total of 'average', 'count', 'count_nums', 'max', 'min', 'std_dev', 'sum' or 'var' is worked out by Excel for
+    #### that column, any other string is written as a label (ex {'region': 'Total', 'revenue': 'sum'})
+    ### replace_nulls will replace null values with the specified replacement. defaults to true
+    ### null_value is what replaces nulls. defaults to '-'
+    ### null_align is the horizontal alignment for null values. defaults to center
+    ### col_width_method will set each column's width. the widths are returned as a list, one per table column. 
+    ###     defaults to None (no widths):
+    #       'headers' sets width based on the length of column names
+    #       'data' sets width based on the length of the longest data point in the column (in its data_type format)
+    #       'all' sets width based off the column name or longest data point, whichever is larger
+    ### table_name is the name of the table in Excel. defaults to None, which lets Excel name it (Table1, Table2...)
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+
+    from utility_functions import get_format, get_data_type_format, get_col_data_types, get_null_mask, get_insert_widths, \
+        get_table_layout, write_table_data, set_column_spec, TableLayout
+
+    # Excel tables cannot be added to constant_memory worksheets
+    if getattr(sheet, 'constant_memory', False):
+        raise Exception("Excel tables cannot be added to worksheets from a workbook created with the constant_memory option.")
+    else:
+        pass
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
+    # raise an error if there is more than one row of column headers
+    if layout.num_col_indices > 1:
+        raise Exception(f"Function is only meant for datasets with a single row of column headers. \
+            The number of header rows your data has is {layout.num_col_indices}.")
+    else:
+        pass
+
+    # check for valid alignment input
+    valid_align = ['center','left','right']
+
+    if null_align in valid_align:
+        pass
+    else:
+        raise ValueError(f"{null_align} is not a valid alignment option. Valid options are {valid_align}")
+
+    # check for valid col_width_method input
+    valid_width_methods = [None,'headers','data','all']
+
+    if col_width_method in valid_width_methods:
+        pass
+    else:
+        raise ValueError(f"{col_width_method} is not a valid col_width_method option. Valid options are {valid_width_methods}")
+
+    # check the data_type before anything is written
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    get_data_type_format(wb, data_type)
+
+    # the named row index is written as the first columns of the table, so the table is the dataframe with its index reset
+    if layout.num_row_indices > 0:
+        table_df = df.reset_index()
+    else:
+        table_df = df
+    table_layout = TableLayout(table_df, header_offset, column_offset)
+
+    # Excel table headers must be unique, ignoring case, or add_table only warns and leaves the table out
+    table_headers = [str(col_name).lower() for col_name in table_df.columns]
+    if len(set(table_headers)) != len(table_headers):
+        duplicates = sorted(set(str(col_name) for col_name in table_df.columns \
+            if table_headers.count(str(col_name).lower()) > 1))
+        raise ValueError(f"Excel table headers must be unique (ignoring case). Duplicate headers are: {duplicates}")
+    else:
+        pass
+
+    # get the data_type of each table column from col_data_types
+    ## get_col_data_types will raise an error for a col_name not in the dataframe or an invalid data_type
+    data_types = get_col_data_types(table_df, data_type, col_data_types)
+    if isinstance(data_types, list):
+        pass
+    else:
+        data_types = [data_types] * len(table_df.columns)
+
+    # the index columns are written as they are, like format_index writes them, unless they are named in col_data_types
+    ## so data_type only applies to the data columns
+    for col_num in range(layout.num_row_indices):
+        if col_data_types == None or table_df.columns[col_num] not in col_data_types:
+            data_types[col_num] = None
+
+    # valid total functions that Excel works out
+    total_functions = ['average', 'count', 'count_nums', 'max', 'min', 'std_dev', 'sum', 'var']
+
+    # raise an error if a total_row column is not in the table
+    if total_row == None:
+        total_row = {}
+    for col_name in total_row:
+        if col_name not in list(table_df.columns):
+            raise ValueError(f"{col_name} not in dataframe. Columns in data are: {list(table_df.columns)}")
+        else:
+            pass
+
+    # create the header format
+    header_format = get_format(wb, {'bold':True,'bg_color':header_bgcolor,'font_color':header_fontcolor})
+
+    # create the table column settings: a header and the format of the column's data_type
+    table_columns = []
+    for col_num, col_name in enumerate(table_df.columns):
+        table_column = {'header':str(col_name), 'header_format':header_format, \
+            'format':get_data_type_format(wb, data_types[col_num])}
+        if col_name in total_row:
+            if total_row[col_name] in total_functions:
+                table_column['total_function'] = total_row[col_name]
             else:
-                # if data is null
-                if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                    # insert null value and apply null formatting
-                    sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_format)
-                else:
-                    # insert the data into the cell and apply specified formatting
-                    sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value[col_num-num_row_indices],\
-                        data_format)
+                table_column['total_string'] = str(total_row[col_name])
+        table_columns.append(table_column)
+
+    # find the cells to be replaced with null_value once for the whole dataframe
+    null_mask = get_null_mask(table_df, replace_nulls)
+
+    # measure the columns from the same null mask that is used for writing
+    if col_width_method == None:
+        col_widths = None
+    else:
+        col_widths = get_insert_widths(table_df, null_mask, data_types, null_value, col_width_method)
+        for col_num, col_width in enumerate(col_widths):
+            set_column_spec(sheet, col_num + column_offset, col_num + column_offset, col_width)
+
+    # add the table, which writes the header row and total row
+    ## the last row is the last data row, or the total row under it. a table needs at least one data row
+    table_options = {'columns':table_columns, 'style':table_style, 'total_row':bool(total_row)}
+    if table_name == None:
+        pass
+    else:
+        table_options['name'] = table_name
+    last_row = header_offset + max(len(table_df), 1) + (1 if total_row else 0)
+    ## add_table returns a negative number (and only warns) when it cannot add the table
+    if sheet.add_table(header_offset, column_offset, last_row, column_offset + len(table_df.columns) - 1, table_options) < 0:
+        raise Exception("The Excel table could not be added. See the warning from add_table for the reason.")
+    else:
+        pass
+
+    # write the data with each column's format, with no borders since the table style draws the table
+    write_table_data(wb, sheet, table_df, table_layout, data_types, replace_nulls, null_value, null_align, null_mask=null_mask)
+
+    return col_widths
 
 
 def format_single_data_type_df(df, wb, sheet, data_type, col_width=14, col_width_method=None, column_offset=0, \
-    text_wrap=False, wrap_rows=2):
+    text_wrap=False, wrap_rows=2, layout=None):
 
     # This function will apply the specified numeric formatting to all data columns
     ## Meant only for dataframes that have the same data type for ALL non-index columns, but can have any number of columns and indices
@@ -1455,50 +1750,26 @@ def format_single_data_type_df(df, wb, sheet, data_type, col_width=14, col_width
     ### col_width is the width of the data columns. defaults to 14
     ### coL_width_method is how the width is set. defaults to None, which itself defaults to the default col_width_num (14):
     #       'header' sets width based on the length of column names
-    #       'data' sets width based on the length of the longest data point in the column
+    #       'data' sets width based on the length of the longest data point in the column once formatted
     #       'all' sets width based off the column name or longest data point, whichever is larger
     ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
     ### text_wrap specifies if you index headers were wrapped when applying header formatting. default is False
     ### wrap_rows is how many rows wide the wrapped header text should be. default is 2
     ####        should be used if text_wrap is True
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
     import numpy as np
     from math import ceil
+    from utility_functions import get_data_type_format, DATA_TYPE_FORMATS, get_column_widths, get_table_layout, set_column_spec
 
-    # list of valid dtype args
-    valid_dtypes = ['numeric','decimal_1','decimal_2','dollar','dollar_cents','percent','percent_1','percent_2','date',\
-        'date_alt','datetime','datetime_alt']
-
-    # this if statement sets the formatting based off the data_type argument
-    ## it will raise an error to tell the user if they have entered an invalid data_type argument
-    if data_type == 'numeric':
-        data_format = wb.add_format({'num_format':'#,##0'})
-    elif data_type == 'decimal_1':
-        data_format = wb.add_format({'num_format':'#,##0.0'})
-    elif data_type == 'decimal_2':
-        data_format = wb.add_format({'num_format':'#,##0.00'})
-    elif data_type == 'dollar':
-        data_format = wb.add_format({'num_format':'$#,##0'})
-    elif data_type == 'dollar_cents':
-        data_format = wb.add_format({'num_format':'$#,##0.00'})
-    elif data_type == 'percent':
-        data_format = wb.add_format({'num_format':'0%'})
-    elif data_type == 'percent_1':
-        data_format = wb.add_format({'num_format':'0.0%'})
-    elif data_type == 'percent_2':
-        data_format = wb.add_format({'num_format':'0.00%'})
-    elif data_type == 'date':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd'})
-    elif data_type == 'date_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy'})
-    elif data_type == 'datetime':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm'})
-    elif data_type == 'datetime_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM'})
-    elif data_type == 'text':
+    # get the formats for the data_type
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    if data_type == 'text':
         raise Exception('Data types are text by default! Function not needed.')
-    else:
-        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {valid_dtypes}")
+    elif data_type == None:
+        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {list(DATA_TYPE_FORMATS)}")
+    data_format = get_data_type_format(wb, data_type)
 
 
     # create list of all valid methods
@@ -1526,32 +1797,10 @@ def format_single_data_type_df(df, wb, sheet, data_type, col_width=14, col_width
     else:
         col_name_lengths = [len(name) + 1 for name in df.columns]
 
-    # create a list holding the max length of the data in each column
-    max_data_lengths = []
-        
-    # iterating over the data columns:    
-    for col in list(df):
-        # store their values in a list
-        values = df[col].tolist()
-        # create an empty list to store the lengths
-        value_lengths = []
-        # iterating over the values list:
-        for row_num, value in enumerate(values):
-            # get the length in characters of each value
-            length = len(str(value))
-            # add it to the value_lengths list
-            value_lengths.append(length)
-            # if it is the final iteration over the values with the completed value_lengths list for the column:
-            ## + 1 since python numbering starts at 0
-            if row_num + 1 == len(values):
-                # get the max width value
-                ## + 1 for 'wiggle room'
-                max_data_width = max(value_lengths) + 1
-                # append it to our data lengths list
-                max_data_lengths.append(max_data_width)
-
-    # create a list for the max of data and column width, whichever is greater
-    max_all_lengths = np.maximum(col_name_lengths, max_data_lengths)
+    # create a list holding the max length of the data in each column, as shown with the data_type's number format
+    ## only when the method uses it, + 1 for 'wiggle room'
+    if col_width_method == 'data' or col_width_method == 'all':
+        max_data_lengths = [width + 1 for width in get_column_widths(df, data_type)]
 
     col_width_num_list = [col_width for col_num in df.columns]
 
@@ -1560,28 +1809,27 @@ def format_single_data_type_df(df, wb, sheet, data_type, col_width=14, col_width
     elif col_width_method == 'data':
         width_list = max_data_lengths
     elif col_width_method == 'all':
-        width_list = max_all_lengths
+        # the max of data and column width, whichever is greater
+        width_list = np.maximum(col_name_lengths, max_data_lengths)
     else:
         width_list = col_width_num_list
 
-    # getting column count of the data to use to set upper bound for formatting
-    df_column_count = len(df.columns)
-    
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, column_offset=column_offset, layout=layout)
+    column_offset = layout.column_offset
+
     # getting row indices count of the data to use to set lower bound for formatting
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
-    ## sets columns B through the last column present in the dataset with the specified data_format and and sets column widths
+    ## sets each data column with the specified data_format and its column width
     for col_num, width in enumerate(width_list):    
-        sheet.set_column(col_num + num_row_indices + column_offset, col_num + df_column_count + column_offset, width, data_format)
+        set_column_spec(sheet, col_num + num_row_indices + column_offset, col_num + num_row_indices + column_offset, width, \
+            data_format)
 
 
 def set_col_data_type(df, wb, sheet, col_name, data_type, col_width_method=None, col_width_num=14, column_offset=0, \
-    text_wrap=False, wrap_rows=2):
+    text_wrap=False, wrap_rows=2, layout=None):
 
     # This function will apply the specified formatting to the specified column
     ## Can work on dataframes with single row index and single row of column headers
@@ -1615,48 +1863,24 @@ def set_col_data_type(df, wb, sheet, col_name, data_type, col_width_method=None,
     ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
     ### coL_width_method is how the width is set. defaults to None, which itself defaults to the default col_width_num (14):
     #       'header' sets width based on the length of column names
-    #       'data' sets width based on the length of the longest data point in the column
+    #       'data' sets width based on the length of the longest data point in the column once formatted
     #       'all' sets width based off the column name or longest data point, whichever is larger
     ### text_wrap specifies if you index headers were wrapped when applying header formatting. default is False
     ### wrap_rows is how many rows wide the wrapped header text should be. default is 2
     ####        should be used if text_wrap is True
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
     
     from math import ceil
+    from utility_functions import get_data_type_format, DATA_TYPE_FORMATS, get_max_width, get_table_layout, set_column_spec
 
-    # list of valid dtype args
-    valid_dtypes = ['numeric','decimal_1','decimal_2','dollar','dollar_cents','percent','percent_1','percent_2','date',\
-        'date_alt','datetime','datetime_alt']
-
-    # this if statement sets the formatting based off the data_type argument
-    ## it will raise an error to tell the user if they have entered an invalid data_type argument
-    if data_type == 'numeric':
-        data_format = wb.add_format({'num_format':'#,##0'})
-    elif data_type == 'decimal_1':
-        data_format = wb.add_format({'num_format':'#,##0.0'})
-    elif data_type == 'decimal_2':
-        data_format = wb.add_format({'num_format':'#,##0.00'})
-    elif data_type == 'dollar':
-        data_format = wb.add_format({'num_format':'$#,##0'})
-    elif data_type == 'dollar_cents':
-        data_format = wb.add_format({'num_format':'$#,##0.00'})
-    elif data_type == 'percent':
-        data_format = wb.add_format({'num_format':'0%'})
-    elif data_type == 'percent_1':
-        data_format = wb.add_format({'num_format':'0.0%'})
-    elif data_type == 'percent_2':
-        data_format = wb.add_format({'num_format':'0.00%'})
-    elif data_type == 'date':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd'})
-    elif data_type == 'date_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy'})
-    elif data_type == 'datetime':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm'})
-    elif data_type == 'datetime_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM'})
-    elif data_type == 'text':
+    # get the formats for the data_type
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    if data_type == 'text':
         raise Exception('Data types are text by default! Function not needed.')
-    else:
-        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {valid_dtypes}")
+    elif data_type == None:
+        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {list(DATA_TYPE_FORMATS)}")
+    data_format = get_data_type_format(wb, data_type)
 
     # error if entered col_name not in dataframe
 
@@ -1687,61 +1911,173 @@ def set_col_data_type(df, wb, sheet, col_name, data_type, col_width_method=None,
     if text_wrap == True and " " in df[col_name].name:
         col_name_length = ceil(len(df[col_name])/wrap_rows) + 1
     else:
-        col_name_length = len(df[col_name].name) + 1
+        col_name_length = len(df[col_name].name) + 1
+
+    # getting length of longest data point, as shown with the data_type's number format, only when the method uses it
+    ## + 1 for 'wiggle room'
+    if col_width_method == 'data' or col_width_method == 'all':
+        max_data_width = get_max_width(df[col_name], data_type) + 1
+
+    if col_width_method == 'headers':
+        col_width = col_name_length
+    elif col_width_method == 'data':
+        col_width = max_data_width
+    elif col_width_method == 'all':
+        # get max of headers and data
+        col_width = max(col_name_length, max_data_width)
+    else:
+        col_width = col_width_num
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, column_offset=column_offset, layout=layout)
+    column_offset = layout.column_offset
+
+    # getting row indices count of the data to use to set lower bound for formatting
+    # if there is no index set to 0 (pandas has a default index with no name)
+    num_row_indices = layout.num_row_indices
+        
+    # iterate through columns until we get to the selected column:
+    for col_num, df_col_name in enumerate(df.columns):
+        # if the specified column name matches 
+        if df_col_name == col_name:
+            set_column_spec(sheet, col_num + num_row_indices + column_offset, col_num + num_row_indices + column_offset, col_width,\
+                data_format)
+        else:
+            pass
+
+
+def set_col_specs(df, wb, sheet, col_specs, col_width_num=14, column_offset=0, text_wrap=False, wrap_rows=2, \
+    sample_size=1000, sample_quantile=1.0, sample_cap=255, layout=None):
+
+    # This function will apply the data type formatting and width of many columns at once
+    ## it does the work of calling set_col_data_type and set_col_width for each column, but finds every column from one
+    ## lookup of the column names and sets next to each other columns with the same width and format with one set_column call
+    ## Can work on dataframes with any number of row indices and single row of column headers
+    ### Note: date formatting will only apply correctly to datetime columns
+
+    # ARGUMENTS
+    
+    ## MANDATORY:
+    ### df is your data from your dataframe
+    ### wb is your workbook
+    ### sheet is your worksheet
+    ### col_specs is a dictionary of {col_name: (data_type, width_method)}
+    #### data_type is the type of data (see set_col_data_type for the options). None or 'text' only sets the width
+    #### width_method is how the width is set:
+    #       None sets the width to col_width_num
+    #       'headers' sets width based on the length of column names
+    #       'data' sets width based on the length of the longest data point in the column once formatted
+    #       'all' sets width based off the column name or longest data point, whichever is larger
+    #       'sample' sets width like 'all', but estimates the longest data point from a sample of the column's values.
+    #           meant for very large dataframes
+
+    ## OPTIONAL:
+    ### col_width_num is the width of the columns with a width_method of None. defaults to 14
+    ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
+    ### text_wrap specifies if you index headers were wrapped when applying header formatting. default is False
+    ### wrap_rows is how many rows wide the wrapped header text should be. default is 2
+    ####        should be used if text_wrap is True
+    ### sample_size is the number of values sampled from a column when width_method is 'sample'. defaults to 1000
+    ### sample_quantile is the quantile of the sampled value lengths used when width_method is 'sample', ex 0.99 ignores the
+    ###     longest 1% of values. defaults to 1.0 (the longest sampled value)
+    ### sample_cap is the widest a column can be set from its data when width_method is 'sample'. defaults to 255
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+
+    from math import ceil
+    from utility_functions import get_data_type_format, DATA_TYPE_FORMATS, get_max_width, estimate_max_width, get_table_layout, \
+        get_column_spans, set_column_spec
+
+    # raise an error if col_specs is not a dictionary
+    if isinstance(col_specs, dict):
+        pass
+    else:
+        raise TypeError(f"col_specs must be a dictionary of {{col_name: (data_type, width_method)}}, not {type(col_specs).__name__}.")
 
-    # getting length of longest data point
-
-    # list of all column values
-    values = df[col_name].tolist()
-    # create empty list to store the lengths
-    value_lengths = []
-    # iterating over the values list:
-    for row_num, value in enumerate(values):
-            # get the length in characters of each value
-            length = len(str(value))
-            # add it to the value_lengths list
-            value_lengths.append(length)
-            if row_num + 1 == len(values):
-                # get the max width value
-                ## + 1 for 'wiggle room'
-                max_data_width = max(value_lengths) + 1
+    # create list of all valid methods
+    valid_methods = [None, 'headers', 'data', 'all', 'sample']
 
-    # get max of headers and data
-    max_all_lengths = max(col_name_length, max_data_width)
+    # get the positions of every column name once
+    ## a list of positions is kept for each name in case of duplicate column names
+    col_positions = {}
+    for col_num, df_col_name in enumerate(df.columns):
+        col_positions.setdefault(df_col_name, []).append(col_num)
 
-    if col_width_method == 'headers':
-        col_width = col_name_length
-    elif col_width_method == 'data':
-        col_width = max_data_width
-    elif col_width_method == 'all':
-        col_width = max_all_lengths
-    else:
-        col_width = col_width_num
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, column_offset=column_offset, layout=layout)
+    column_offset = layout.column_offset
 
     # getting row indices count of the data to use to set lower bound for formatting
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
-        
-    # iterate through columns until we get to the selected column:
-    for col_num, df_col_name in enumerate(df.columns):
-        # if the specified column name matches 
-        if df_col_name == col_name:
-            sheet.set_column(col_num + num_row_indices + column_offset, col_num + num_row_indices + column_offset, col_width,\
-                data_format)
+    num_row_indices = layout.num_row_indices
+
+    # create empty list to hold the (col_num, width, format) of each column
+    column_specs = []
+
+    # iterating over the column specs:
+    for col_name, col_spec in col_specs.items():
+        # error if entered col_name not in dataframe
+        if col_name not in col_positions:
+            raise ValueError(f"{col_name} not in dataframe. Columns in data are: {list(df.columns)}")
+        else:
+            pass
+
+        # error if the spec is not a (data_type, width_method) pair
+        if isinstance(col_spec, tuple) and len(col_spec) == 2:
+            data_type, width_method = col_spec
+        else:
+            raise TypeError(f"The spec for {col_name} must be a (data_type, width_method) tuple, not {col_spec}.")
+
+        # error if width_method not valid
+        if width_method not in valid_methods:
+            raise ValueError(f"{width_method} is not a valid method option, Valid methods are: {valid_methods}")
         else:
             pass
 
+        # get the format for the data_type
+        ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+        data_format = get_data_type_format(wb, data_type)
+
+        # create an object holding the length of the name of the column
+        ## + 1 for 'wiggle room'
+        if text_wrap == True and " " in str(col_name):
+            col_name_length = ceil(len(str(col_name))/wrap_rows) + 1
+        else:
+            col_name_length = len(str(col_name)) + 1
+
+        # iterating over the positions of the columns with that name:
+        for col_num in col_positions[col_name]:
+            # getting length of longest data point, as shown with the data_type's number format
+            ## + 1 for 'wiggle room'
+            if width_method == 'sample':
+                max_data_width = estimate_max_width(df.iloc[:, col_num], sample_size, sample_quantile, sample_cap) + 1
+            elif width_method == 'data' or width_method == 'all':
+                max_data_width = get_max_width(df.iloc[:, col_num], data_type) + 1
+
+            if width_method == 'headers':
+                col_width = col_name_length
+            elif width_method == 'data':
+                col_width = max_data_width
+            elif width_method == 'all' or width_method == 'sample':
+                col_width = max(col_name_length, max_data_width)
+            else:
+                col_width = col_width_num
+
+            column_specs.append((col_num + num_row_indices + column_offset, col_width, data_format))
+
+    # set each span of next to each other columns with the same width and format with one call
+    for first_col, last_col, col_width, data_format in get_column_spans(column_specs):
+        set_column_spec(sheet, first_col, last_col, col_width, data_format)
+
 
 ###                 ANY NUMBER ROW INDEX AND SINGLE COLUMNS INDEX DATAFRAMES                 ###
 
 
-def set_column_widths(df, wb, sheet, column_offset=0, method='headers', text_wrap=False, wrap_rows=2):
+def set_column_widths(df, wb, sheet, column_offset=0, method='headers', text_wrap=False, wrap_rows=2, \
+    sample_size=1000, sample_quantile=1.0, sample_cap=255, layout=None):
 
     import numpy as np
+    from utility_functions import get_column_widths, estimate_column_widths, get_table_layout, set_column_spec
 
     # adapted from a solution from dfresh22 found at 
     # https://stackoverflow.com/questions/29463274/simulate-autofit-column-in-xslxwriter
@@ -1763,14 +2099,22 @@ def set_column_widths(df, wb, sheet, column_offset=0, method='headers', text_wra
     #       'header' sets width based on the length of column names. is default
     #       'data' sets width based on the length of the longest data point in the column
     #       'all' sets width based off the column name or longest data point, whichever is larger
+    #       'sample' sets width like 'all', but estimates the longest data point from a sample of each column's values.
+    #           meant for very large dataframes
     ### text_wrap specifies if you index headers were wrapped when applying header formatting. default is False
     ### wrap_rows is how many rows wide the wrapped header text should be. default is 2
     ####        should be used if text_wrap is True
+    ### sample_size is the number of values sampled per column when method is 'sample'. defaults to 1000
+    ### sample_quantile is the quantile of the sampled value lengths used when method is 'sample', ex 0.99 ignores the
+    ###     longest 1% of values. defaults to 1.0 (the longest sampled value)
+    ### sample_cap is the widest a column can be set from its data when method is 'sample'. defaults to 255
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
     
     from math import ceil
 
     # list of valid method args
-    valid_methods = ['headers', 'data', 'all']
+    valid_methods = ['headers', 'data', 'all', 'sample']
 
     # error if valid method arg not used
     if method not in valid_methods:
@@ -1792,59 +2136,41 @@ def set_column_widths(df, wb, sheet, column_offset=0, method='headers', text_wra
     else:
         col_name_lengths = [len(name) + 1 for name in df.columns]
 
-    # create a list holding the max length of the data in each column
-    max_data_lengths = []
-        
-    # iterating over the data columns:    
-    for col in list(df):
-        # store their values in a list
-        values = df[col].tolist()
-        # create an empty list to store the lengths
-        value_lengths = []
-        # iterating over the values list:
-        for row_num, value in enumerate(values):
-            # get the length in characters of each value
-            length = len(str(value))
-            # add it to the value_lengths list
-            value_lengths.append(length)
-            # if it is the final iteration over the values with the completed value_lengths list for the column:
-            ## + 1 since python numbering starts at 0
-            if row_num + 1 == len(values):
-                # get the max width value
-                ## + 1 for 'wiggle room'
-                max_data_width = max(value_lengths) + 1
-                # append it to our data lengths list
-                max_data_lengths.append(max_data_width)   
+    # create a list holding the max length of the data in each column, only when the method uses it
+    ## + 1 for 'wiggle room'
+    if method == 'sample':
+        # estimate them from a sample of each column
+        max_data_lengths = [width + 1 for width in estimate_column_widths(df, sample_size, sample_quantile, sample_cap)]
+    elif method == 'data' or method == 'all':
+        max_data_lengths = [width + 1 for width in get_column_widths(df)]
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, column_offset=column_offset, layout=layout)
+    column_offset = layout.column_offset
 
-    # create a list for the max of data and column width, whichever is greater
-    max_all_lengths = np.maximum(col_name_lengths, max_data_lengths)
-    
     # get the count of how many row indices they are so we can skip those columns in the for loop
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     # choosing list to use based on method:
     if method == 'headers':
         width_list = col_name_lengths
     elif method == 'data':
         width_list = max_data_lengths
-    elif method ==  'all':
-        width_list = max_all_lengths 
+    elif method == 'all' or method == 'sample':
+        # the max of data and column width, whichever is greater
+        width_list = np.maximum(col_name_lengths, max_data_lengths)
 
     # iterating over the df columns:
     for col_num, width in enumerate(width_list):
         # apply the matching width to the column
-        sheet.set_column(col_num + num_row_indices + column_offset, col_num + num_row_indices + column_offset, width)  
+        set_column_spec(sheet, col_num + num_row_indices + column_offset, col_num + num_row_indices + column_offset, width)  
 
 
 ###                 ROW MULTIINDEX AND SINGLE COLUMNS INDEX DATAFRAMES                 ###
 
 def insert_row_multiindex_data(df, wb, sheet, header_offset=0, column_offset=0, data_type=None, replace_nulls=True, null_value='-', \
-    null_align='center'):
+    null_align='center', bulk_write=True, col_width_method=None, set_widths=True, col_data_types=None, layout=None):
 
     # This function will insert your data in desired cells and underline the last row per major index category
     ## Can be used on any dataframe
@@ -1876,16 +2202,34 @@ def insert_row_multiindex_data(df, wb, sheet, header_offset=0, column_offset=0,
     ### replace_nulls will replace null values with the specified replacement. defaults to true
     ### null_value is what replaces nulls. defaults to '-'
     ### null_align is the horizontal alignment for null values. defaults to center
+    ### bulk_write will write each run of cells that share a format with one write_column call instead of one write call
+    ###     per cell. defaults to True
+    ### col_width_method will measure each data column (in one vectorized pass, using the null mask made for writing) so
+    ###     set_column_widths does not need to be called after the insert. the widths are returned as a list, one per data
+    ###     column. defaults to None (no widths):
+    #       'headers' sets width based on the length of column names
+    #       'data' sets width based on the length of the longest data point in the column (in its data_type format)
+    #       'all' sets width based off the column name or longest data point, whichever is larger
+    ### set_widths will apply the measured widths with set_column. set to False to only return them. defaults to True
+    ### col_data_types is a dictionary of {col_name: data_type} to give columns their own data_type. each cell is then
+    ###     written once with its final format, instead of calling set_row_multiindex_col_dtype() for each column afterwards.
+    ###     columns not in it use data_type. defaults to None
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
-    import pandas as pd
+    from utility_functions import get_null_mask, get_data_type_format, get_insert_widths, get_table_layout, write_table_data, \
+        get_col_data_types, set_column_spec
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
 
     #getting count of row_indices
     # if there is no index raise error
-    if None in df.index.names:
+    if layout.num_row_indices == 0:
         raise Exception("No index set on dataframe.")
     else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+        num_row_indices = layout.num_row_indices
 
     # exit function with error if it is not a multiindex
     if num_row_indices == 1:
@@ -1901,68 +2245,38 @@ def insert_row_multiindex_data(df, wb, sheet, header_offset=0, column_offset=0,
     else:
         raise ValueError(f"{null_align} is not a valid alignment option. Valid options are {valid_align}")
 
-    if null_align == 'center':
-        null_format = wb.add_format({'align':'center'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'center'})
-    elif null_align == 'left':
-        null_format = wb.add_format({'align':'left'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'left'})
-    elif null_align == 'right':
-        null_format = wb.add_format({'align':'right'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'right'})
-
-    # list of valid dtype args
-    valid_dtypes = ['numeric','decimal_1','decimal_2','dollar','dollar_cents','percent','percent_1','percent_2','date',\
-        'date_alt','datetime','datetime_alt']
-
-    # this if statement sets the formatting based off the data_type argument
-    ## it will raise an error to tell the user if they have entered an invalid data_type argument
-    if data_type == 'numeric':
-        data_format = wb.add_format({'num_format':'#,##0'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0','bottom':True})
-    elif data_type == 'decimal_1':
-        data_format = wb.add_format({'num_format':'#,##0.0'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0.0','bottom':True})
-    elif data_type == 'decimal_2':
-        data_format = wb.add_format({'num_format':'#,##0.00'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0.00','bottom':True})
-    elif data_type == 'dollar':
-        data_format = wb.add_format({'num_format':'$#,##0'})
-        data_bottom_format = wb.add_format({'num_format':'$#,##0','bottom':True})
-    elif data_type == 'dollar_cents':
-        data_format = wb.add_format({'num_format':'$#,##0.00'})
-        data_bottom_format = wb.add_format({'num_format':'$#,##0.00','bottom':True})
-    elif data_type == 'percent':
-        data_format = wb.add_format({'num_format':'0%'})
-        data_bottom_format = wb.add_format({'num_format':'0%','bottom':True})
-    elif data_type == 'percent_1':
-        data_format = wb.add_format({'num_format':'0.0%'})
-        data_bottom_format = wb.add_format({'num_format':'0.0%','bottom':True})
-    elif data_type == 'percent_2':
-        data_format = wb.add_format({'num_format':'0.00%'})
-        data_bottom_format = wb.add_format({'num_format':'0.00%','bottom':True})
-    elif data_type == 'date':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd'})
-        data_bottom_format = wb.add_format({'num_format':'yyyy-mm-dd','bottom':True})
-    elif data_type == 'date_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy'})
-        data_bottom_format = wb.add_format({'num_format':'m/d/yyyy','bottom':True})
-    elif data_type == 'datetime':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm'})
-        data_bottom_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','bottom':True})
-    elif data_type == 'datetime_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM'})
-        data_bottom_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','bottom':True})
-    elif data_type == 'text':
-        print("Data types are text by default. No error, continuing function.")
-        data_bottom_format = wb.add_format({'bottom':True})
-    elif data_type == None:
-        data_bottom_format = wb.add_format({'bottom':True})
+    # raise an error if the bulk_write input is not valid
+    if bulk_write == True:
+        pass
+    elif bulk_write == False:
+        pass
+    else:
+        raise ValueError(f"{bulk_write} is not a valid bulk_write option. Valid arguments are True, False.")
+
+    # check for valid col_width_method input
+    valid_width_methods = [None,'headers','data','all']
+
+    if col_width_method in valid_width_methods:
+        pass
+    else:
+        raise ValueError(f"{col_width_method} is not a valid col_width_method option. Valid options are {valid_width_methods}")
+
+    # raise an error if the set_widths input is not valid
+    if set_widths == True:
+        pass
+    elif set_widths == False:
+        pass
     else:
-        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {valid_dtypes}")
+        raise ValueError(f"{set_widths} is not a valid set_widths option. Valid arguments are True, False.")
 
-    # determining how many rows are in the major (leftmost) index by dividing the total row count by index[0] unique values
-    rows_per_major_index = int(len(df)/len(df.index.unique(0)))
+    # check the data_type before anything is written
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    if data_type == 'text':
+        print("Data types are text by default. No error, continuing function.")
+    get_data_type_format(wb, data_type)
+    # get the data_type of each column from col_data_types
+    ## get_col_data_types will raise an error for a col_name not in the dataframe or an invalid data_type
+    data_types = get_col_data_types(df, data_type, col_data_types)
 
     # getting the column count
 
@@ -1971,66 +2285,28 @@ def insert_row_multiindex_data(df, wb, sheet, header_offset=0, column_offset=0,
     # adding num_cols and number of row indices together for total column count
     total_cols = num_row_indices + num_cols
 
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1
-    
-
-    # iterating over data columns excluding row index columns:
-    for col_num in range(num_row_indices, total_cols):
-        # iterating over rows containing data:
-        for row_num, value in enumerate(df.values):
-            # if no data type is assigned:
-            if data_type == None or data_type == 'text':
-                # for the last row per first index category:
-                if (row_num + 1)%rows_per_major_index==0:
-                    # we check if the value of the cell is null
-                    if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                        # insert null value and apply bottom border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value,\
-                            null_bottom_format)
-                    else:
-                        # insert data with a bottom border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value[col_num-num_row_indices],\
-                            data_bottom_format)
-                else:
-                    # we check if the value of the cell is null
-                    if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                        # insert null value and apply null format
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value,\
-                            null_format)
-                    else:
-                        # insert data with no formatting
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value[col_num-num_row_indices])
-            else:
-                # else for the last row per first index category:
-                if (row_num + 1)%rows_per_major_index==0:
-                    # we check if the value of the cell is null
-                    if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                        # insert null value and apply bottom border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value,\
-                            null_bottom_format)    
-                    else:
-                        # insert the data and apply the specified formatting with bottom border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                            value[col_num-num_row_indices], data_bottom_format)
-                else:
-                    # we check if the value of the cell is null
-                    if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                        # insert null value and apply null format
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value,\
-                            null_format)
-                    else:
-                        # insert the data and apply specified formatting (no border)
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                            value[col_num-num_row_indices], data_format)
+    # find the cells to be replaced with null_value once for the whole dataframe
+    null_mask = get_null_mask(df, replace_nulls)
+
+    # measure the data columns from the same null mask that is used for writing
+    if col_width_method == None:
+        col_widths = None
+    else:
+        col_widths = get_insert_widths(df, null_mask, data_types, null_value, col_width_method)
+        if set_widths == True:
+            # iterating over data columns excluding row index columns:
+            for col_num in range(num_row_indices, total_cols):
+                set_column_spec(sheet, col_num + column_offset, col_num + column_offset, col_widths[col_num-num_row_indices])
+
+    # write the data, with a bottom border on the last row per major index category
+    write_table_data(wb, sheet, df, layout, data_types, replace_nulls, null_value, null_align, row_borders=True, \
+        bulk_write=bulk_write, null_mask=null_mask)
+
+    return col_widths
 
 
 def set_row_multiindex_col_dtype(df, wb, sheet, col_name, data_type, column_offset=0, header_offset=0, replace_nulls=True, \
-    null_value='-', null_align='center'):
+    null_value='-', null_align='center', layout=None):
 
     # This function will apply the specified formatting to the specified column
     ## Can work on dataframes with a row multiindex and any number of column header levels
@@ -2063,14 +2339,21 @@ def set_row_multiindex_col_dtype(df, wb, sheet, col_name, data_type, column_offs
     ### replace_nulls will replace null values with the specified replacement. defaults to true
     ### null_value is what replaces nulls. defaults to '-'
     ### null_align is the horizontal alignment for null values. defaults to center
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+
+    from utility_functions import get_data_type_format, DATA_TYPE_FORMATS, get_table_layout, write_table_data
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
 
     #getting count of row_indices
     # if there is no index raise error
-    if None in df.index.names:
+    if layout.num_row_indices == 0:
         raise Exception("No index set on dataframe.")
     else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+        num_row_indices = layout.num_row_indices
 
     # exit function with error if it is not a multiindex
     if num_row_indices == 1:
@@ -2078,8 +2361,6 @@ def set_row_multiindex_col_dtype(df, wb, sheet, col_name, data_type, column_offs
     else:
         pass
 
-    import pandas as pd
-
     # check for valid alignment input
     valid_align = ['center','left','right']
 
@@ -2088,62 +2369,11 @@ def set_row_multiindex_col_dtype(df, wb, sheet, col_name, data_type, column_offs
     else:
         raise ValueError(f"{null_align} is not a valid alignment option. Valid options are {valid_align}")
 
-    if null_align == 'center':
-        null_format = wb.add_format({'align':'center'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'center'})
-    elif null_align == 'left':
-        null_format = wb.add_format({'align':'left'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'left'})
-    elif null_align == 'right':
-        null_format = wb.add_format({'align':'right'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'right'})
-
-    # list of valid dtype args
-    valid_dtypes = ['numeric','decimal_1','decimal_2','dollar','dollar_cents','percent','percent_1','percent_2','date',\
-        'date_alt','datetime','datetime_alt']
-
-    # this if statement sets the formatting based off the data_type argument
-    ## it will raise an error to tell the user if they have entered an invalid data_type argument
-    if data_type == 'numeric':
-        data_format = wb.add_format({'num_format':'#,##0'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0','bottom':True})
-    elif data_type == 'decimal_1':
-        data_format = wb.add_format({'num_format':'#,##0.0'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0.0','bottom':True})
-    elif data_type == 'decimal_2':
-        data_format = wb.add_format({'num_format':'#,##0.00'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0.00','bottom':True})
-    elif data_type == 'dollar':
-        data_format = wb.add_format({'num_format':'$#,##0'})
-        data_bottom_format = wb.add_format({'num_format':'$#,##0','bottom':True})
-    elif data_type == 'dollar_cents':
-        data_format = wb.add_format({'num_format':'$#,##0.00'})
-        data_bottom_format = wb.add_format({'num_format':'$#,##0.00','bottom':True})
-    elif data_type == 'percent':
-        data_format = wb.add_format({'num_format':'0%'})
-        data_bottom_format = wb.add_format({'num_format':'0%','bottom':True})
-    elif data_type == 'percent_1':
-        data_format = wb.add_format({'num_format':'0.0%'})
-        data_bottom_format = wb.add_format({'num_format':'0.0%','bottom':True})
-    elif data_type == 'percent_2':
-        data_format = wb.add_format({'num_format':'0.00%'})
-        data_bottom_format = wb.add_format({'num_format':'0.00%','bottom':True})
-    elif data_type == 'date':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd'})
-        data_bottom_format = wb.add_format({'num_format':'yyyy-mm-dd','bottom':True})
-    elif data_type == 'date_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy'})
-        data_bottom_format = wb.add_format({'num_format':'m/d/yyyy','bottom':True})
-    elif data_type == 'datetime':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm'})
-        data_bottom_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','bottom':True})
-    elif data_type == 'datetime_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM'})
-        data_bottom_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','bottom':True})
-    elif data_type == 'text':
-        data_bottom_format = wb.add_format({'bottom':True})
-    else:
-        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {valid_dtypes}")
+    # check the data_type before anything is written
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    if data_type == None:
+        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {list(DATA_TYPE_FORMATS)}")
+    get_data_type_format(wb, data_type)
 
     # error if entered col_name not in dataframe
 
@@ -2155,83 +2385,30 @@ def set_row_multiindex_col_dtype(df, wb, sheet, col_name, data_type, column_offs
     else:
         pass
 
-    # determining how many rows are in the major (leftmost) index by dividing the total row count by index[0] unique values
-    rows_per_major_index = int(len(df)/len(df.index.unique(0)))
-
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1
+    # getting the positions of the columns matching the specified column name
+    data_cols = [col_num for col_num, df_col_name in enumerate(df.columns) if df_col_name == col_name]
 
-    # iterate through columns until we get to the selected column:
-    for col_num, df_col_name in enumerate(df.columns):
-        # if the specified column name matches 
-        if df_col_name == col_name:
-            # iterating over rows containing data:
-            for row_num, value in enumerate(df.values):
-                if data_type == 'text':
-                    # for the last row per first index category:
-                    if (row_num + 1)%rows_per_major_index==0:
-                        # if the value is null
-                        if pd.isna(value[col_num]) and replace_nulls == True:
-                            # insert null value and apply bottom formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                                null_value, null_bottom_format)
-                        else:
-                            # insert data with a bottom border
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                                value[col_num], data_bottom_format)
-                    else:
-                        # if the value is null
-                        if pd.isna(value[col_num]) and replace_nulls == True:
-                            # insert null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                                null_value, null_format)
-                        else:
-                            # insert data with no formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                                value[col_num])
-                else:
-                    # else for the last row per first index category:
-                    if (row_num + 1)%rows_per_major_index==0:
-                        # if the value is null
-                        if pd.isna(value[col_num]) and replace_nulls == True:
-                            # insert null value and apply bottom formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                                null_value, null_bottom_format)
-                        else:
-                            # insert the data and apply the specified formatting with bottom border
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                                value[col_num], data_bottom_format)
-                    else:
-                        # if the value is null
-                        if pd.isna(value[col_num]) and replace_nulls == True:
-                            # insert null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                                null_value, null_format)
-                        else:
-                            # insert the data and apply specified formatting (no border)
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                                value[col_num], data_format)
-        else:
-            pass   
+    # write the matching columns, with a bottom border on the last row per major index category
+    write_table_data(wb, sheet, df, layout, data_type, replace_nulls, null_value, null_align, row_borders=True, \
+        data_cols=data_cols)
 
 
-###                 ANY NUMBER ROW INDICES AND TWO LEVEL COLUMN MULITINDEX DATAFRAMES                 ###
+###                 ANY NUMBER ROW INDICES AND TWO OR MORE LEVEL COLUMN MULITINDEX DATAFRAMES                 ###
 
 
-def set_multiindex_column_widths(df, wb, sheet, column_offset=0, method='headers', text_wrap=False, wrap_rows=2):
+def set_multiindex_column_widths(df, wb, sheet, column_offset=0, method='headers', text_wrap=False, wrap_rows=2, \
+    sample_size=1000, sample_quantile=1.0, sample_cap=255, layout=None):
 
     import numpy as np
     from math import ceil
+    from utility_functions import get_column_widths, estimate_column_widths, get_table_layout, set_column_spec
     # adapted from a solution from dfresh22 found at 
     # https://stackoverflow.com/questions/29463274/simulate-autofit-column-in-xslxwriter
 
     # This function will automatically make all columns wide enough for their full column names to appear without being cut off
     ## Can be used for width based on data or data and header though
-    ## Meant for use on data with two header rows (a two level column index), but any number of row indices
+    ## Meant for use on data with two or more header rows (a column multiindex), but any number of row indices
+    ## widths are set from the labels of the last header row
 
     # ARGUMENTS
     
@@ -2246,8 +2423,16 @@ def set_multiindex_column_widths(df, wb, sheet, column_offset=0, method='headers
     #       'header' sets width based on the length of column names. is default
     #       'data' sets width based on the length of the longest data point in the column
     #       'all' sets width based off the column name or longest data point, whichever is larger
+    #       'sample' sets width like 'all', but estimates the longest data point from a sample of each column's values.
+    #           meant for very large dataframes
     ### text_wrap will wrap text in headers when True
     ### wrap_rows is how many rows wide the wrapped text should be. default is 2
+    ### sample_size is the number of values sampled per column when method is 'sample'. defaults to 1000
+    ### sample_quantile is the quantile of the sampled value lengths used when method is 'sample', ex 0.99 ignores the
+    ###     longest 1% of values. defaults to 1.0 (the longest sampled value)
+    ### sample_cap is the widest a column can be set from its data when method is 'sample'. defaults to 255
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
     # check to make sure column_offset input is valid
     ## if column_offset is not an integer, raise an error
@@ -2264,7 +2449,7 @@ def set_multiindex_column_widths(df, wb, sheet, column_offset=0, method='headers
         pass
 
     # list of valid method args
-    valid_methods = ['headers', 'data', 'all']
+    valid_methods = ['headers', 'data', 'all', 'sample']
 
     # error if valid method arg not used
     if method not in valid_methods:
@@ -2275,79 +2460,61 @@ def set_multiindex_column_widths(df, wb, sheet, column_offset=0, method='headers
 
     # create a list holding the length of the name of each column
     ## + 1 for 'wiggle room'
-    #col_name_lengths = [len(name) + 1 for name in df.columns.get_level_values(1)]
+    #col_name_lengths = [len(name) + 1 for name in df.columns.get_level_values(-1)]
 
-    # create a list holding the max length of the data in each column
-    max_data_lengths = []
-        
-    # iterating over the data columns:    
-    for col in list(df):
-        # store their values in a list
-        values = df[col].tolist()
-        # create an empty list to store the lengths
-        value_lengths = []
-        # iterating over the values list:
-        for row_num, value in enumerate(values):
-            # get the length in characters of each value
-            length = len(str(value))
-            # add it to the value_lengths list
-            value_lengths.append(length)
-            # if it is the final iteration over the values with the completed value_lengths list for the column:
-            ## + 1 since python numbering starts at 0
-            if row_num + 1 == len(values):
-                # get the max width value
-                ## + 1 for 'wiggle room'
-                max_data_width = max(value_lengths) + 1
-                # append it to our data lengths list
-                max_data_lengths.append(max_data_width)   
+    # create a list holding the max length of the data in each column, only when the method uses it
+    ## + 1 for 'wiggle room'
+    if method == 'sample':
+        # estimate them from a sample of each column
+        max_data_lengths = [width + 1 for width in estimate_column_widths(df, sample_size, sample_quantile, sample_cap)]
+    elif method == 'data' or method == 'all':
+        max_data_lengths = [width + 1 for width in get_column_widths(df)]
 
         
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, column_offset=column_offset, layout=layout)
+    column_offset = layout.column_offset
+
     # get the count of how many row indices they are so we can skip those columns in the for loop
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     # adjust col widths for text wrapping of headers
     if text_wrap == True:
         # if there is text wrapping, the width of columns is their previous col_name length divided by the number of rows for wrapping 
         ## rounded up so that it is an integer value to prevent errors
         col_name_lengths = []
-        for name in df.columns.get_level_values(1):
+        for name in df.columns.get_level_values(-1):
             if " " in name:
                 length = ceil(len(name)/wrap_rows) + 1
             else:
                 length = len(name) + 1
             col_name_lengths.append(length)
     elif text_wrap==False:
-        col_name_lengths = [len(name) + 1 for name in df.columns.get_level_values(1)]
+        col_name_lengths = [len(name) + 1 for name in df.columns.get_level_values(-1)]
     else:
         raise ValueError(f"{text_wrap} is not not a valid text_wrap argument. text_wrap must be True or False.")
 
-    # create a list for the max of data and column width, whichever is greater
-    max_all_lengths = np.maximum(col_name_lengths, max_data_lengths)
-
     # choosing list to use based on method:
     if method == 'headers':
         width_list = col_name_lengths
     elif method == 'data':
         width_list = max_data_lengths
-    elif method ==  'all':
-        width_list = max_all_lengths 
+    elif method == 'all' or method == 'sample':
+        # the max of data and column width, whichever is greater
+        width_list = np.maximum(col_name_lengths, max_data_lengths)
 
     # iterating over the df columns:
     for col_num, width in enumerate(width_list):
         # apply the matching width to the column
-        sheet.set_column(col_num + num_row_indices + column_offset, col_num + num_row_indices + column_offset, width)
+        set_column_spec(sheet, col_num + num_row_indices + column_offset, col_num + num_row_indices + column_offset, width)
 
 
-###                 NO OR SINGLE ROW INDEX AND TWO LEVEL COLUMN MULITINDEX DATAFRAMES                 ###
+###                 NO OR SINGLE ROW INDEX AND TWO OR MORE LEVEL COLUMN MULITINDEX DATAFRAMES                 ###
 
 
 def insert_col_multiindex_data(df, wb, sheet, header_offset=0, column_offset=0, data_type=None, replace_nulls=True, null_value='-', \
-    null_align='center'):
+    null_align='center', bulk_write=True, col_data_types=None, layout=None):
 
     # This function will insert your data in desired cells and apply a right border to the last column of each first level category
     ## Can be used on any dataframe
@@ -2379,30 +2546,37 @@ def insert_col_multiindex_data(df, wb, sheet, header_offset=0, column_offset=0,
     ### replace_nulls will replace null values with the specified replacement. defaults to true
     ### null_value is what replaces nulls. defaults to '-'
     ### null_align is the horizontal alignment for null values. defaults to center
-
-    import pandas as pd
-
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
+    ### bulk_write will write each run of cells that share a format with one write_column call instead of one write call
+    ###     per cell. defaults to True
+    ### col_data_types is a dictionary of {col_name: data_type} to give columns their own data_type. each cell is then
+    ###     written once with its final format, instead of calling set_col_multiindex_dtype() for each column afterwards.
+    ###     columns not in it use data_type. defaults to None
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+
+    from utility_functions import get_data_type_format, get_table_layout, write_table_data, \
+        get_col_data_types
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
+    # raise an error if it is not a column multiindex
+    if num_col_indices == 1:
         raise Exception('Data does not have a columns multiindex')
 
-    # error if there are not 2 column header rows
-    if num_col_indices == 2:
+    # error if there are not at least 2 column header rows
+    if num_col_indices >= 2:
         pass 
     else:
-        raise Exception(f"Function is only meant for datasets with two header rows. \
+        raise Exception(f"Function is only meant for datasets with two or more header rows. \
             The number of header rows your data has is {num_col_indices}.")
 
     #getting count of row_indices
     # if there is no index set to 0
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     # error if it is a row multiindex
     if num_row_indices > 1:
@@ -2418,130 +2592,30 @@ def insert_col_multiindex_data(df, wb, sheet, header_offset=0, column_offset=0,
     else:
         raise ValueError(f"{null_align} is not a valid alignment option. Valid options are {valid_align}")
 
-    if null_align == 'center':
-        null_format = wb.add_format({'align':'center'})
-        null_right_format = wb.add_format({'right':True, 'align':'center'})
-    elif null_align == 'left':
-        null_format = wb.add_format({'align':'left'})
-        null_right_format = wb.add_format({'right':True, 'align':'left'})
-    elif null_align == 'right':
-        null_format = wb.add_format({'align':'right'})
-        null_right_format = wb.add_format({'right':True, 'align':'right'})
-
-
-    # list of valid dtype args
-    valid_dtypes = ['numeric','decimal_1','decimal_2','dollar','dollar_cents','percent','percent_1','percent_2','date',\
-        'date_alt','datetime','datetime_alt']
-
-    # this if statement sets the formatting based off the data_type argument
-    ## it will raise an error to tell the user if they have entered an invalid data_type argument
-    if data_type == 'numeric':
-        data_format = wb.add_format({'num_format':'#,##0'})
-        data_right_format = wb.add_format({'num_format':'#,##0','right':True})
-    elif data_type == 'decimal_1':
-        data_format = wb.add_format({'num_format':'#,##0.0'})
-        data_right_format = wb.add_format({'num_format':'#,##0.0','right':True})
-    elif data_type == 'decimal_2':
-        data_format = wb.add_format({'num_format':'#,##0.00'})
-        data_right_format = wb.add_format({'num_format':'#,##0.00','right':True})
-    elif data_type == 'dollar':
-        data_format = wb.add_format({'num_format':'$#,##0'})
-        data_right_format = wb.add_format({'num_format':'$#,##0','right':True})
-    elif data_type == 'dollar_cents':
-        data_format = wb.add_format({'num_format':'$#,##0.00'})
-        data_right_format = wb.add_format({'num_format':'$#,##0.00','right':True})
-    elif data_type == 'percent':
-        data_format = wb.add_format({'num_format':'0%'})
-        data_right_format = wb.add_format({'num_format':'0%','right':True})
-    elif data_type == 'percent_1':
-        data_format = wb.add_format({'num_format':'0.0%'})
-        data_right_format = wb.add_format({'num_format':'0.0%','right':True})
-    elif data_type == 'percent_2':
-        data_format = wb.add_format({'num_format':'0.00%'})
-        data_right_format = wb.add_format({'num_format':'0.00%','right':True})
-    elif data_type == 'date':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd'})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd','right':True})
-    elif data_type == 'date_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy'})
-        data_right_format = wb.add_format({'num_format':'m/d/yyyy','right':True})
-    elif data_type == 'datetime':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm'})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','right':True})
-    elif data_type == 'datetime_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM'})
-        data_right_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','right':True})
-    elif data_type == 'text':
-        print("Data types are text by default. No error, continuing function.")
-        data_right_format = wb.add_format({'right':True})
-    elif data_type == None:
-        data_right_format = wb.add_format({'right':True})
+    # raise an error if the bulk_write input is not valid
+    if bulk_write == True:
+        pass
+    elif bulk_write == False:
+        pass
     else:
-        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {valid_dtypes}")
+        raise ValueError(f"{bulk_write} is not a valid bulk_write option. Valid arguments are True, False.")
 
-    ## number of header row 2 values which are what we need to loop over
-    header2_n = df.columns.levshape[1]
-
-    # getting the column count
+    # check the data_type before anything is written
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    if data_type == 'text':
+        print("Data types are text by default. No error, continuing function.")
+    get_data_type_format(wb, data_type)
+    # get the data_type of each column from col_data_types
+    ## get_col_data_types will raise an error for a col_name not in the dataframe or an invalid data_type
+    data_types = get_col_data_types(df, data_type, col_data_types)
 
-    # getting the count of regular columns
-    num_cols = len(df.columns)
-    # adding num_cols and number of row indices together for total column count
-    total_cols = num_row_indices + num_cols
-        
+    # write the data, with a right border on the last column per header row 1 category
+    write_table_data(wb, sheet, df, layout, data_types, replace_nulls, null_value, null_align, col_borders=True, \
+        bulk_write=bulk_write)
 
-    # iterating over data columns excluding row index columns:
-    for col_num in range(num_row_indices, total_cols):
-        # iterating over rows containing data:
-        for row_num, value in enumerate(df.values):
-            # if no data type is assigned:
-            if data_type == None or data_type == 'text':
-                # for the last row per first index category:
-                if (col_num)%header2_n==0:
-                    # if the value is null
-                    if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                        # insert null value and apply right border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value,\
-                            null_right_format)
-                    else:
-                        # insert data with a bottom border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value[col_num-num_row_indices],\
-                            data_right_format)
-                else:
-                    # if the value is null
-                    if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                        # insert null value and apply null format
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value,\
-                            null_format)
-                    else:
-                        # insert data with no formatting
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, value[col_num-num_row_indices])
-            else:
-                # else for the last row per first index category:
-                if (col_num)%header2_n==0:
-                    # if the value is null
-                    if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                        # insert null value and apply right border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value,\
-                            null_right_format)
-                    else:
-                        # insert the data and apply the specified formatting with bottom border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                            value[col_num-num_row_indices], data_right_format)
-                else:
-                    # if the value is null
-                    if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                        # insert null value and apply null format
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value,\
-                            null_format)
-                    else:
-                        # insert the data and apply specified formatting (no border)
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                            value[col_num-num_row_indices], data_format)
-                    
 
 def set_col_multiindex_dtype(df, wb, sheet, col_name, data_type, column_offset=0, header_offset=0, replace_nulls=True, \
-    null_value='-', null_align='center'):
+    null_value='-', null_align='center', layout=None):
 
     # This function will apply the specified formatting to the all columns in column level 2 matching the column name
     ## Can work on dataframes with any number of row indices and two column header levels
@@ -2579,8 +2653,10 @@ def set_col_multiindex_dtype(df, wb, sheet, col_name, data_type, column_offset=0
     ### replace_nulls will replace null values with the specified replacement. defaults to true
     ### null_value is what replaces nulls. defaults to '-'
     ### null_align is the horizontal alignment for null values. defaults to center
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
-    import pandas as pd
+    from utility_functions import get_data_type_format, DATA_TYPE_FORMATS, get_table_layout, write_table_data
 
     # check for valid alignment input
     valid_align = ['center','left','right']
@@ -2590,141 +2666,55 @@ def set_col_multiindex_dtype(df, wb, sheet, col_name, data_type, column_offset=0
     else:
         raise ValueError(f"{null_align} is not a valid alignment option. Valid options are {valid_align}")
 
-    if null_align == 'center':
-        null_format = wb.add_format({'align':'center'})
-        null_right_format = wb.add_format({'right':True, 'align':'center'})
-    elif null_align == 'left':
-        null_format = wb.add_format({'align':'left'})
-        null_right_format = wb.add_format({'right':True, 'align':'left'})
-    elif null_align == 'right':
-        null_format = wb.add_format({'align':'right'})
-        null_right_format = wb.add_format({'right':True, 'align':'right'})
-
-    # list of valid dtype args
-    valid_dtypes = ['numeric','decimal_1','decimal_2','dollar','dollar_cents','percent','percent_1','percent_2','date',\
-        'date_alt','datetime','datetime_alt']
-
-     # this if statement sets the formatting based off the data_type argument
-    ## it will raise an error to tell the user if they have entered an invalid data_type argument
-    if data_type == 'numeric':
-        data_format = wb.add_format({'num_format':'#,##0'})
-        data_right_format = wb.add_format({'num_format':'#,##0','right':True})
-    elif data_type == 'decimal_1':
-        data_format = wb.add_format({'num_format':'#,##0.0'})
-        data_right_format = wb.add_format({'num_format':'#,##0.0','right':True})
-    elif data_type == 'decimal_2':
-        data_format = wb.add_format({'num_format':'#,##0.00'})
-        data_right_format = wb.add_format({'num_format':'#,##0.00','right':True})
-    elif data_type == 'dollar':
-        data_format = wb.add_format({'num_format':'$#,##0'})
-        data_right_format = wb.add_format({'num_format':'$#,##0','right':True})
-    elif data_type == 'dollar_cents':
-        data_format = wb.add_format({'num_format':'$#,##0.00'})
-        data_right_format = wb.add_format({'num_format':'$#,##0.00','right':True})
-    elif data_type == 'percent':
-        data_format = wb.add_format({'num_format':'0%'})
-        data_right_format = wb.add_format({'num_format':'0%','right':True})
-    elif data_type == 'percent_1':
-        data_format = wb.add_format({'num_format':'0.0%'})
-        data_right_format = wb.add_format({'num_format':'0.0%','right':True})
-    elif data_type == 'percent_2':
-        data_format = wb.add_format({'num_format':'0.00%'})
-        data_right_format = wb.add_format({'num_format':'0.00%','right':True})
-    elif data_type == 'date':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd'})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd','right':True})
-    elif data_type == 'date_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy'})
-        data_right_format = wb.add_format({'num_format':'m/d/yyyy','right':True})
-    elif data_type == 'datetime':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm'})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','right':True})
-    elif data_type == 'datetime_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM'})
-        data_right_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','right':True})
-    elif data_type == 'text':
-        data_right_format = wb.add_format({'right':True})
-    else:
-        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {valid_dtypes}")
+    # check the data_type before anything is written
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    if data_type == None:
+        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {list(DATA_TYPE_FORMATS)}")
+    get_data_type_format(wb, data_type)
 
     # error if entered col_name not in dataframe
 
     # create list of all col_names
-    col_name_list = [col_name for col_name in df.columns.get_level_values(1)]
+    col_name_list = [col_name for col_name in df.columns.get_level_values(-1)]
 
     if col_name not in col_name_list:
         raise ValueError(f"{col_name} not in dataframe. Columns in data are: {col_name_list}")
     else:
         pass
 
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
     # getting row indices count of the data to use to set lower bound for formatting
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     # error if it is a row multiindex
     if num_row_indices > 1:
         raise Exception(f"Function is only meant with datasets with a single row index or no row index. \
             The number of row indices your data has is {num_row_indices}.")
 
-    # get number of unique columns in header row two
-    cols_per_major_col = len(df.columns.get_level_values(1).unique())
-
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
 
     # raise error if there are not the correct amount of header rows
-    if num_col_indices != 2:
-        raise Exception(f"Function is only meant for tables with two headers rows. {df} has {num_col_indices} header rows.")
+    if num_col_indices < 2:
+        raise Exception(f"Function is only meant for tables with two or more headers rows. {df} has {num_col_indices} header rows.")
 
-    # format data
+    # getting the positions of the columns whose full (multilevel) column name contains the specified column name
+    data_cols = [col_num for col_num, df_col_name in enumerate(df.columns) if col_name in df_col_name]
 
-    # iterating through the columns:
-    for col_num, df_col_name in enumerate(df.columns):
-        # if the full (multilevel) column name contains the specificed column name:
-        if col_name in df_col_name:
-            # if the column is the last column per set in the second header column groupings
-            if (col_num+1)%cols_per_major_col==0:
-                # iterate through rows containing data
-                for row_num, value in enumerate(df.values):
-                    # if the value is null
-                    if pd.isna(value[col_num]) and replace_nulls == True:
-                        # insert null value and apply right border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                           null_value, null_right_format)
-                    else:
-                        # insert data and formatting with right border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                            value[col_num], data_right_format)
-            else:
-                # for all other columns iterate through rows containing data
-                for row_num, value in enumerate(df.values):
-                    # if the value is null
-                    if pd.isna(value[col_num]) and replace_nulls == True:
-                        # insert null value and apply null format
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                           null_value, null_format)
-                    else:
-                        # insert data and formatting with no border
-                        sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                            value[col_num], data_format)
-        else:
-            # skip all columns that do not match specified column name
-            pass  
+    # write the matching columns, with a right border on the last column per header row 1 category
+    write_table_data(wb, sheet, df, layout, data_type, replace_nulls, null_value, null_align, col_borders=True, \
+        data_cols=data_cols)
 
 
-###                 ROW MULTIINDEX AND TWO LEVEL COLUMN MULITINDEX DATAFRAMES                 ###
+###                 ROW MULTIINDEX AND TWO OR MORE LEVEL COLUMN MULITINDEX DATAFRAMES                 ###
 
 
 def insert_4d_data(df, wb, sheet, header_offset=0, column_offset=0, data_type=None, replace_nulls=True, null_value='-', \
-    null_align='center'):
+    null_align='center', bulk_write=True, col_data_types=None, layout=None):
 
     # This function will insert your data in desired cells and apply a right border to the last column of each first level category
     # and a bottom border to the last row of each major (first) row category
@@ -2757,30 +2747,40 @@ def insert_4d_data(df, wb, sheet, header_offset=0, column_offset=0, data_type=No
     ### replace_nulls will replace null values with the specified replacement. defaults to true
     ### null_value is what replaces nulls. defaults to '-'
     ### null_align is the horizontal alignment for null values. defaults to center
-
-    import pandas as pd
-    
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
+    ### bulk_write will write each run of cells that share a format with one write_column call instead of one write call
+    ###     per cell. defaults to True
+    ### col_data_types is a dictionary of {col_name: data_type} to give columns their own data_type. each cell is then
+    ###     written once with its final format, instead of calling set_4d_multiindex_dtype() for each column afterwards.
+    ###     columns not in it use data_type. defaults to None
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+
+    from utility_functions import get_data_type_format, get_table_layout, write_table_data, \
+        get_col_data_types
+    
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
+    # raise an error if it is not a column multiindex
+    if num_col_indices == 1:
         raise Exception('Data does not have a columns multiindex')
 
-    # error if there are not 2 column header rows
-    if num_col_indices == 2:
+    # error if there are not at least 2 column header rows
+    if num_col_indices >= 2:
         pass 
     else:
-        raise Exception(f"Function is only meant for datasets with two header rows. \
+        raise Exception(f"Function is only meant for datasets with two or more header rows. \
             The number of header rows your data has is {num_col_indices}.")
 
     #getting count of row_indices
     # if there is no index raise error
-    if None in df.index.names:
+    if layout.num_row_indices == 0:
         raise Exception("No index set on dataframe.")
     else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+        num_row_indices = layout.num_row_indices
 
     # exit function with error if it is not a multiindex
     if num_row_indices == 1:
@@ -2796,213 +2796,31 @@ def insert_4d_data(df, wb, sheet, header_offset=0, column_offset=0, data_type=No
     else:
         raise ValueError(f"{null_align} is not a valid alignment option. Valid options are {valid_align}")
 
-    if null_align == 'center':
-        null_format = wb.add_format({'align':'center'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'center'})
-        null_right_format = wb.add_format({'right':True, 'align':'center'})
-        null_corner_format = wb.add_format({'right':True,'bottom':True, 'align':'center'})
-    elif null_align == 'left':
-        null_format = wb.add_format({'align':'left'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'left'})
-        null_right_format = wb.add_format({'right':True, 'align':'left'})
-        null_corner_format = wb.add_format({'right':True,'bottom':True, 'align':'left'})
-    elif null_align == 'right':
-        null_format = wb.add_format({'align':'right'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'right'})
-        null_right_format = wb.add_format({'right':True, 'align':'right'})
-        null_corner_format = wb.add_format({'right':True,'bottom':True, 'align':'right'})
-
-    # list of valid dtype args
-    valid_dtypes = ['numeric','decimal_1','decimal_2','dollar','dollar_cents','percent','percent_1','percent_2','date',\
-        'date_alt','datetime','datetime_alt']    
-
-    # this if statement sets the formatting based off the data_type argument
-    ## it will raise an error to tell the user if they have entered an invalid data_type argument
-    if data_type == 'numeric':
-        data_format = wb.add_format({'num_format':'#,##0'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0','bottom':True})
-        data_right_format = wb.add_format({'num_format':'#,##0','right':True})
-        data_corner_format = wb.add_format({'num_format':'#,##0','right':True,'bottom':True})
-    elif data_type == 'decimal_1':
-        data_format = wb.add_format({'num_format':'#,##0.0'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0.0','bottom':True})
-        data_right_format = wb.add_format({'num_format':'#,##0.0','right':True})
-        data_corner_format = wb.add_format({'num_format':'#,##0.0','right':True,'bottom':True})
-    elif data_type == 'decimal_2':
-        data_format = wb.add_format({'num_format':'#,##0.00'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0.00','bottom':True})
-        data_right_format = wb.add_format({'num_format':'#,##0.00','right':True})
-        data_right_format = wb.add_format({'num_format':'#,##0.00','right':True,'bottom':True})
-    elif data_type == 'dollar':
-        data_format = wb.add_format({'num_format':'$#,##0'})
-        data_bottom_format = wb.add_format({'num_format':'$#,##0','bottom':True})
-        data_right_format = wb.add_format({'num_format':'$#,##0','right':True})
-        data_corner_format = wb.add_format({'num_format':'$#,##0','right':True,'bottom':True})
-    elif data_type == 'dollar_cents':
-        data_format = wb.add_format({'num_format':'$#,##0.00'})
-        data_bottom_format = wb.add_format({'num_format':'$#,##0.00','bottom':True})
-        data_right_format = wb.add_format({'num_format':'$#,##0.00','right':True})
-        data_corner_format = wb.add_format({'num_format':'$#,##0.00','right':True,'bottom':True})
-    elif data_type == 'percent':
-        data_format = wb.add_format({'num_format':'0%'})
-        data_bottom_format = wb.add_format({'num_format':'0%','bottom':True})
-        data_right_format = wb.add_format({'num_format':'0%','right':True})
-        data_corner_format = wb.add_format({'num_format':'0%','right':True,'bottom':True})
-    elif data_type == 'percent_1':
-        data_format = wb.add_format({'num_format':'0.0%'})
-        data_bottom_format = wb.add_format({'num_format':'0.0%','bottom':True})
-        data_right_format = wb.add_format({'num_format':'0.0%','right':True})
-        data_corner_format = wb.add_format({'num_format':'0.0%','right':True,'bottom':True})
-    elif data_type == 'percent_2':
-        data_format = wb.add_format({'num_format':'0.00%'})
-        data_bottom_format = wb.add_format({'num_format':'0.00%','bottom':True})
-        data_right_format = wb.add_format({'num_format':'0.00%','right':True})
-        data_corner_format = wb.add_format({'num_format':'0.00%','right':True,'bottom':True})
-    elif data_type == 'date':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd'})
-        data_bottom_format = wb.add_format({'num_format':'yyyy-mm-dd','bottom':True})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd','right':True})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd','right':True,'bottom':True})
-    elif data_type == 'date_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy'})
-        data_bottom_format = wb.add_format({'num_format':'m/d/yyyy','bottom':True})
-        data_right_format = wb.add_format({'num_format':'m/d/yyyy','right':True})
-        data_corner_format = wb.add_format({'num_format':'m/d/yyyy','right':True,'bottom':True})
-    elif data_type == 'datetime':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm'})
-        data_bottom_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','bottom':True})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','right':True})
-        data_corner_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','right':True,'bottom':True})
-    elif data_type == 'datetime_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM'})
-        data_bottom_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','bottom':True})
-        data_right_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','right':True})
-        data_corner_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','right':True,'bottom':True})
-    elif data_type == 'text':
-        print("Data types are text by default. No error, continuing function.")
-        data_bottom_format = wb.add_format({'bottom':True})
-        data_right_format = wb.add_format({'right':True})
-        data_corner_format = wb.add_format({'right':True,'bottom':True})
-    elif data_type == None:
-        data_bottom_format = wb.add_format({'bottom':True})
-        data_right_format = wb.add_format({'right':True})
-        data_corner_format = wb.add_format({'right':True,'bottom':True})
+    # raise an error if the bulk_write input is not valid
+    if bulk_write == True:
+        pass
+    elif bulk_write == False:
+        pass
     else:
-        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {valid_dtypes}")
-
-    # determining how many rows are in the major (leftmost) index by dividing the total row count by index[0] unique values
-    rows_per_major_index = int(len(df)/len(df.index.unique(0)))
+        raise ValueError(f"{bulk_write} is not a valid bulk_write option. Valid arguments are True, False.")
 
-    # number of header row 2 values which are what we need to loop over
-    header2_n = df.columns.levshape[1]
-
-    # getting the column count
+    # check the data_type before anything is written
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    if data_type == 'text':
+        print("Data types are text by default. No error, continuing function.")
+    get_data_type_format(wb, data_type)
+    # get the data_type of each column from col_data_types
+    ## get_col_data_types will raise an error for a col_name not in the dataframe or an invalid data_type
+    data_types = get_col_data_types(df, data_type, col_data_types)
 
-    # getting the count of regular columns
-    num_cols = len(df.columns)
-    # adding num_cols and number of row indices together for total column count
-    total_cols = num_row_indices + num_cols
+    # write the data, with a bottom border on the last row per major index category and a right border on the last
+    ## column per header row 1 category
+    write_table_data(wb, sheet, df, layout, data_types, replace_nulls, null_value, null_align, row_borders=True, \
+        col_borders=True, bulk_write=bulk_write)
 
-    # value to subtract to correctly apply right border
-    col_subtract = num_row_indices - 1
-
-    # iterating over data columns excluding row index columns:
-    for col_num in range(num_row_indices, total_cols):
-        # iterating over rows containing data:
-        for row_num, value in enumerate(df.values):
-            # if no data type is assigned:
-            if data_type == None or data_type == 'text':
-                # for the last row per first index category:
-                if (row_num + 1)%rows_per_major_index==0:
-                    # for the last row per first index category:
-                    if (col_num-col_subtract)%header2_n==0:
-                        # we check if the value of the cell is null
-                        if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                            # replace value with null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_corner_format)
-                        else:
-                            # otherwise insert data and apply formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                                value[col_num-num_row_indices], data_corner_format)
-                    #else if the cell is on the last row but not the last column:
-                    else:
-                        if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                            # replace value with null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_bottom_format)
-                        else:
-                            # otherwise insert data and apply formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                                value[col_num-num_row_indices], data_bottom_format)
-                #else if the row is NOT the last month row
-                else:
-                   # for the last row per first index category:
-                    if (col_num-col_subtract)%header2_n==0:
-                        # we check if the value of the cell is null
-                        if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                            # replace value with null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_right_format)
-                        else:
-                            # otherwise insert data and apply formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                                value[col_num-num_row_indices], data_right_format)
-                    # for all other cells
-                    else:
-                        # we check if the value of the cell is null
-                        if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                            # replace value with null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_format)
-                        else:
-                            # otherwise insert data
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                                value[col_num-num_row_indices])
-            # else if data_type is not None or text:
-            else:
-                if (row_num + 1)%rows_per_major_index==0:
-                    # for the last row per first index category:
-                    if (col_num-col_subtract)%header2_n==0:
-                        # we check if the value of the cell is null
-                        if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                            # replace value with null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_corner_format)
-                        else:
-                            # otherwise insert data and apply formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                                value[col_num-num_row_indices], data_corner_format)
-                    #else if the cell is on the last row but not the last column:
-                    else:
-                        if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                            # replace value with null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_bottom_format)
-                        else:
-                            # otherwise insert data and apply formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                                value[col_num-num_row_indices], data_bottom_format)
-                #else if the row is NOT the last month row
-                else:
-                   # for the last row per first index category:
-                    if (col_num-col_subtract)%header2_n==0:
-                        # we check if the value of the cell is null
-                        if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                            # replace value with null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_right_format)
-                        else:
-                            # otherwise insert data and apply formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                                value[col_num-num_row_indices], data_right_format)
-                    # for all other cells
-                    else:
-                        # we check if the value of the cell is null
-                        if pd.isna(value[col_num-num_row_indices]) and replace_nulls == True:
-                            # replace value with null value and apply null formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, null_value, null_format)
-                        else:
-                            # otherwise insert data and apply formatting
-                            sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset, \
-                                value[col_num-num_row_indices], data_format)
-                                
 
 def set_4d_multiindex_dtype(df, wb, sheet, col_name, data_type, column_offset=0, header_offset=0, replace_nulls=True, null_value='-', \
-    null_align='center'):
+    null_align='center', layout=None):
 
     # This function will insert your data in desired cells and apply a right border to the last column of each first level category
     # and a bottom border to the last row of each major (first) row category for the specified column
@@ -3035,30 +2853,34 @@ def set_4d_multiindex_dtype(df, wb, sheet, col_name, data_type, column_offset=0,
     ### replace_nulls will replace null values with the specified replacement. defaults to true
     ### null_value is what replaces nulls. defaults to '-'
     ### null_align is the horizontal alignment for null values. defaults to center
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
-    import pandas as pd
+    from utility_functions import get_data_type_format, get_table_layout, write_table_data
     
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
+    # raise an error if it is not a column multiindex
+    if num_col_indices == 1:
         raise Exception('Data does not have a columns multiindex')
 
-    # error if there are not 2 column header rows
-    if num_col_indices == 2:
+    # error if there are not at least 2 column header rows
+    if num_col_indices >= 2:
         pass 
     else:
-        raise Exception(f"Function is only meant for datasets with two header rows. \
+        raise Exception(f"Function is only meant for datasets with two or more header rows. \
             The number of header rows your data has is {num_col_indices}.")
 
     #getting count of row_indices
     # if there is no index raise error
-    if None in df.index.names:
+    if layout.num_row_indices == 0:
         raise Exception("No index set on dataframe.")
     else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+        num_row_indices = layout.num_row_indices
 
     # exit function with error if it is not a multiindex
     if num_row_indices == 1:
@@ -3075,237 +2897,33 @@ def set_4d_multiindex_dtype(df, wb, sheet, col_name, data_type, column_offset=0,
         raise ValueError(f"{null_align} is not a valid alignment option. Valid options are {valid_align}")
         
     # create list of all col_names
-    col_name_list = [col_name for col_name in df.columns.get_level_values(1)]
+    col_name_list = [col_name for col_name in df.columns.get_level_values(-1)]
 
     if col_name not in col_name_list:
         raise ValueError(f"{col_name} not in dataframe. Columns in data are: {col_name_list}")
     else:
         pass
 
-    if null_align == 'center':
-        null_format = wb.add_format({'align':'center'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'center'})
-        null_right_format = wb.add_format({'right':True, 'align':'center'})
-        null_corner_format = wb.add_format({'right':True,'bottom':True, 'align':'center'})
-    elif null_align == 'left':
-        null_format = wb.add_format({'align':'left'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'left'})
-        null_right_format = wb.add_format({'right':True, 'align':'left'})
-        null_corner_format = wb.add_format({'right':True,'bottom':True, 'align':'left'})
-    elif null_align == 'right':
-        null_format = wb.add_format({'align':'right'})
-        null_bottom_format = wb.add_format({'bottom':True, 'align':'right'})
-        null_right_format = wb.add_format({'right':True, 'align':'right'})
-        null_corner_format = wb.add_format({'right':True,'bottom':True, 'align':'right'})
-
-    # list of valid dtype args
-    valid_dtypes = ['numeric','decimal_1','decimal_2','dollar','dollar_cents','percent','percent_1','percent_2','date',\
-        'date_alt','datetime','datetime_alt']    
-
-    # this if statement sets the formatting based off the data_type argument
-    ## it will raise an error to tell the user if they have entered an invalid data_type argument
-    if data_type == 'numeric':
-        data_format = wb.add_format({'num_format':'#,##0'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0','bottom':True})
-        data_right_format = wb.add_format({'num_format':'#,##0','right':True})
-        data_corner_format = wb.add_format({'num_format':'#,##0','right':True,'bottom':True})
-    elif data_type == 'decimal_1':
-        data_format = wb.add_format({'num_format':'#,##0.0'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0.0','bottom':True})
-        data_right_format = wb.add_format({'num_format':'#,##0.0','right':True})
-        data_corner_format = wb.add_format({'num_format':'#,##0.0','right':True,'bottom':True})
-    elif data_type == 'decimal_2':
-        data_format = wb.add_format({'num_format':'#,##0.00'})
-        data_bottom_format = wb.add_format({'num_format':'#,##0.00','bottom':True})
-        data_right_format = wb.add_format({'num_format':'#,##0.00','right':True})
-        data_right_format = wb.add_format({'num_format':'#,##0.00','right':True,'bottom':True})
-    elif data_type == 'dollar':
-        data_format = wb.add_format({'num_format':'$#,##0'})
-        data_bottom_format = wb.add_format({'num_format':'$#,##0','bottom':True})
-        data_right_format = wb.add_format({'num_format':'$#,##0','right':True})
-        data_corner_format = wb.add_format({'num_format':'$#,##0','right':True,'bottom':True})
-    elif data_type == 'dollar_cents':
-        data_format = wb.add_format({'num_format':'$#,##0.00'})
-        data_bottom_format = wb.add_format({'num_format':'$#,##0.00','bottom':True})
-        data_right_format = wb.add_format({'num_format':'$#,##0.00','right':True})
-        data_corner_format = wb.add_format({'num_format':'$#,##0.00','right':True,'bottom':True})
-    elif data_type == 'percent':
-        data_format = wb.add_format({'num_format':'0%'})
-        data_bottom_format = wb.add_format({'num_format':'0%','bottom':True})
-        data_right_format = wb.add_format({'num_format':'0%','right':True})
-        data_corner_format = wb.add_format({'num_format':'0%','right':True,'bottom':True})
-    elif data_type == 'percent_1':
-        data_format = wb.add_format({'num_format':'0.0%'})
-        data_bottom_format = wb.add_format({'num_format':'0.0%','bottom':True})
-        data_right_format = wb.add_format({'num_format':'0.0%','right':True})
-        data_corner_format = wb.add_format({'num_format':'0.0%','right':True,'bottom':True})
-    elif data_type == 'percent_2':
-        data_format = wb.add_format({'num_format':'0.00%'})
-        data_bottom_format = wb.add_format({'num_format':'0.00%','bottom':True})
-        data_right_format = wb.add_format({'num_format':'0.00%','right':True})
-        data_corner_format = wb.add_format({'num_format':'0.00%','right':True,'bottom':True})
-    elif data_type == 'date':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd'})
-        data_bottom_format = wb.add_format({'num_format':'yyyy-mm-dd','bottom':True})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd','right':True})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd','right':True,'bottom':True})
-    elif data_type == 'date_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy'})
-        data_bottom_format = wb.add_format({'num_format':'m/d/yyyy','bottom':True})
-        data_right_format = wb.add_format({'num_format':'m/d/yyyy','right':True})
-        data_corner_format = wb.add_format({'num_format':'m/d/yyyy','right':True,'bottom':True})
-    elif data_type == 'datetime':
-        data_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm'})
-        data_bottom_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','bottom':True})
-        data_right_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','right':True})
-        data_corner_format = wb.add_format({'num_format':'yyyy-mm-dd h:mm','right':True,'bottom':True})
-    elif data_type == 'datetime_alt':
-        data_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM'})
-        data_bottom_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','bottom':True})
-        data_right_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','right':True})
-        data_corner_format = wb.add_format({'num_format':'m/d/yyyy h:mm AM/PM','right':True,'bottom':True})
-    elif data_type == 'text':
+    # check the data_type before anything is written
+    ## get_data_type_format will raise an error to tell the user if they have entered an invalid data_type argument
+    if data_type == 'text':
         print("Data types are text by default. No error, continuing function.")
-        data_bottom_format = wb.add_format({'bottom':True})
-        data_right_format = wb.add_format({'right':True})
-        data_corner_format = wb.add_format({'right':True,'bottom':True})
-    elif data_type == None:
-        data_bottom_format = wb.add_format({'bottom':True})
-        data_right_format = wb.add_format({'right':True})
-        data_corner_format = wb.add_format({'right':True,'bottom':True})
-    else:
-        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {valid_dtypes}")
-
-    # determining how many rows are in the major (leftmost) index by dividing the total row count by index[0] unique values
-    rows_per_major_index = int(len(df)/len(df.index.unique(0)))
-
-    # number of header row 2 values which are what we need to loop over
-    header2_n = df.columns.levshape[1]
-
-    # getting the column count
-
-    # getting the count of regular columns
-    num_cols = len(df.columns)
-    # adding num_cols and number of row indices together for total column count
-    total_cols = num_row_indices + num_cols
-
-    # value to subtract to correctly apply right border
-    col_subtract = num_row_indices - 1
+    get_data_type_format(wb, data_type)
 
-    # iterating over data columns excluding row index columns:
-    for col_num, df_col_name in enumerate(df.columns):
-        # if the full (multilevel) column name contains the specificed column name:
-        if col_name in df_col_name:
-            # iterating over rows containing data:
-            for row_num, value in enumerate(df.values):
-                # if no data type is assigned:
-                if data_type == None or data_type == 'text':
-                    # for the last row per first index category:
-                    if (row_num + 1)%rows_per_major_index==0:
-                        # for the last row per first index category:
-                        if (col_num+1)%header2_n==0:
-                            # we check if the value of the cell is null
-                            if pd.isna(value[col_num]) and replace_nulls == True:
-                                # replace value with null value and apply null formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    null_value, null_corner_format)
-                            else:
-                                # otherwise insert data and apply formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    value[col_num], data_corner_format)
-                        #else if the cell is on the last row but not the last column:
-                        else:
-                            if pd.isna(value[col_num]) and replace_nulls == True:
-                                # replace value with null value and apply null formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices,\
-                                     null_value, null_bottom_format)
-                            else:
-                                # otherwise insert data and apply formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    value[col_num], data_bottom_format)
-                    #else if the row is NOT the last month row
-                    else:
-                    # for the last row per first index category:
-                        if (col_num+1)%header2_n==0:
-                            # we check if the value of the cell is null
-                            if pd.isna(value[col_num]) and replace_nulls == True:
-                                # replace value with null value and apply null formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    null_value, null_right_format)
-                            else:
-                                # otherwise insert data and apply formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    value[col_num], data_right_format)
-                        # for all other cells
-                        else:
-                            # we check if the value of the cell is null
-                            if pd.isna(value[col_num]) and replace_nulls == True:
-                                # replace value with null value and apply null formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    null_value, null_format)
-                            else:
-                                # otherwise insert data
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    value[col_num])
-                # else if data_type is not None or text:
-                else:
-                    if (row_num + 1)%rows_per_major_index==0:
-                        # for the last row per first index category:
-                        if (col_num+1)%header2_n==0:
-                            # we check if the value of the cell is null
-                            if pd.isna(value[col_num]) and replace_nulls == True:
-                                # replace value with null value and apply null formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices \
-                                    , null_value, null_corner_format)
-                            else:
-                                # otherwise insert data and apply formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    value[col_num], data_corner_format)
-                        #else if the cell is on the last row but not the last column:
-                        else:
-                            if pd.isna(value[col_num]) and replace_nulls == True:
-                                # replace value with null value and apply null formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    null_value, null_bottom_format)
-                            else:
-                                # otherwise insert data and apply formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    value[col_num], data_bottom_format)
-                    #else if the row is NOT the last month row
-                    else:
-                    # for the last row per first index category:
-                        if (col_num+1)%header2_n==0:
-                            # we check if the value of the cell is null
-                            if pd.isna(value[col_num]) and replace_nulls == True:
-                                # replace value with null value and apply null formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    null_value, null_right_format)
-                            else:
-                                # otherwise insert data and apply formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    value[col_num], data_right_format)
-                        # for all other cells
-                        else:
-                            # we check if the value of the cell is null
-                            if pd.isna(value[col_num]) and replace_nulls == True:
-                                # replace value with null value and apply null formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    null_value, null_format)
-                            else:
-                                # otherwise insert data and apply formatting
-                                sheet.write(row_num + num_col_indices + header_offset, col_num + column_offset + num_row_indices, \
-                                    value[col_num], data_format) 
-        else:
-            # skip all columns that do not match specified column name
-            pass    
+    # getting the positions of the columns whose full (multilevel) column name contains the specified column name
+    data_cols = [col_num for col_num, df_col_name in enumerate(df.columns) if col_name in df_col_name]
 
+    # write the matching columns, with a bottom border on the last row per major index category and a right border on the
+    ## last column per header row 1 category
+    write_table_data(wb, sheet, df, layout, data_type, replace_nulls, null_value, null_align, row_borders=True, \
+        col_borders=True, data_cols=data_cols)
 
 
 ######################## EDGE BORDER FORMATTING ##################################
 
 ###                      ANY SHAPE DATAFRAMES                        ###
 
-def table_bottom_border(df, wb, sheet, header_offset=0, column_offset=0):
+def table_bottom_border(df, wb, sheet, header_offset=0, column_offset=0, layout=None, outside=True):
 
     # This function will apply formatting a bottom border to your table
     ## Can be used on any dataframe
@@ -3320,44 +2938,61 @@ def table_bottom_border(df, wb, sheet, header_offset=0, column_offset=0):
     ## OPTIONAL:
     ### header_offset is the number of rows to skip if you want blank rows on top for title etc. defaults to 0
     ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+    ### outside draws the border on the cells below the table, so the table's own cells keep their formats. defaults to True
+    ####    set to False to add the border to the formats of the table's own edge cells instead. this needs a PlanSheet
+    ####    (see utility_functions) in place of the worksheet, since the border is combined with each cell's format when
+    ####    the plan is flushed. on a PlanSheet the outside border is also combined with anything written in those cells
+
+    from utility_functions import get_format, get_table_layout, PlanSheet
+
+    # raise an error if the outside input is not valid
+    if outside == True:
+        pass
+    elif outside == False:
+        pass
+    else:
+        raise ValueError(f"{outside} is not a valid outside option. Valid arguments are True, False.")
+
+    # borders inside the table are combined with the cells' formats, which only a PlanSheet can do
+    if outside == False and not isinstance(sheet, PlanSheet):
+        raise TypeError("Borders inside the table need a PlanSheet in place of the worksheet. Use outside=True on a worksheet.")
+    else:
+        pass
     
     # getting row count of the data to use to set lower bound for formatting
     
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1
-    # get the row count (which doesn't count column rows)
-    data_rows = len(df)
-    # add the two together to get total row count
-    df_row_count = num_col_indices + data_rows + header_offset
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
+    # the row below the table, from the layout so any label rows between the data rows are counted
+    df_row_count = layout.last_data_row + 1
 
     # getting count of number of row indices to set range for index formatting
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
 
     # creating the format for the bottom border (actually top border on the cell below so we don't overwrite data)
-    bottom_format = wb.add_format({'top':True})
-
-    # this applies a top border to the cell below the last row fo data for all the columns except the index
-    for col_num, value in enumerate(df.columns.values):
-        # we are applying a top border to that to fake a bottom border on the table!
-        # "" is filling in the cell with nothing, leaving it blank
-        # col_num + row_indices will correctly skip the row index columns in the loop
-        sheet.write(df_row_count, col_num + num_row_indices + column_offset, "", bottom_format)
-    
-    # this applies a top border to the cells below the last row of the index columns since they are excluded from the column for loop
-    for col_num in range(num_row_indices):
-        sheet.write(df_row_count, col_num + column_offset, "", bottom_format)
+    bottom_format = get_format(wb, {'top':True})
+
+    # the border row is filled left to right (index columns first) so it can be written last on a constant_memory worksheet
+
+    # iterating over all the columns of the table, index columns first:
+    for col_num in range(num_row_indices + len(df.columns)):
+        # on the last row of the table
+        if outside == False:
+            sheet.add_border(wb, df_row_count - 1, col_num + column_offset, 'bottom')
+        # we are applying a top border to the cell below the table to fake a bottom border on the table!
+        elif isinstance(sheet, PlanSheet):
+            sheet.add_border(wb, df_row_count, col_num + column_offset, 'top')
+        else:
+            # "" is filling in the cell with nothing, leaving it blank
+            sheet.write(df_row_count, col_num + column_offset, "", bottom_format)
 
 
-def table_right_border(df, wb, sheet, header_offset=0, column_offset=0):
+def table_right_border(df, wb, sheet, header_offset=0, column_offset=0, layout=None, outside=True):
 
     # This function will apply formatting a right border to your table
     ## Can be used on any dataframe
@@ -3372,16 +3007,38 @@ def table_right_border(df, wb, sheet, header_offset=0, column_offset=0):
     ## OPTIONAL:
     ### header_offset is the number of rows to skip if you want blank rows on top for title etc. defaults to 0
     ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+    ### outside draws the border on the cells to the right of the table, so the table's own cells keep their formats. defaults to True
+    ####    set to False to add the border to the formats of the table's own edge cells instead. this needs a PlanSheet
+    ####    (see utility_functions) in place of the worksheet, since the border is combined with each cell's format when
+    ####    the plan is flushed. on a PlanSheet the outside border is also combined with anything written in those cells
+
+    from utility_functions import get_format, get_table_layout, PlanSheet
+
+    # raise an error if the outside input is not valid
+    if outside == True:
+        pass
+    elif outside == False:
+        pass
+    else:
+        raise ValueError(f"{outside} is not a valid outside option. Valid arguments are True, False.")
+
+    # borders inside the table are combined with the cells' formats, which only a PlanSheet can do
+    if outside == False and not isinstance(sheet, PlanSheet):
+        raise TypeError("Borders inside the table need a PlanSheet in place of the worksheet. Use outside=True on a worksheet.")
+    else:
+        pass
 
     # getting the column count
 
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
+
     # getting the count of row index columns
     # if there is no index set to 0 (pandas has a default index with no name)
-    if None in df.index.names:
-        num_row_indices = 0
-    else:
-        # else number of row indices is how many row index names there are    
-        num_row_indices = len(df.index.names)
+    num_row_indices = layout.num_row_indices
     # getting the count of regular columns
     num_cols = len(df.columns)
     # adding them together for total column count
@@ -3389,27 +3046,25 @@ def table_right_border(df, wb, sheet, header_offset=0, column_offset=0):
 
     # getting row count of the data to use to set lower bound for formatting
     
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1
-    # getting count of the data rows
-    data_rows = len(df)
-    # adding them together to get total rows
-    total_rows = num_col_indices + data_rows + header_offset
+    # the row below the table, from the layout so any label rows between the data rows are counted
+    total_rows = layout.last_data_row + 1
 
     # creating right border format--actually left to next cell over to avoid overwriting data
-    right_format = wb.add_format({'left':True})
+    right_format = get_format(wb, {'left':True})
 
     # iterating over all our rows in our table:
     for row_num in range(header_offset, total_rows):
+        # on the last column of the table
+        if outside == False:
+            sheet.add_border(wb, row_num, total_cols + column_offset - 1, 'right')
         # apply the right format to the first column after our table
-        sheet.write(row_num, total_cols + column_offset, "", right_format)
+        elif isinstance(sheet, PlanSheet):
+            sheet.add_border(wb, row_num, total_cols + column_offset, 'left')
+        else:
+            sheet.write(row_num, total_cols + column_offset, "", right_format)
 
 
-def table_left_border(df, wb, sheet, column_offset, header_offset=0):
+def table_left_border(df, wb, sheet, column_offset, header_offset=0, layout=None, outside=True):
 
     # This function will apply formatting a left border to your table
     ## Can be used on any dataframe
@@ -3424,33 +3079,57 @@ def table_left_border(df, wb, sheet, column_offset, header_offset=0):
     ## OPTIONAL:
     ### header_offset is the number of rows to skip if you want blank rows on top for title etc. defaults to 0
     ### column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
+    ### outside draws the border on the cells to the left of the table, so the table's own cells keep their formats. defaults to True
+    ####    set to False to add the border to the formats of the table's own edge cells instead. this needs a PlanSheet
+    ####    (see utility_functions) in place of the worksheet, since the border is combined with each cell's format when
+    ####    the plan is flushed. on a PlanSheet the outside border is also combined with anything written in those cells
+
+    from utility_functions import get_format, get_table_layout, PlanSheet
+
+    # raise an error if the outside input is not valid
+    if outside == True:
+        pass
+    elif outside == False:
+        pass
+    else:
+        raise ValueError(f"{outside} is not a valid outside option. Valid arguments are True, False.")
+
+    # borders inside the table are combined with the cells' formats, which only a PlanSheet can do
+    if outside == False and not isinstance(sheet, PlanSheet):
+        raise TypeError("Borders inside the table need a PlanSheet in place of the worksheet. Use outside=True on a worksheet.")
+    else:
+        pass
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, column_offset, layout)
+    header_offset, column_offset = layout.header_offset, layout.column_offset
 
    # getting row count of the data to use to set lower bound for formatting
 
-   # raise exception if attempting to apply to table that starts in column A
-    if column_offset == 0:
+   # raise exception if attempting to apply outside a table that starts in column A
+    if column_offset == 0 and outside == True:
         raise Exception("Left border cannot be applied to tables that start in column A.")
     else:
         pass
     
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1
-    # getting count of the data rows
-    data_rows = len(df)
-    # adding them together to get total rows
-    total_rows = num_col_indices + data_rows + header_offset
+    # the row below the table, from the layout so any label rows between the data rows are counted
+    total_rows = layout.last_data_row + 1
 
     # creating left border format--actually right to next cell over to avoid overwriting data
-    left_format = wb.add_format({'right':True})  
+    left_format = get_format(wb, {'right':True})  
 
     # iterating over all our rows in our table:
     for row_num in range(header_offset, total_rows):
+        # on the first column of the table
+        if outside == False:
+            sheet.add_border(wb, row_num, column_offset, 'left')
         # apply the left format to the first column before our table
-        sheet.write(row_num, column_offset - 1, "", left_format) 
+        elif isinstance(sheet, PlanSheet):
+            sheet.add_border(wb, row_num, column_offset - 1, 'right')
+        else:
+            sheet.write(row_num, column_offset - 1, "", left_format) 
 
 
 ######################## TITLE FORMATTING ##################################
@@ -3478,6 +3157,8 @@ def insert_title(df, wb, sheet, title, font_size=16, font_color='#000000', bg_co
     ### row_num is the row to place your title, defaults to excel row 1
     ### col_num is the column to place your title, defaults to excel column A
 
+    from utility_functions import get_format
+
     # raising an error message to tell the user if they have entered an invalid alignmnet argument
     valid_alignments = ['left','center','right','fill','justify','center_across','distributed']
 
@@ -3485,7 +3166,7 @@ def insert_title(df, wb, sheet, title, font_size=16, font_color='#000000', bg_co
         raise ValueError(f"{align} is not a valid alignment option. Valid options are: {valid_alignments}")
 
     # creating title format
-    title_format = wb.add_format({'bold':True, 'font_color':font_color, 'bg_color':bg_color, 'font_size':font_size,'align':align})
+    title_format = get_format(wb, {'bold':True, 'font_color':font_color, 'bg_color':bg_color, 'font_size':font_size,'align':align})
 
     # applying title format and inserting title
     sheet.write(row_num, col_num, title, title_format)
@@ -3495,7 +3176,7 @@ def insert_title(df, wb, sheet, title, font_size=16, font_color='#000000', bg_co
 
 ###                      ANY SHAPE DATAFRAMES                        ###
 
-def create_skip_rows(df, header_offset=0, rows_between=2):
+def create_skip_rows(df, header_offset=0, rows_between=2, layout=None):
 
     # this function will generate the amount of rows to skip if you are putting two tables on the same sheet
     ## it is meant to be used when there are two tables, one under the top one
@@ -3508,13 +3189,17 @@ def create_skip_rows(df, header_offset=0, rows_between=2):
     ## OPTIONAL:
     ### header_offset is your blank rows for titles for your top table. it should match header_offset from functions you used to format it
     ### rows_between is the number of rows between tables. defaults to 
+    ### layout is a TableLayout for df (see get_table_layout in utility_functions). defaults to None
+    ####    when given, the layout's offsets are used and the table shape is not worked out again
 
-    # this will try to get the count of column levels you have if it's a multiindex but if it fails since it's only one level
-    try:
-        num_col_indices = len(df.columns.levshape)
-    # then it will assign a value of 1 for column_indices
-    except:
-        num_col_indices = 1  
+    from utility_functions import get_table_layout
+
+    # get the shape of the table once, or use the layout passed in
+    layout = get_table_layout(df, header_offset, layout=layout)
+    header_offset = layout.header_offset
+
+    # getting the count of column header rows
+    num_col_indices = layout.num_col_indices
 
     # funtion returns the number of rows in the dataframe + number of header rows + header_offset + rows _between for num rows to skip
     return len(df) + num_col_indices + header_offset + rows_between
@@ -3549,6 +3234,7 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
 
     import numpy as np
     from math import ceil
+    from utility_functions import get_max_width, get_column_widths, set_column_spec
 
     # check to make sure column_offset input is valid
     ## if column_offset is not an integer, raise an error
@@ -3634,32 +3320,10 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
             else:
                 raise ValueError(f"{text_wrap} is not not a valid text_wrap argument. text_wrap must be True or False.")
 
-            # create a list holding the max length of the data in each column
-            df1_max_data_lengths = []
-                
-            # iterating over the data columns:    
-            for col in list(df1):
-                # store their values in a list
-                df1_values = df1[col].tolist()
-                # create an empty list to store the lengths
-                df1_value_lengths = []
-                # iterating over the values list:
-                for row_num, value in enumerate(df1_values):
-                    # get the length in characters of each value
-                    df1_length = len(str(value))
-                    # add it to the value_lengths list
-                    df1_value_lengths.append(df1_length)
-                    # if it is the final iteration over the values with the completed value_lengths list for the column:
-                    ## + 1 since python numbering starts at 0
-                    if row_num + 1 == len(df1_values):
-                        # get the max width value
-                        ## + 1 for 'wiggle room'
-                        df1_max_data_width = max(df1_value_lengths) + 1
-                        # append it to our data lengths list
-                        df1_max_data_lengths.append(df1_max_data_width)
-
-            # create a list for the max of data and column width, whichever is greater
-            df1_max_all_lengths = np.maximum(df1_col_name_lengths, df1_max_data_lengths)
+            # create a list holding the max length of the data in each column, only when the method uses it
+            ## + 1 for 'wiggle room'
+            if method == 'data' or method == 'all':
+                df1_max_data_lengths = [width + 1 for width in get_column_widths(df1)]
 
             # choosing list to use based on method:
             if method == 'headers':
@@ -3667,7 +3331,8 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
             elif method == 'data':
                 df1_col_widths = df1_max_data_lengths
             elif method ==  'all':
-                df1_col_widths = df1_max_all_lengths
+                # the max of data and column width, whichever is greater
+                df1_col_widths = np.maximum(df1_col_name_lengths, df1_max_data_lengths)
 
             # get widths of index columns
             # if there is no index, set width list to the column width list
@@ -3675,13 +3340,13 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
                 df1_width_list = df1_col_widths 
             # if there is a single row index:
             elif df1_num_row_indices == 1:
-                # gets the length of all the values in the index
-                df1_index_values = [len(value) for row_num, value in enumerate(df1.index.values)]
+                # gets the length of the longest value in the index
+                df1_index_width = get_max_width(df1.index)
 
                 # gets the max of the index values or the name of the index, whichever is greater
                 ## + 1 for 'wiggle room'
                 ## in list form so .extend() will work below
-                df1_max_index_lengths = [max(max(df1_index_values), len(df1.index.name)) + 1]
+                df1_max_index_lengths = [max(df1_index_width, len(df1.index.name)) + 1]
 
                 # creates a copy of the index length list so we do not modify the original
                 df1_width_list = df1_max_index_lengths.copy()
@@ -3695,11 +3360,11 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
 
                 # iterating over row indices:
                 for col_num in range(df1_num_row_indices):
-                    # store the length of all index values in a list
-                    df1_index_values = [len(value) for i, value in enumerate(df1.index.get_level_values(col_num))]
+                    # get the length of the longest value in the index level
+                    df1_index_width = get_max_width(df1.index.get_level_values(col_num))
                     # get the max width of the longest value or title, whichever is longer
                     ## + 1 for 'wiggle room'
-                    df1_max_index_length = max(max(df1_index_values), len(df1.index.names[col_num])) + 1
+                    df1_max_index_length = max(df1_index_width, len(df1.index.names[col_num])) + 1
                     # add that to the max_index_lengths list
                     df1_max_index_lengths.append(df1_max_index_length)
 
@@ -3720,15 +3385,15 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
                         # add 0 to end of list for number of extra columns the other dataframe has
                         df1_width_list.append(0)
     
-    # if the dataframe has two header rows:
+    # if the dataframe has two or more header rows:
     elif df1_col_multiindex == True:
-        if df1_num_col_indices != 2:
-            # raise error if there are NOT exactly two header rows
-            raise Exception(f"{df1} has {df1_num_col_indices} header rows. df1_col_multiindex only works for 2 header rows.")
+        if df1_num_col_indices < 2:
+            # raise error if there are NOT at least two header rows
+            raise Exception(f"{df1} has {df1_num_col_indices} header rows. df1_col_multiindex only works for 2 or more header rows.")
         else:
             # create a list holding the length of the name of each column
             ## + 1 for 'wiggle room'
-            df1_col_names = [name for name in df1.columns.get_level_values(1)]
+            df1_col_names = [name for name in df1.columns.get_level_values(-1)]
 
             # adjust col widths for text wrapping of headers
             if text_wrap == True:
@@ -3747,32 +3412,10 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
             else:
                 raise ValueError(f"{text_wrap} is not not a valid text_wrap argument. text_wrap must be True or False.")
 
-            # create a list holding the max length of the data in each column
-            df1_max_data_lengths = []
-                
-            # iterating over the data columns:    
-            for col in list(df1):
-                # store their values in a list
-                df1_values = df1[col].tolist()
-                # create an empty list to store the lengths
-                df1_value_lengths = []
-                # iterating over the values list:
-                for row_num, value in enumerate(df1_values):
-                    # get the length in characters of each value
-                    df1_length = len(str(value))
-                    # add it to the value_lengths list
-                    df1_value_lengths.append(df1_length)
-                    # if it is the final iteration over the values with the completed value_lengths list for the column:
-                    ## + 1 since python numbering starts at 0
-                    if row_num + 1 == len(df1_values):
-                        # get the max width value
-                        ## + 1 for 'wiggle room'
-                        df1_max_data_width = max(df1_value_lengths) + 1
-                        # append it to our data lengths list
-                        df1_max_data_lengths.append(df1_max_data_width) 
-            
-            # create a list for the max of data and column width, whichever is greater
-            df1_max_all_lengths = np.maximum(df1_col_name_lengths, df1_max_data_lengths)
+            # create a list holding the max length of the data in each column, only when the method uses it
+            ## + 1 for 'wiggle room'
+            if method == 'data' or method == 'all':
+                df1_max_data_lengths = [width + 1 for width in get_column_widths(df1)]
 
             # choosing list to use based on method:
             if method == 'headers':
@@ -3780,7 +3423,8 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
             elif method == 'data':
                 df1_col_widths = df1_max_data_lengths
             elif method ==  'all':
-                df1_col_widths = df1_max_all_lengths
+                # the max of data and column width, whichever is greater
+                df1_col_widths = np.maximum(df1_col_name_lengths, df1_max_data_lengths)
 
             # get row index col widths
             
@@ -3790,12 +3434,12 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
                 df1_width_list = df1_col_widths 
             # if these is a single row index:
             elif df1_num_row_indices == 1:
-                # gets the length of all the values in the index
-                df1_index_values = [len(value) for row_num, value in enumerate(df1.index.values)]
+                # gets the length of the longest value in the index
+                df1_index_width = get_max_width(df1.index)
 
                 # gets the max of the index values or the name of the index, whichever is greater
                 ## + 1 for 'wiggle room'
-                df1_max_index_lengths = [max(max(df1_index_values), len(df1.index.name)) + 1]
+                df1_max_index_lengths = [max(df1_index_width, len(df1.index.name)) + 1]
 
                 # create a copy so we don't modify the original
                 df1_width_list = df1_max_index_lengths.copy()
@@ -3809,11 +3453,11 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
 
                 # iterating over row indices:
                 for col_num in range(df1_num_row_indices):
-                    # store the length of all index values in a list
-                    df1_index_values = [len(value) for i, value in enumerate(df1.index.get_level_values(col_num))]
+                    # get the length of the longest value in the index level
+                    df1_index_width = get_max_width(df1.index.get_level_values(col_num))
                     # get the max width of the longest value or title, whichever is longer
                     ## + 1 for 'wiggle room'
-                    df1_max_index_length = max(max(df1_index_values), len(df1.index.names[col_num])) + 1
+                    df1_max_index_length = max(df1_index_width, len(df1.index.names[col_num])) + 1
                     # add that to the max_index_lengths list
                     df1_max_index_lengths.append(df1_max_index_length)
 
@@ -3859,32 +3503,10 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
             else:
                 raise ValueError(f"{text_wrap} is not not a valid text_wrap argument. text_wrap must be True or False.")
 
-            # create a list holding the max length of the data in each column
-            df2_max_data_lengths = []
-                
-            # iterating over the data columns:    
-            for col in list(df2):
-                # store their values in a list
-                df2_values = df2[col].tolist()
-                # create an empty list to store the lengths
-                df2_value_lengths = []
-                # iterating over the values list:
-                for row_num, value in enumerate(df2_values):
-                    # get the length in characters of each value
-                    df2_length = len(str(value))
-                    # add it to the value_lengths list
-                    df2_value_lengths.append(df2_length)
-                    # if it is the final iteration over the values with the completed value_lengths list for the column:
-                    ## + 1 since python numbering starts at 0
-                    if row_num + 1 == len(df2_values):
-                        # get the max width value
-                        ## + 1 for 'wiggle room'
-                        df2_max_data_width = max(df2_value_lengths) + 1
-                        # append it to our data lengths list
-                        df2_max_data_lengths.append(df2_max_data_width)
-
-            # create a list for the max of data and column width, whichever is greater
-            df2_max_all_lengths = np.maximum(df2_col_name_lengths, df2_max_data_lengths)
+            # create a list holding the max length of the data in each column, only when the method uses it
+            ## + 1 for 'wiggle room'
+            if method == 'data' or method == 'all':
+                df2_max_data_lengths = [width + 1 for width in get_column_widths(df2)]
 
             # choosing list to use based on method:
             if method == 'headers':
@@ -3892,7 +3514,8 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
             elif method == 'data':
                 df2_col_widths = df2_max_data_lengths
             elif method ==  'all':
-                df2_col_widths = df2_max_all_lengths
+                # the max of data and column width, whichever is greater
+                df2_col_widths = np.maximum(df2_col_name_lengths, df2_max_data_lengths)
 
             # get widths of index columns
             # if there is no index, set width list to the column width list
@@ -3900,13 +3523,13 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
                 df2_width_list = df2_col_widths 
             # if there is a single row index:
             elif df2_num_row_indices == 1:
-                # gets the length of all the values in the index
-                df2_index_values = [len(value) for row_num, value in enumerate(df2.index.values)]
+                # gets the length of the longest value in the index
+                df2_index_width = get_max_width(df2.index)
 
                 # gets the max of the index values or the name of the index, whichever is greater
                 ## + 1 for 'wiggle room'
                 ## in list form so .extend() will work below
-                df2_max_index_lengths = [max(max(df2_index_values), len(df2.index.name)) + 1]
+                df2_max_index_lengths = [max(df2_index_width, len(df2.index.name)) + 1]
 
                 # creates a copy of the index length list so we do not modify the original
                 df2_width_list = df2_max_index_lengths.copy()
@@ -3920,11 +3543,11 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
 
                 # iterating over row indices:
                 for col_num in range(df2_num_row_indices):
-                    # store the length of all index values in a list
-                    df2_index_values = [len(value) for i, value in enumerate(df2.index.get_level_values(col_num))]
+                    # get the length of the longest value in the index level
+                    df2_index_width = get_max_width(df2.index.get_level_values(col_num))
                     # get the max width of the longest value or title, whichever is longer
                     ## + 1 for 'wiggle room'
-                    df2_max_index_length = max(max(df2_index_values), len(df2.index.names[col_num])) + 1
+                    df2_max_index_length = max(df2_index_width, len(df2.index.names[col_num])) + 1
                     # add that to the max_index_lengths list
                     df2_max_index_lengths.append(df2_max_index_length)
 
@@ -3945,15 +3568,15 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
                         # add 0 to end of list for number of extra columns the other dataframe has
                         df2_width_list.append(0)
     
-    # if the dataframe has two header rows:
+    # if the dataframe has two or more header rows:
     elif df2_col_multiindex == True:
-        if df2_num_col_indices != 2:
-            # raise error if there are NOT exactly two header rows
-            raise Exception(f"{df2} has {df2_num_col_indices} header rows. df2_col_multiindex only works for 2 header rows.")
+        if df2_num_col_indices < 2:
+            # raise error if there are NOT at least two header rows
+            raise Exception(f"{df2} has {df2_num_col_indices} header rows. df2_col_multiindex only works for 2 or more header rows.")
         else:
             # create a list holding the length of the name of each column
             ## + 1 for 'wiggle room'
-            df2_col_names = [name for name in df2.columns.get_level_values(1)]
+            df2_col_names = [name for name in df2.columns.get_level_values(-1)]
 
             # adjust col widths for text wrapping of headers
             if text_wrap == True:
@@ -3972,32 +3595,10 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
             else:
                 raise ValueError(f"{text_wrap} is not not a valid text_wrap argument. text_wrap must be True or False.")
 
-            # create a list holding the max length of the data in each column
-            df2_max_data_lengths = []
-                
-            # iterating over the data columns:    
-            for col in list(df2):
-                # store their values in a list
-                df2_values = df2[col].tolist()
-                # create an empty list to store the lengths
-                df2_value_lengths = []
-                # iterating over the values list:
-                for row_num, value in enumerate(df2_values):
-                    # get the length in characters of each value
-                    df2_length = len(str(value))
-                    # add it to the value_lengths list
-                    df2_value_lengths.append(df2_length)
-                    # if it is the final iteration over the values with the completed value_lengths list for the column:
-                    ## + 1 since python numbering starts at 0
-                    if row_num + 1 == len(df2_values):
-                        # get the max width value
-                        ## + 1 for 'wiggle room'
-                        df2_max_data_width = max(df2_value_lengths) + 1
-                        # append it to our data lengths list
-                        df2_max_data_lengths.append(df2_max_data_width) 
-            
-            # create a list for the max of data and column width, whichever is greater
-            df2_max_all_lengths = np.maximum(df2_col_name_lengths, df2_max_data_lengths)
+            # create a list holding the max length of the data in each column, only when the method uses it
+            ## + 1 for 'wiggle room'
+            if method == 'data' or method == 'all':
+                df2_max_data_lengths = [width + 1 for width in get_column_widths(df2)]
 
             # choosing list to use based on method:
             if method == 'headers':
@@ -4005,7 +3606,8 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
             elif method == 'data':
                 df2_col_widths = df2_max_data_lengths
             elif method ==  'all':
-                df2_col_widths = df2_max_all_lengths
+                # the max of data and column width, whichever is greater
+                df2_col_widths = np.maximum(df2_col_name_lengths, df2_max_data_lengths)
 
             # get row index col widths
             
@@ -4015,12 +3617,12 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
                 df2_width_list = df2_col_widths 
             # if these is a single row index:
             elif df2_num_row_indices == 1:
-                # gets the length of all the values in the index
-                df2_index_values = [len(value) for row_num, value in enumerate(df2.index.values)]
+                # gets the length of the longest value in the index
+                df2_index_width = get_max_width(df2.index)
 
                 # gets the max of the index values or the name of the index, whichever is greater
                 ## + 1 for 'wiggle room'
-                df2_max_index_lengths = [max(max(df2_index_values), len(df2.index.name)) + 1]
+                df2_max_index_lengths = [max(df2_index_width, len(df2.index.name)) + 1]
 
                 # create a copy so we don't modify the original
                 df2_width_list = df2_max_index_lengths.copy()
@@ -4034,11 +3636,11 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
 
                 # iterating over row indices:
                 for col_num in range(df2_num_row_indices):
-                    # store the length of all index values in a list
-                    df2_index_values = [len(value) for i, value in enumerate(df2.index.get_level_values(col_num))]
+                    # get the length of the longest value in the index level
+                    df2_index_width = get_max_width(df2.index.get_level_values(col_num))
                     # get the max width of the longest value or title, whichever is longer
                     ## + 1 for 'wiggle room'
-                    df2_max_index_length = max(max(df2_index_values), len(df2.index.names[col_num])) + 1
+                    df2_max_index_length = max(df2_index_width, len(df2.index.names[col_num])) + 1
                     # add that to the max_index_lengths list
                     df2_max_index_lengths.append(df2_max_index_length)
 
@@ -4065,6 +3667,6 @@ def two_table_col_widths(df1, df2, wb, sheet,column_offset=0,method='headers',te
     # iterating over the total columns:
     for col_num, width in enumerate(width_list):
         # apply the matching width to the column
-        sheet.set_column(col_num + column_offset, col_num + column_offset, width)
+        set_column_spec(sheet, col_num + column_offset, col_num + column_offset, width)
 
     
\ No newline at end of file
@@ -0,0 +1,478 @@
+# Tests for the formatting functions in formatting_functions_open_source.py
+## run them from the repo folder with: python -m pytest
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+import xlsxwriter
+
+from formatting_functions_open_source import format_header, format_header_multiindex, format_index, format_row_multiindex, \
+    insert_data, insert_excel_table, insert_row_multiindex_data, merge_row_index_cells, outline_row_multiindex, set_col_width, \
+    set_column_widths, set_multiindex_column_widths, set_row_multiindex_col_dtype, table_bottom_border, table_left_border, \
+    table_right_border
+from utility_functions import PlanSheet, TableLayout, get_excel_serials
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+def write_and_read(write_cells, workbook_options=None, styles=False):
+
+    # This function will write a sheet with write_cells(wb, sheet) to an in memory workbook and return the
+    ## {(row, col): value} of every cell with a value in it, read back with openpyxl
+    ## with styles=True every cell with a value or a format is returned as (value, bold, number format, right border,
+    ## top border, bottom border, left border) instead, and with styles='merges' the sorted merged ranges are returned
+    ## the in_memory option is only used when no workbook_options are given, since it turns off constant_memory
+
+    output = io.BytesIO()
+    wb = xlsxwriter.Workbook(output, workbook_options or {'in_memory': True})
+    write_cells(wb, wb.add_worksheet())
+    wb.close()
+
+    output.seek(0)
+    read_sheet = openpyxl.load_workbook(output).active
+    if styles == 'merges':
+        return sorted(str(merge) for merge in read_sheet.merged_cells.ranges)
+    if styles == True:
+        return {(cell.row - 1, cell.column - 1): (cell.value, cell.font.b, cell.number_format, cell.border.right.style, \
+            cell.border.top.style, cell.border.bottom.style, cell.border.left.style) for row in read_sheet.iter_rows() \
+            for cell in row if cell.has_style or cell.value is not None}
+    return {(cell.row - 1, cell.column - 1): cell.value for row in read_sheet.iter_rows() for cell in row \
+        if cell.value is not None}
+
+
+def make_ragged_df():
+
+    # This function will make a row multiindex dataframe whose categories have different numbers of rows
+
+    index = pd.MultiIndex.from_tuples([
+        ('Oncology', 'Female', 'No'), ('Oncology', 'Female', 'Yes'), ('Oncology', 'Male', 'No'),
+        ('Cardiology', 'Male', 'No'),
+        ('Gastro', 'Female', 'No'), ('Gastro', 'Female', 'Yes'), ('Gastro', 'Male', 'No'), ('Gastro', 'Male', 'Yes'),
+    ], names=['dept', 'gender', 'trans'])
+    return pd.DataFrame({'clients': [10, 4, 7, 3, 8, np.nan, 6, 2], 'cost': [1.5, 2.5, np.nan, 4.0, 5.25, 6.0, 7.0, 8.0]}, \
+        index=index)
+
+
+@pytest.mark.parametrize('bulk_write', [True, False])
+def test_insert_data_bulk_write_matches_cell_by_cell(bulk_write):
+    # writing runs of cells with write_column gives the same cells as writing one cell at a time
+    df = make_ragged_df().reset_index(level=[1, 2])
+
+    def write_cells(wb, sheet):
+        insert_data(df, wb, sheet, header_offset=1, data_type='decimal_1', bulk_write=bulk_write)
+
+    def write_one_at_a_time(wb, sheet):
+        insert_data(df, wb, sheet, header_offset=1, data_type='decimal_1', bulk_write=False, row_major=True)
+
+    assert write_and_read(write_cells, styles=True) == write_and_read(write_one_at_a_time, styles=True)
+
+
+@pytest.mark.parametrize('date_1904', [False, True])
+def test_excel_serials_match_write_datetime(date_1904):
+    # the serial numbers made with numpy are the numbers xlsxwriter writes for the same datetimes and timedeltas
+    dates = pd.Series(pd.to_datetime(['1899-12-31', '1900-01-01 06:00', '1900-02-28 23:59:59', '1900-03-01', \
+        '1904-01-01', '1992-08-14 17:26:00.250', '2024-02-29 12:00', '9999-12-31 23:59:59'], format='ISO8601'))
+    if date_1904 == True:
+        dates = dates[dates >= '1904-01-01']
+    timedeltas = pd.Series(pd.to_timedelta(['0s', '1 days 06:00:00', '400 days 00:00:00.5']))
+    serial_format = {'num_format': '0.000000000'}
+
+    for column in [dates, timedeltas]:
+        serials = get_excel_serials(column, date_1904)
+
+        def write_cells(wb, sheet):
+            cell_format = wb.add_format(serial_format)
+            for row_num, (value, serial) in enumerate(zip(column, serials)):
+                sheet.write_datetime(row_num, 0, value.to_pytimedelta() if column.dtype.kind == 'm' else \
+                    value.to_pydatetime(), cell_format)
+                sheet.write_number(row_num, 1, serial, cell_format)
+
+        cells = write_and_read(write_cells, {'in_memory': True, 'date_1904': date_1904})
+        for row_num in range(len(column)):
+            assert cells[(row_num, 1)] == pytest.approx(cells[(row_num, 0)], abs=1e-9)
+
+
+def test_excel_serials_keep_nulls_and_wall_clock_time():
+    column = pd.Series(pd.to_datetime(['2020-01-01 09:00', None])).dt.tz_localize('US/Eastern')
+    serials = get_excel_serials(column)
+    assert serials[0] == pytest.approx(43831 + 9 / 24)
+    assert np.isnan(serials[1])
+
+
+def test_ragged_index_runs():
+    # categories with different numbers of rows are found from the index codes
+    layout = TableLayout(make_ragged_df())
+    run_starts, run_lengths = layout.index_runs[0]
+    assert run_starts.tolist() == [0, 3, 4]
+    assert run_lengths.tolist() == [3, 1, 4]
+    run_starts, run_lengths = layout.index_runs[1]
+    assert run_starts.tolist() == [0, 2, 3, 4, 6]
+    assert run_lengths.tolist() == [2, 1, 1, 2, 2]
+    assert layout.major_group_ends.tolist() == [False, False, True, True, False, False, False, True]
+
+
+def test_ragged_index_merges_and_borders():
+    # each run of rows is merged on its own and the bottom border follows the end of each major category
+    df = make_ragged_df()
+
+    def write_cells(wb, sheet):
+        merge_row_index_cells(df, wb, sheet)
+        format_row_multiindex(df, wb, sheet)
+        insert_row_multiindex_data(df, wb, sheet)
+
+    assert write_and_read(write_cells, styles='merges') == ['A2:A4', 'A6:A9', 'B2:B3', 'B6:B7', 'B8:B9']
+    cells = write_and_read(write_cells, styles=True)
+    # the data cells on the last row of each major category get a bottom border, and the others do not
+    bottom_rows = [row_num for row_num in range(1, 9) if cells[(row_num, 3)][5] == 'thin']
+    assert bottom_rows == [3, 4, 8]
+    assert [cells[(row_num, 4)][0] for row_num in range(1, 9)] == [1.5, 2.5, '-', 4, 5.25, 6, 7, 8]
+
+
+def test_plan_sheet_flush_matches_worksheet():
+    # a whole table written through a PlanSheet gives the same cells, formats and merges as writing it directly
+    df = make_ragged_df()
+
+    def write_table(wb, sheet):
+        layout = TableLayout(df, header_offset=1, column_offset=1)
+        format_header(df, wb, sheet, layout=layout)
+        merge_row_index_cells(df, wb, sheet, layout=layout)
+        format_row_multiindex(df, wb, sheet, layout=layout)
+        insert_row_multiindex_data(df, wb, sheet, data_type='numeric', layout=layout)
+        set_row_multiindex_col_dtype(df, wb, sheet, 'cost', 'dollar_cents', layout=layout)
+        table_bottom_border(df, wb, sheet, layout=layout)
+        table_right_border(df, wb, sheet, layout=layout)
+
+    def write_table_with_plan(wb, sheet):
+        plan_sheet = PlanSheet(sheet)
+        write_table(wb, plan_sheet)
+        plan_sheet.flush()
+
+    for styles in [True, 'merges']:
+        assert write_and_read(write_table_with_plan, styles=styles) == write_and_read(write_table, styles=styles)
+
+
+def write_with_sheet_write(df, header_offset=1):
+
+    # This function will return a write_cells function that writes the data of df one value at a time with sheet.write,
+    ## the way insert_data wrote it before it picked a typed write method for each column
+
+    def write_cells(wb, sheet):
+        for row_num, row in enumerate(df.itertuples(index=False)):
+            for col_num, value in enumerate(row):
+                sheet.write(row_num + header_offset, col_num, value)
+    return write_cells
+
+
+def test_typed_writers_with_nulls_not_replaced():
+    # nulls left in string, float, integer and boolean columns are written the way sheet.write writes them
+    df = pd.DataFrame({
+        'text': pd.Series(['x', None, 'z'], dtype=object),
+        'strings': ['x', np.nan, 'z'],
+        'floats': [1.5, np.nan, 2.5],
+        'ints': [1, 2, 3],
+        'bools': [True, False, True],
+    })
+    options = {'nan_inf_to_errors': True}
+
+    cells = write_and_read(lambda wb, sheet: insert_data(df, wb, sheet, replace_nulls=False), options)
+    expected = write_and_read(write_with_sheet_write(df), options)
+    assert {cell: value for cell, value in cells.items() if cell[0] > 0} == expected
+
+
+def test_typed_writers_with_nulls_replaced():
+    # every null cell is written as the null_value and the rest keep their type
+    df = pd.DataFrame({
+        'text': ['x', None, 'z'],
+        'floats': [1.5, np.nan, np.inf],
+        'ints': pd.array([1, None, 3], dtype='Int64'),
+        'bools': pd.array([True, None, False], dtype='boolean'),
+    })
+
+    cells = write_and_read(lambda wb, sheet: insert_data(df, wb, sheet))
+    assert [cells[(row_num, 0)] for row_num in range(1, 4)] == ['x', '-', 'z']
+    assert [cells[(row_num, 1)] for row_num in range(1, 4)] == [1.5, '-', '-']
+    assert [cells[(row_num, 2)] for row_num in range(1, 4)] == [1, '-', 3]
+    assert [cells[(row_num, 3)] for row_num in range(1, 4)] == [True, '-', False]
+
+
+@pytest.mark.parametrize('bulk_write', [True, False])
+@pytest.mark.parametrize('index', [
+    pd.Index(['a', 'b', 'c'], name='dept'),
+    None,
+])
+def test_constant_memory_matches_normal_workbook(index, bulk_write):
+    # a constant_memory worksheet filled with format_header, insert_data and table_bottom_border gets the same cells as
+    ## a normal worksheet filled in any order, with insert_data writing the index in format_index's format
+    df = pd.DataFrame({'units': [1, None, 3], 'revenue': [10.5, 20.25, np.nan]})
+    if index is not None:
+        df.index = index
+
+    def write_streamed(wb, sheet):
+        format_header(df, wb, sheet, header_offset=1)
+        insert_data(df, wb, sheet, header_offset=1, data_type='decimal_1', bulk_write=bulk_write)
+        table_bottom_border(df, wb, sheet, header_offset=1)
+
+    def write_normal(wb, sheet):
+        insert_data(df, wb, sheet, header_offset=1, data_type='decimal_1', bulk_write=bulk_write)
+        if index is not None:
+            format_index(df, wb, sheet, header_offset=1, set_width=False)
+        table_bottom_border(df, wb, sheet, header_offset=1)
+        format_header(df, wb, sheet, header_offset=1)
+
+    streamed = write_and_read(write_streamed, {'constant_memory': True}, styles=True)
+    assert streamed == write_and_read(write_normal, styles=True)
+    assert streamed[(3, 0 if index is None else 1)][0] == '-'
+
+
+def test_format_index_raises_on_constant_memory_worksheet():
+    # format_index would write the index column after the rows next to it were written out
+    df = pd.DataFrame({'units': [1, 2]}, index=pd.Index(['a', 'b'], name='dept'))
+    wb = xlsxwriter.Workbook(io.BytesIO(), {'constant_memory': True})
+    with pytest.raises(Exception, match='constant_memory'):
+        format_index(df, wb, wb.add_worksheet())
+    wb.close()
+
+
+def test_outline_row_multiindex_adds_a_label_row_per_category():
+    # each outer category gets its own label row above its rows, so a collapsed group shows no data from its rows
+    index = pd.MultiIndex.from_tuples([('A', 'm', 'x'), ('A', 'm', 'y'), ('A', 'f', 'x'), ('B', 'm', 'x')], \
+        names=['dept', 'gender', 'trans'])
+    df = pd.DataFrame({'units': [1.0, np.nan, 3.0, 4.0]}, index=index)
+
+    output = io.BytesIO()
+    wb = xlsxwriter.Workbook(output, {'in_memory': True})
+    sheet = wb.add_worksheet()
+    format_header(df, wb, sheet)
+    outline_row_multiindex(df, wb, sheet, collapsed=True)
+    wb.close()
+
+    output.seek(0)
+    read_sheet = openpyxl.load_workbook(output).active
+    rows = [(list(row), read_sheet.row_dimensions[row_num].outline_level, bool(read_sheet.row_dimensions[row_num].hidden)) \
+        for row_num, row in enumerate(read_sheet.iter_rows(values_only=True), 1)]
+    assert rows == [
+        (['dept', 'gender', 'trans', 'units'], 0, False),
+        (['A', None, None, None], 0, False),
+        ([None, 'm', None, None], 1, True),
+        ([None, None, 'x', 1], 2, True),
+        ([None, None, 'y', '-'], 2, True),
+        ([None, 'f', None, None], 1, True),
+        ([None, None, 'x', 3], 2, True),
+        (['B', None, None, None], 0, False),
+        ([None, 'm', None, None], 1, True),
+        ([None, None, 'x', 4], 2, True),
+    ]
+
+
+@pytest.mark.parametrize('columns', [['units', 'units'], ['Units', 'units']])
+def test_insert_excel_table_raises_on_duplicate_headers(columns):
+    # Excel table headers are compared without case, and add_table only warns and skips the table for duplicates
+    df = pd.DataFrame([[1, 2]], columns=columns)
+    wb = xlsxwriter.Workbook(io.BytesIO(), {'in_memory': True})
+    sheet = wb.add_worksheet()
+    with pytest.raises(ValueError, match='unique'):
+        insert_excel_table(df, wb, sheet)
+    assert sheet.tables == []
+    wb.close()
+
+
+def test_outline_row_multiindex_borders_follow_the_label_rows():
+    # the border functions given the outlined layout draw below and beside the label rows and the data rows
+    index = pd.MultiIndex.from_product([['A', 'B'], ['m', 'f'], ['x', 'y']], names=['dept', 'gender', 'trans'])
+    df = pd.DataFrame({'units': np.arange(8, dtype=float)}, index=index)
+    layout = TableLayout(df)
+
+    def write_cells(wb, sheet):
+        format_header(df, wb, sheet, layout=layout)
+        assert outline_row_multiindex(df, wb, sheet, layout=layout) == 14
+        table_bottom_border(df, wb, sheet, layout=layout)
+        table_right_border(df, wb, sheet, layout=layout)
+
+    cells = write_and_read(write_cells, styles=True)
+    # 1 header row, 6 label rows (2 first level runs and 4 second level runs) and 8 data rows
+    assert layout.last_data_row == 14
+    assert [cells[(row_num, 0)][0] for row_num in [1, 8]] == ['A', 'B']
+    assert [cells[(row_num, 1)][0] for row_num in [2, 5, 9, 12]] == ['m', 'f', 'm', 'f']
+    assert cells[(14, 3)][0] == 7
+    # the bottom border is the top border of the cells below the table, and the right border the left border of the
+    ## column after it
+    assert [cells[(15, col_num)][4] for col_num in range(4)] == ['thin'] * 4
+    assert all((row_num, 4) in cells for row_num in range(15))
+    assert (15, 4) not in cells
+
+
+def read_excel_table(df, **kwargs):
+
+    # This function will write df with insert_excel_table to an in memory workbook and return the widths it returned,
+    ## the openpyxl table and the {(row, col): (value, number format, horizontal alignment)} of every cell with a value
+
+    output = io.BytesIO()
+    wb = xlsxwriter.Workbook(output, {'in_memory': True})
+    col_widths = insert_excel_table(df, wb, wb.add_worksheet(), **kwargs)
+    wb.close()
+
+    output.seek(0)
+    read_sheet = openpyxl.load_workbook(output).active
+    cells = {(cell.row - 1, cell.column - 1): (cell.value, cell.number_format, cell.alignment.horizontal) \
+        for row in read_sheet.iter_rows() for cell in row if cell.value is not None}
+    return col_widths, list(read_sheet.tables.values())[0], cells
+
+
+def test_insert_excel_table_formats_columns_and_nulls():
+    # each data column gets its data_type format, nulls are replaced and the table covers the header and data rows
+    df = pd.DataFrame({'units': [1200, np.nan], 'revenue': [2145115.54, np.inf], 'region': ['North', None]})
+
+    col_widths, table, cells = read_excel_table(df, header_offset=1, column_offset=1, data_type='numeric', \
+        col_data_types={'revenue': 'dollar_cents', 'region': 'text'}, col_width_method='data', table_name='Sales')
+    assert (table.name, table.ref, table.totalsRowCount) == ('Sales', 'B2:D4', None)
+    assert [column.name for column in table.tableColumns] == ['units', 'revenue', 'region']
+    assert [cells[(1, col_num)][0] for col_num in range(1, 4)] == ['units', 'revenue', 'region']
+    assert cells[(2, 1)] == (1200, '#,##0', None)
+    assert cells[(2, 2)] == (2145115.54, '$#,##0.00', None)
+    assert cells[(2, 3)] == ('North', 'General', None)
+    assert [cells[(3, col_num)] for col_num in range(1, 4)] == [('-', 'General', 'center')] * 3
+    # widths are measured as the values are shown with their format (ex $2,145,115.54), plus 1
+    assert col_widths == [6, 14, 6]
+
+
+def test_insert_excel_table_index_columns_keep_their_values():
+    # the named index becomes the first table column and is not given the data_type of the data columns
+    df = pd.DataFrame({'revenue': [1500.0, 2500.0]}, index=pd.Index([2020, 2021], name='Year'))
+
+    _, table, cells = read_excel_table(df, data_type='dollar')
+    assert [column.name for column in table.tableColumns] == ['Year', 'revenue']
+    assert cells[(1, 0)] == (2020, 'General', None)
+    assert cells[(1, 1)] == (1500, '$#,##0', None)
+
+    # the index columns get a data_type when they are named in col_data_types
+    _, _, cells = read_excel_table(df, data_type='dollar', col_data_types={'Year': 'numeric'})
+    assert cells[(1, 0)] == (2020, '#,##0', None)
+
+
+def test_insert_excel_table_total_row():
+    # totals that Excel works out become SUBTOTAL formulas and any other total is written as a label
+    df = pd.DataFrame({'region': ['North', 'South'], 'units': [1, 2], 'revenue': [10.5, 20.25]})
+
+    _, table, cells = read_excel_table(df, total_row={'region': 'Total', 'units': 'count', 'revenue': 'sum'})
+    assert (table.ref, table.totalsRowCount) == ('A1:C4', 1)
+    assert [column.totalsRowFunction for column in table.tableColumns] == [None, 'count', 'sum']
+    assert [cells[(3, col_num)][0] for col_num in range(3)] == ['Total', '=SUBTOTAL(103,[units])', '=SUBTOTAL(109,[revenue])']
+
+    with pytest.raises(ValueError, match='not in dataframe'):
+        read_excel_table(df, total_row={'cost': 'sum'})
+
+
+@pytest.mark.parametrize('set_widths', [
+    lambda df, wb, sheet: set_col_width(df, wb, sheet, 'cost', method='headers'),
+    lambda df, wb, sheet: set_column_widths(df, wb, sheet, method='headers'),
+    lambda df, wb, sheet: set_multiindex_column_widths(df, wb, sheet, method='headers'),
+])
+def test_header_widths_do_not_measure_the_data(monkeypatch, set_widths):
+    # with method='headers' the widths come from the column names only, so the data is never measured
+    import utility_functions
+
+    def fail(*args, **kwargs):
+        raise AssertionError('the data was measured')
+
+    for name in ['get_max_width', 'get_column_widths', 'estimate_max_width', 'estimate_column_widths']:
+        monkeypatch.setattr(utility_functions, name, fail)
+    write_and_read(lambda wb, sheet: set_widths(make_ragged_df(), wb, sheet))
+
+
+@pytest.mark.parametrize('border', [table_bottom_border, table_right_border, table_left_border])
+def test_inside_borders_raise_on_a_worksheet(border):
+    # borders inside the table are combined with the cells' formats, which only a PlanSheet can do
+    df = make_ragged_df()
+    with pytest.raises(TypeError):
+        write_and_read(lambda wb, sheet: border(df, wb, sheet, column_offset=1, outside=False))
+
+
+def test_inside_borders_combine_with_edge_and_corner_formats():
+    # borders drawn inside the table on a PlanSheet keep the value, number format, font and merges of the edge cells
+    df = make_ragged_df()
+
+    def write_cells(wb, sheet):
+        plan_sheet = PlanSheet(sheet)
+        layout = TableLayout(df, column_offset=1)
+        format_header(df, wb, plan_sheet, layout=layout)
+        merge_row_index_cells(df, wb, plan_sheet, layout=layout)
+        format_row_multiindex(df, wb, plan_sheet, layout=layout)
+        insert_row_multiindex_data(df, wb, plan_sheet, data_type='numeric', layout=layout)
+        set_row_multiindex_col_dtype(df, wb, plan_sheet, 'cost', 'dollar_cents', layout=layout)
+        table_bottom_border(df, wb, plan_sheet, layout=layout, outside=False)
+        table_right_border(df, wb, plan_sheet, layout=layout, outside=False)
+        table_left_border(df, wb, plan_sheet, 1, layout=layout, outside=False)
+        plan_sheet.flush()
+
+    cells = write_and_read(write_cells, styles=True)
+    # (value, bold, number format, right, top, bottom, left) of the corner and edge cells
+    assert cells[(0, 1)] == ('dept', True, 'General', None, None, 'thin', 'thin')
+    assert cells[(0, 5)] == ('cost', True, 'General', 'thin', None, 'thin', None)
+    assert cells[(8, 5)] == (8, False, '$#,##0.00', 'thin', None, 'thin', None)
+    assert cells[(2, 5)] == (2.5, False, '$#,##0.00', 'thin', None, None, None)
+    assert cells[(3, 5)] == ('-', False, 'General', 'thin', None, 'thin', None)
+    assert cells[(8, 4)] == (2, False, '#,##0', None, None, 'thin', None)
+    assert cells[(8, 3)] == ('Yes', True, 'General', 'thin', None, 'thin', None)
+    # the merged first level labels keep their merges, with the left border down every merged cell and the bottom
+    ## border on the last
+    assert [cells[(row_num, 1)][0] for row_num in [1, 4, 5]] == ['Oncology', 'Cardiology', 'Gastro']
+    assert [cells[(row_num, 1)][6] for row_num in range(9)] == ['thin'] * 9
+    assert cells[(8, 1)] == (None, False, 'General', None, None, 'thin', 'thin')
+    assert write_and_read(write_cells, styles='merges') == ['B2:B4', 'B6:B9', 'C2:C3', 'C6:C7', 'C8:C9']
+    # nothing is written outside the table
+    assert not [cell for cell in cells if cell[0] > 8 or cell[1] == 0 or cell[1] > 5]
+
+
+def test_insert_data_widths_match_set_column_widths(monkeypatch):
+    # the widths insert_data returns are the widths set_column_widths sets for the same data
+    import utility_functions
+
+    set_widths = {}
+    monkeypatch.setattr(utility_functions, 'set_column_spec', \
+        lambda sheet, first_col, last_col, width=None, *args: set_widths.update({first_col: width}))
+    df = pd.DataFrame({'name': ['a', 'a longer name', 'b'], 'units': [5, -12000, 7], 'cost': [1.25, 300.5, -2.0], \
+        'flag': [True, True, False]}, index=pd.Index(['x', 'y', 'z'], name='id'))
+
+    def write_cells(wb, sheet):
+        col_widths = insert_data(df, wb, sheet, col_width_method='data', set_widths=False)
+        set_column_widths(df, wb, sheet, method='data')
+        assert list(col_widths) == [set_widths[col_num] for col_num in range(1, 5)] == [14, 7, 6, 6]
+
+    write_and_read(write_cells)
+
+
+def make_ragged_header_df():
+
+    # This function will make a dataframe with three column header rows whose labels have different numbers of columns
+
+    columns = pd.MultiIndex.from_tuples([('2023', 'Q1', 'units'), ('2023', 'Q1', 'cost'), ('2023', 'Q2', 'units'), \
+        ('2024', 'Q1', 'units'), ('2024', 'Q1', 'cost')])
+    return pd.DataFrame([[1, 2.5, 3, 4, 5.5]], columns=columns)
+
+
+@pytest.mark.parametrize('options, upper_rows, merges', [
+    # without merge_cells every column of a run gets its label, as before the header rows were written by runs
+    ({}, [['2023'] * 3 + ['2024'] * 2, ['Q1', 'Q1', 'Q2', 'Q1', 'Q1']], []),
+    # sparse_labels writes each label only in the first column of its run
+    ({'sparse_labels': True}, [['2023', None, None, '2024', None], ['Q1', None, 'Q2', 'Q1', None]], []),
+    # merge_cells writes each label once over a merged run
+    ({'merge_cells': True}, [['2023', None, None, '2024', None], ['Q1', None, 'Q2', 'Q1', None]], \
+        ['A1:C1', 'A2:B2', 'D1:E1', 'D2:E2']),
+])
+def test_format_header_multiindex_ragged_levels(options, upper_rows, merges):
+    # each of the header rows above the last one is written by runs of the same label, for any number of levels
+    df = make_ragged_header_df()
+
+    def write_cells(wb, sheet):
+        format_header_multiindex(df, wb, sheet, **options)
+
+    cells = write_and_read(write_cells)
+    assert [[cells.get((row_num, col_num)) for col_num in range(5)] for row_num in range(2)] == upper_rows
+    assert [cells[(2, col_num)] for col_num in range(5)] == ['units', 'cost', 'units', 'units', 'cost']
+    assert write_and_read(write_cells, styles='merges') == merges
+    # every unmerged cell of the upper header rows has the header format, with or without a label
+    if merges == []:
+        styled_cells = write_and_read(write_cells, styles=True)
+        assert all(styled_cells[(row_num, col_num)][1] for row_num in range(2) for col_num in range(5))
@@ -0,0 +1,260 @@
+# Tests for the helper functions in utility_functions.py
+## run them from the repo folder with: python -m pytest
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+import xlsxwriter
+
+from utility_functions import PlanSheet, TableLayout, defer_column_specs, estimate_column_widths, estimate_max_width, \
+    flush_column_specs, get_column_spans, get_date_format_width, get_number_format_width, get_table_layout, set_column_spec
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+def write_and_read(write_cells, workbook_options=None, plan=False):
+
+    # This function will write a sheet with write_cells(wb, sheet) to an in memory workbook and return the
+    ## {(row, col): (value, bold, top border)} of every cell in it, read back with openpyxl
+    ## with plan=True the cells are written through a PlanSheet that is flushed before the workbook is closed
+
+    output = io.BytesIO()
+    wb = xlsxwriter.Workbook(output, dict({'in_memory': True}, **(workbook_options or {})))
+    sheet = wb.add_worksheet()
+    if plan == True:
+        plan_sheet = PlanSheet(sheet)
+        write_cells(wb, plan_sheet)
+        plan_sheet.flush()
+    else:
+        write_cells(wb, sheet)
+    wb.close()
+
+    output.seek(0)
+    read_sheet = openpyxl.load_workbook(output).active
+    cells = {}
+    for row in read_sheet.iter_rows():
+        for cell in row:
+            if cell.has_style or cell.value is not None:
+                cells[(cell.row - 1, cell.column - 1)] = (cell.value, cell.font.b, cell.border.top.style)
+    merges = sorted(str(merge) for merge in read_sheet.merged_cells.ranges)
+    return cells, merges
+
+
+def assert_plan_matches_sheet(write_cells, workbook_options=None):
+
+    # This function will check that writing through a PlanSheet gives the same cells and merges as the worksheet
+
+    assert write_and_read(write_cells, workbook_options, plan=True) == write_and_read(write_cells, workbook_options)
+
+
+def test_plan_keeps_value_under_blank_with_no_format():
+    # a blank with no format is not written by the worksheet, so the value under it stays
+    def write_cells(wb, sheet):
+        sheet.write(0, 0, 'keep')
+        sheet.write_blank(0, 0, None)
+        sheet.write(1, 0, 'keep')
+        sheet.write(1, 0, None)
+        sheet.write('A3', 'keep')
+        sheet.write('A3', '')
+        sheet.write_column(0, 1, ['keep', 'keep'])
+        sheet.write_column(0, 1, [None, ''])
+
+    assert_plan_matches_sheet(write_cells)
+    cells, _ = write_and_read(write_cells, plan=True)
+    assert cells[(0, 0)][0] == 'keep'
+    assert cells[(2, 0)][0] == 'keep'
+    assert cells[(1, 1)][0] == 'keep'
+
+
+def test_plan_blank_with_format_replaces_value():
+    def write_cells(wb, sheet):
+        bold = wb.add_format({'bold': True})
+        sheet.write(0, 0, 'gone')
+        sheet.write_blank(0, 0, None, bold)
+
+    assert_plan_matches_sheet(write_cells)
+
+
+def test_plan_writes_last_value_of_each_cell():
+    def write_cells(wb, sheet):
+        bold = wb.add_format({'bold': True})
+        sheet.write(0, 0, 1)
+        sheet.write_number(0, 0, 2, bold)
+        sheet.write_row(1, 0, ['a', 'b', 'c'])
+        sheet.write_string(1, 1, 'z')
+
+    assert_plan_matches_sheet(write_cells)
+
+
+def test_plan_merge_keeps_last_label_and_format():
+    def write_cells(wb, sheet):
+        bold = wb.add_format({'bold': True, 'top': 1})
+        sheet.merge_range(0, 0, 2, 0, None)
+        sheet.write(0, 0, 'label', bold)
+        sheet.write_blank(1, 0, None)
+        sheet.merge_range(0, 1, 0, 2, 'across', bold)
+
+    assert_plan_matches_sheet(write_cells)
+
+
+def test_plan_merge_errors():
+    output = io.BytesIO()
+    wb = xlsxwriter.Workbook(output, {'constant_memory': True})
+    plan_sheet = PlanSheet(wb.add_worksheet())
+    # merges over more than one row cannot be streamed row by row
+    with pytest.raises(ValueError):
+        plan_sheet.merge_range(0, 0, 1, 0, 'label')
+    plan_sheet.merge_range(0, 0, 0, 1, 'label')
+    with pytest.raises(xlsxwriter.exceptions.OverlappingRange):
+        plan_sheet.merge_range(0, 1, 0, 2, 'label')
+    plan_sheet.flush()
+    wb.close()
+
+
+def test_get_table_layout_checks_offsets_against_layout():
+    df = pd.DataFrame({'units': [1, 2]})
+    layout = TableLayout(df, header_offset=2, column_offset=1)
+    # offsets left at 0 or matching the layout use the layout
+    assert get_table_layout(df, layout=layout) is layout
+    assert get_table_layout(df, 2, 1, layout) is layout
+    # an offset that does not match the layout is not silently ignored
+    with pytest.raises(ValueError, match='header_offset'):
+        get_table_layout(df, 3, layout=layout)
+    with pytest.raises(ValueError, match='column_offset'):
+        get_table_layout(df, column_offset=4, layout=layout)
+    with pytest.raises(ValueError, match='different dataframe'):
+        get_table_layout(df.copy(), layout=layout)
+
+
+@pytest.mark.parametrize('values, width', [
+    (pd.Series([True, False] * 1000), 5),
+    (pd.Series([True] * 2000), 4),
+    (pd.Series([-12345, 7] * 1000), 6),
+    (pd.Series(['a', 'bb', None] * 1000, dtype='category'), 3),
+    (pd.Series(['a', 'bb'] * 1000, dtype='category'), 2),
+])
+def test_estimate_max_width_exact_statistics(values, width):
+    # booleans, integers and categoricals are measured exactly without sampling
+    assert estimate_max_width(values, sample_size=10) == width
+
+
+def test_estimate_max_width_samples_large_columns():
+    # only sample_size values are measured, so a single long value is usually missed
+    values = pd.Series(['abc'] * 9999 + ['x' * 50])
+    assert estimate_max_width(values, sample_size=100) == 3
+    # columns with no more than sample_size values are measured in full
+    assert estimate_max_width(values, sample_size=10000) == 50
+    # the smallest and largest values of float columns are always measured
+    floats = pd.Series([1.5] * 9999 + [-123456.25])
+    assert estimate_max_width(floats, sample_size=100) == len('-123456.25')
+
+
+def test_estimate_max_width_quantile_and_cap():
+    # the quantile ignores the longest values and the cap limits the width
+    values = pd.Series(['a' * 10] * 90 + ['a' * 100] * 10)
+    assert estimate_max_width(values, sample_size=1000) == 100
+    assert estimate_max_width(values, sample_size=1000, quantile=0.5) == 10
+    assert estimate_max_width(values, sample_size=1000, cap=40) == 40
+    assert estimate_column_widths(pd.DataFrame({'text': values, 'flag': True}), cap=40) == [40, 4]
+
+
+@pytest.mark.parametrize('column_specs, column_spans', [
+    # next to each other columns with the same width and format are joined
+    ([(0, 10, None), (1, 10, None), (2, 10, None)], [(0, 2, 10, None)]),
+    # a gap or a new width starts a new span
+    ([(0, 10, None), (2, 10, None), (3, 12, None)], [(0, 0, 10, None), (2, 2, 10, None), (3, 3, 12, None)]),
+    # the last spec of a column is used, and the specs do not need to be in column order
+    ([(2, 10, None), (0, 10, None), (1, 8, None), (1, 10, None)], [(0, 2, 10, None)]),
+    ([], []),
+])
+def test_get_column_spans(column_specs, column_spans):
+    assert get_column_spans(column_specs) == column_spans
+
+
+def test_get_column_spans_splits_on_format():
+    # formats are compared by identity, since they are the workbook's format objects
+    wb = xlsxwriter.Workbook(io.BytesIO())
+    bold, other_bold = wb.add_format({'bold': True}), wb.add_format({'bold': True})
+    assert get_column_spans([(0, 10, bold), (1, 10, bold), (2, 10, other_bold)]) == [(0, 1, 10, bold), (2, 2, 10, other_bold)]
+    wb.close()
+
+
+class ColumnSheet:
+
+    # this class will stand in for a worksheet and record its set_column calls
+
+    def __init__(self):
+        self.set_columns = []
+
+    def set_column(self, first_col, last_col, width=None, cell_format=None):
+        self.set_columns.append((first_col, last_col, width, cell_format))
+
+
+def test_deferred_column_specs_are_held_per_worksheet():
+    # each worksheet holds its own specs until it is flushed, and a PlanSheet holds its own apart from its worksheet
+    sheet, other_sheet = ColumnSheet(), ColumnSheet()
+    defer_column_specs(sheet)
+    defer_column_specs(other_sheet)
+    plan_sheet = PlanSheet(sheet)
+    set_column_spec(sheet, 0, 1, 10)
+    set_column_spec(other_sheet, 0, 0, 20)
+    set_column_spec(plan_sheet, 3, 4, 30)
+    set_column_spec(sheet, 1, 2, 10)
+    assert sheet.set_columns == other_sheet.set_columns == []
+
+    flush_column_specs(sheet)
+    assert sheet.set_columns == [(0, 2, 10, None)]
+    assert other_sheet.set_columns == []
+    # once flushed the worksheet sets its columns straight away again
+    set_column_spec(sheet, 5, 5, 8)
+    assert sheet.set_columns == [(0, 2, 10, None), (5, 5, 8, None)]
+
+    plan_sheet.flush()
+    flush_column_specs(other_sheet)
+    assert sheet.set_columns[-1] == (3, 4, 30, None)
+    assert other_sheet.set_columns == [(0, 0, 20, None)]
+    # flushing a worksheet that holds nothing sets nothing
+    flush_column_specs(other_sheet)
+    assert other_sheet.set_columns == [(0, 0, 20, None)]
+
+
+@pytest.mark.parametrize('num_format, values, shown', [
+    ('#,##0', [0], '0'),
+    ('#,##0', [999.6], '1,000'),
+    ('#,##0', [-1234, 5], '-1,234'),
+    ('#,##0', [1234567, np.nan, np.inf], '1,234,567'),
+    ('#,##0.0', [12.345, 0.5], '12.3'),
+    ('#,##0.00', [-1234.5, 100], '-1,234.50'),
+    ('$#,##0', [123456, 7], '$123,456'),
+    ('$#,##0.00', [-0.5, 3], '-$0.50'),
+    ('0%', [0.5, 0.07], '50%'),
+    ('0%', [12.5], '1250%'),
+    ('0.0%', [1.2345], '123.5%'),
+    ('0.00%', [-0.001234, 0.01], '-0.12%'),
+])
+def test_get_number_format_width(num_format, values, shown):
+    # the width is the length of the widest value as Excel shows it with the number format
+    assert get_number_format_width(pd.Series(values, dtype=float), num_format) == len(shown)
+
+
+@pytest.mark.parametrize('num_format, values, shown', [
+    ('yyyy-mm-dd', ['2024-01-05', None], '2024-01-05'),
+    ('m/d/yyyy', ['2024-01-05'], '1/5/2024'),
+    ('m/d/yyyy', ['2024-01-05', '2024-12-25'], '12/25/2024'),
+    ('yyyy-mm-dd h:mm', ['2024-01-05 09:05'], '2024-01-05 9:05'),
+    ('yyyy-mm-dd h:mm', ['2024-01-05 09:05', '2024-01-05 13:30'], '2024-01-05 13:30'),
+    ('m/d/yyyy h:mm AM/PM', ['2024-01-05 09:05', '2024-01-05 13:00'], '1/5/2024 9:05 AM'),
+    ('m/d/yyyy h:mm AM/PM', ['2024-01-05 00:30'], '1/5/2024 12:30 AM'),
+    ('m/d/yyyy h:mm AM/PM', ['2024-01-05 22:00'], '1/5/2024 10:00 PM'),
+])
+def test_get_date_format_width(num_format, values, shown):
+    # the width is the length of the widest value as Excel shows it with the date format
+    assert get_date_format_width(pd.Series(pd.to_datetime(values)), num_format) == len(shown)
+
+
+def test_format_widths_of_empty_columns():
+    # columns with nothing shown as a number or date are 0 wide
+    assert get_number_format_width(pd.Series([np.nan, np.inf]), '#,##0') == 0
+    assert get_date_format_width(pd.Series([pd.NaT], dtype='datetime64[ns]'), 'yyyy-mm-dd') == 0
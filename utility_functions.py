@@ -1,3 +1,10 @@
+from functools import cached_property
+from warnings import warn
+
+from xlsxwriter.exceptions import OverlappingRange
+from xlsxwriter.utility import xl_cell_to_rowcol, xl_range
+
+
 def return_divisible_ints(start_num, end_num, denominator):
     
     # this function will return the numbers divisible by the denominator between start_num and end_num, inclusive
@@ -43,4 +50,1550 @@ def clean_header_string(string):
         return re.sub(r'((?<=[a-z])[A-Z]|(?<!\A)[A-Z](?=[a-z]))', r' \1', string)
     else: 
         # else return string with first letter capitalized
-        return string.title()
\ No newline at end of file
+        return string.title()
+
+def get_column_arrays(df):
+
+    # this function will pull each data column out of a dataframe once, as a numpy array in the column's own dtype
+    ## df.values builds an object copy of the whole dataframe when the columns have mixed dtypes, so the insert functions
+    ## use this instead of calling df.values for every column they write
+    ## datetime and timedelta columns are returned as pandas Timestamp/Timedelta objects so they are still written as dates
+
+    # MANDATORY:
+    ## df is the dataframe to pull the columns from
+
+    # create empty list to hold the column arrays
+    column_arrays = []
+
+    # iterating over the positions of the data columns (positions are used so duplicate column names are not an issue)
+    for col_num in range(len(df.columns)):
+        column = df.iloc[:, col_num]
+        # datetime64 and timedelta64 columns are kept as pandas objects, which xlsxwriter knows how to write
+        if column.dtype.kind in 'mM':
+            column_arrays.append(column.to_numpy(dtype=object))
+        else:
+            # every other column keeps its native dtype (int64, float64, bool, object etc)
+            column_arrays.append(column.to_numpy())
+
+    return column_arrays
+
+
+def get_column_writers(df, sheet):
+
+    # this function will pick the xlsxwriter write method for each data column once from the column's dtype
+    ## sheet.write works out the type of every single value it is given before passing it on to write_number,
+    ## write_string etc, so the insert functions call the typed write method of the column directly instead
+    ## the values are converted in bulk to the type the write method expects (ex int64 to float)
+    ## columns the dtype does not settle (mixed object columns etc) keep using sheet.write
+
+    # MANDATORY:
+    ## df is the dataframe to pull the columns from
+    ## sheet is the worksheet the columns will be written to
+
+    import numpy as np
+    import pandas as pd
+
+    # integers above this size cannot be held exactly as a float, which is what Excel stores numbers as
+    max_exact_int = 2**53
+
+    # dates are written as serial numbers, which need a date format to show as dates
+    def write_serial(row_num, col_num, serial, cell_format=None):
+        # like write_datetime, use the workbook's default_date_format when no format is given
+        if cell_format == None:
+            cell_format = sheet.default_date_format
+        return sheet.write_number(row_num, col_num, serial, cell_format)
+
+    # null cells only reach the write method when replace_nulls is False, so columns holding nulls send the cells that
+    ## are not value_type to sheet.write, which writes them as it always has (None as a blank, NaN as an error etc)
+    def write_typed_or_null(typed_writer, value_type):
+        def write_value(row_num, col_num, value, cell_format=None):
+            if isinstance(value, value_type):
+                return typed_writer(row_num, col_num, value, cell_format)
+            return sheet.write(row_num, col_num, value, cell_format)
+        return write_value
+
+    # start from the native column arrays and swap in converted arrays where needed
+    column_arrays = get_column_arrays(df)
+    # create empty list to hold the write methods
+    column_writers = []
+
+    # iterating over the positions of the data columns:
+    for col_num in range(len(df.columns)):
+        column = df.iloc[:, col_num]
+        kind = column.dtype.kind
+
+        # user defined write handlers only run through sheet.write, so they are left to it
+        if sheet.write_handlers:
+            column_writers.append(sheet.write)
+        # boolean columns
+        elif kind == 'b':
+            if column.hasnans:
+                column_writers.append(write_typed_or_null(sheet.write_boolean, bool))
+            else:
+                column_writers.append(sheet.write_boolean)
+        # float columns, nulls are written by the null path so NaN is fine here
+        elif kind == 'f':
+            column_arrays[col_num] = column.to_numpy(dtype=float, na_value=np.nan)
+            column_writers.append(sheet.write_number)
+        # integer columns (including nullable Int64 etc)
+        elif kind in 'iu':
+            # if any value is too big to be held as a float, write the original python ints with sheet.write
+            ## the abs is taken on the floats so it cannot overflow at the minimum int64
+            if np.nanmax(np.abs(column.to_numpy(dtype=float, na_value=np.nan)), initial=0) > max_exact_int:
+                column_writers.append(sheet.write)
+            else:
+                column_arrays[col_num] = column.to_numpy(dtype=float, na_value=np.nan)
+                column_writers.append(sheet.write_number)
+        # datetime and timedelta columns are converted to Excel serial numbers all at once
+        elif kind in 'mM':
+            column_arrays[col_num] = get_excel_serials(column, sheet.date_1904)
+            column_writers.append(write_serial)
+        # columns holding only strings
+        elif pd.api.types.infer_dtype(column, skipna=True) == 'string':
+            # sheet.write turns some strings into other cell types (formulas, urls, numbers or blanks), so those
+            ## columns are left to it
+            strings = column.dropna().astype(str)
+            special_strings = strings.eq('')
+            if sheet.strings_to_formulas:
+                special_strings |= strings.str.startswith('=')
+            special_strings |= strings.str.startswith('{=') & strings.str.endswith('}')
+            if sheet.strings_to_urls:
+                special_strings |= strings.str.match(r'(ftp|http)s?://|mailto:|(in|ex)ternal:|file://')
+            if sheet.strings_to_numbers or special_strings.any():
+                column_writers.append(sheet.write)
+            elif column.hasnans:
+                column_writers.append(write_typed_or_null(sheet.write_string, str))
+            else:
+                column_writers.append(sheet.write_string)
+        # anything else can hold mixed types so sheet.write sorts out each value
+        else:
+            column_writers.append(sheet.write)
+
+    return column_arrays, column_writers
+
+
+def get_excel_serials(column, date_1904=False):
+
+    # this function will convert a datetime or timedelta column to Excel serial numbers (days since the Excel epoch, with
+    ## the time as the fraction of the day) all at once with numpy, giving the same numbers as xlsxwriter's write_datetime
+    ## NaT becomes NaN, so it is picked up as a null
+    ## timezone aware columns are written as their wall clock time in their own timezone, since Excel dates have no
+    ## timezone (ex 2020-01-01 09:00-05:00 is written as 2020-01-01 09:00)
+
+    # MANDATORY:
+    ## column is the pandas series to convert
+
+    # OPTIONAL:
+    ## date_1904 will count days from the 1904 epoch used by the workbook date_1904 option. defaults to False
+
+    import numpy as np
+    import pandas as pd
+
+    # timedeltas are a count of days so they have no epoch
+    if column.dtype.kind == 'm':
+        is_timedelta = True
+        microseconds = column.to_numpy(dtype='timedelta64[us]')
+    else:
+        is_timedelta = False
+        # drop the timezone, keeping the wall clock time
+        if isinstance(column.dtype, pd.DatetimeTZDtype):
+            column = column.dt.tz_localize(None)
+        dates = column.to_numpy(dtype='datetime64[us]')
+        if date_1904 == True:
+            microseconds = dates - np.datetime64('1904-01-01', 'us')
+        else:
+            microseconds = dates - np.datetime64('1899-12-31', 'us')
+
+    # find NaT before the values are turned into integers
+    nulls = np.isnat(microseconds)
+    microseconds = microseconds.astype(np.int64)
+
+    # split into whole days and the microseconds into the day, then make the time a fraction of the day
+    days, day_microseconds = np.divmod(microseconds, 86400 * 10**6)
+    seconds = (day_microseconds // 10**6).astype(float) + (day_microseconds % 10**6) / 1e6
+    serials = days + seconds / 86400
+
+    if is_timedelta == False:
+        # Excel counts a time on 1900-01-01 from day 0
+        serials[dates.astype('datetime64[D]') == np.datetime64('1900-01-01')] -= 1
+        # Excel wrongly treats 1900 as a leap year, so dates after 1900-02-28 are one day later
+        if date_1904 == False:
+            serials[serials > 59] += 1
+
+    serials[nulls] = np.nan
+
+    return serials
+
+
+def get_null_mask(df, replace_nulls=True):
+
+    # this function will return a boolean numpy array shaped like the data (rows x columns) that is True for every null cell
+    ## NaN, None, NaT and pd.NA are null, and so are inf and -inf since Excel cannot hold them either
+    ## it is computed once per dataframe so the insert functions do not have to call pd.isna on every cell
+
+    # MANDATORY:
+    ## df is the dataframe to check for nulls
+
+    # OPTIONAL:
+    ## replace_nulls is the replace_nulls argument of the calling function. when it is False no cell is treated as null,
+    ##     so the data is written as is
+
+    import numpy as np
+
+    # if nulls are not being replaced, return a mask with no nulls in it
+    if replace_nulls == False:
+        return np.zeros(df.shape, dtype=bool)
+
+    # get the null cells of the whole dataframe at once
+    null_mask = df.isna().to_numpy(copy=True)
+
+    # iterating over the positions of the data columns:
+    for col_num in range(len(df.columns)):
+        column = df.iloc[:, col_num]
+        # only float columns can hold inf values
+        if column.dtype.kind == 'f':
+            # add the inf and -inf cells to the null cells
+            null_mask[:, col_num] |= np.isinf(column.to_numpy(dtype=float, na_value=np.nan))
+
+    return null_mask
+
+
+def write_runs(sheet, row_num, col_num, values, cell_classes, class_formats, null_value='-', by_row=False, writer=None):
+
+    # this function will write a column (or row) of values with as few write calls as possible
+    ## cells next to each other that share a format class are written together with xlsxwriter's write_column
+    ## (or write_row) instead of one sheet.write call per cell
+
+    # MANDATORY:
+    ## sheet is your worksheet
+    ## row_num is the row of the first cell
+    ## col_num is the column of the first cell
+    ## values is the list or numpy array of values to write
+    ## cell_classes is an integer numpy array the same length as values holding the format class of each cell
+    ## class_formats is a list holding a (cell_format, is_null) pair for each class
+    ##     cells in a class where is_null is True are written as null_value
+
+    # OPTIONAL:
+    ## null_value is what replaces nulls. defaults to '-'
+    ## by_row will write the values across the row instead of down the column. defaults to False
+    ## writer is the write method for the values that are not null (from get_column_writers). when by_row is True it can
+    ##     be a list holding the write method of each value. defaults to None, which writes the runs with write_column
+    ##     (or write_row)
+
+    import numpy as np
+
+    # nothing to write for an empty column or row
+    if len(cell_classes) == 0:
+        return
+
+    # tolist turns numpy values into python values, which xlsxwriter writes fastest
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+
+    # get the positions where the class changes, which is where each new run of cells starts
+    run_starts = np.flatnonzero(np.diff(cell_classes)) + 1
+    run_starts = [0] + run_starts.tolist()
+    run_ends = run_starts[1:] + [len(cell_classes)]
+
+    # iterating over the runs of cells:
+    for start, end in zip(run_starts, run_ends):
+        # get the format for the run from its class
+        cell_format, is_null = class_formats[cell_classes[start]]
+        # a null run is filled with the null value
+        if is_null == True:
+            run_values = [null_value] * (end - start)
+        else:
+            run_values = values[start:end]
+        # write the run across the row or down the column
+        if writer == None or is_null == True:
+            if by_row == True:
+                sheet.write_row(row_num, col_num + start, run_values, cell_format)
+            else:
+                sheet.write_column(row_num + start, col_num, run_values, cell_format)
+        # write the run one cell at a time with the typed write method
+        elif by_row == True:
+            # a list holds the write method of each value in the row
+            if isinstance(writer, list):
+                for offset, value in enumerate(run_values):
+                    writer[start + offset](row_num, col_num + start + offset, value, cell_format)
+            else:
+                for offset, value in enumerate(run_values):
+                    writer(row_num, col_num + start + offset, value, cell_format)
+        else:
+            for offset, value in enumerate(run_values):
+                writer(row_num + start + offset, col_num, value, cell_format)
+
+
+def get_col_data_types(df, data_type=None, col_data_types=None):
+
+    # this function will return a list with the data_type of each data column, so a whole table can be written with the
+    ## final format of every column in one pass instead of writing it once and then again for each typed column
+    ## columns are matched by their name, or for a column multiindex by any level of their name (like the set_*_dtype
+    ## functions). when a column matches more than one name, the last one in col_data_types is used
+
+    # MANDATORY:
+    ## df is your data from your dataframe
+
+    # OPTIONAL:
+    ## data_type is the data_type of the columns that are not in col_data_types. defaults to None
+    ## col_data_types is a dictionary of {col_name: data_type}. defaults to None, which returns data_type as it is
+
+    # every column gets data_type when there is no mapping
+    if col_data_types == None:
+        return data_type
+
+    if isinstance(col_data_types, dict):
+        pass
+    else:
+        raise TypeError(f"col_data_types must be a dictionary of {{col_name: data_type}}, not {type(col_data_types).__name__}.")
+
+    # create list of all col_names, using the last header row for a column multiindex
+    if df.columns.nlevels > 1:
+        col_name_list = [df_col_name for df_col_name in df.columns.get_level_values(-1)]
+    else:
+        col_name_list = [df_col_name for df_col_name in df.columns]
+
+    col_types = [data_type] * len(df.columns)
+
+    for col_name, col_type in col_data_types.items():
+        # error if entered col_name not in dataframe
+        if col_name not in col_name_list:
+            raise ValueError(f"{col_name} not in dataframe. Columns in data are: {col_name_list}")
+        # error if the data_type is not valid
+        if col_type in DATA_TYPE_FORMATS or col_type == None or col_type == 'text':
+            pass
+        else:
+            raise ValueError(f"{col_type} is not a valid data_format option. Valid options are: {list(DATA_TYPE_FORMATS)}")
+
+        # iterating over the columns:
+        for col_num, df_col_name in enumerate(df.columns):
+            # the column matches on its name, or on any level of a multilevel column name
+            if df.columns.nlevels > 1:
+                matches = col_name in df_col_name
+            else:
+                matches = df_col_name == col_name
+            if matches:
+                col_types[col_num] = col_type
+
+    return col_types
+
+
+def is_streamed_sheet(sheet):
+
+    # this function will return True when the cells written to sheet go straight to a worksheet from a constant_memory
+    ## workbook, which writes out each row as soon as a lower row is written, so cells above it can no longer be written
+    ## a PlanSheet is not streamed, since it writes its cells in row order when it is flushed
+
+    # MANDATORY:
+    ## sheet is your worksheet (or a PlanSheet)
+
+    return bool(getattr(sheet, 'constant_memory', False)) and not isinstance(sheet, PlanSheet)
+
+
+def write_table_data(wb, sheet, df, layout, data_type=None, replace_nulls=True, null_value='-', null_align='center', \
+    row_borders=False, col_borders=False, data_cols=None, row_major=False, bulk_write=True, null_mask=None, \
+    index_format=None, data_rows=None):
+
+    # this function is the writing engine behind the insert functions and the set_*_dtype functions for row and column
+    ## multiindexes. it works for any number of row and column levels
+    ## every cell is given a format class from three things worked out with numpy broadcasting:
+    ##     1 if the cell is null, 2 if it is on the last row per major index category and 4 if it is on the last column per
+    ##     header row 1 category
+    ## so the 8 combinations of data/null, bottom border and right border are a single class number, and each class is
+    ## written with its own format instead of being picked out cell by cell with nested if statements
+    ## when the columns have different data_types, each data_type adds its own 8 classes
+
+    # MANDATORY:
+    ## wb is your workbook
+    ## sheet is your worksheet
+    ## df is your data from your dataframe
+    ## layout is the TableLayout for df (see get_table_layout)
+
+    # OPTIONAL:
+    ## data_type is the type of data from DATA_TYPE_FORMATS, 'text' or None, or a list with the data_type of each data
+    ##     column of df. defaults to None
+    ## replace_nulls will replace null values with null_value. defaults to True
+    ## null_value is what replaces nulls. defaults to '-'
+    ## null_align is the horizontal alignment for null values. defaults to center
+    ## row_borders will give the last row per major index category a bottom border. defaults to False
+    ## col_borders will give the last column per header row 1 category a right border. defaults to False
+    ## data_cols is a list of the positions of the data columns to write. defaults to None, which writes every column
+    ## row_major will write the data one full row at a time instead of one full column at a time. defaults to False
+    ##     this is always used on worksheets from a workbook created with the constant_memory option
+    ## bulk_write will write each run of cells that share a format class with one call instead of one call per cell.
+    ##     defaults to True
+    ## null_mask is the null mask of df from get_null_mask, if the caller already has it. defaults to None
+    ## index_format will write the row index labels of each row in front of its data with this format. it is only used
+    ##     with row_major, for worksheets where the index cannot be written on its own. defaults to None (no index)
+    ## data_rows is a list with the row of each data row counted from the layout's first data row, for tables with other
+    ##     rows between the data rows (see outline_row_multiindex). the data is written one full row at a time when it is
+    ##     given. defaults to None, which writes the data rows next to each other
+
+    import numpy as np
+
+    # constant_memory worksheets flush each row as soon as a lower row is written, so they must be filled row by row
+    if getattr(sheet, 'constant_memory', False):
+        row_major = True
+    # data rows that are not next to each other are written one row at a time
+    if data_rows is None:
+        data_rows = range(len(df))
+    else:
+        row_major = True
+
+    # the index labels of each row, as a list per row, written in front of the row's data
+    if index_format is not None and row_major == True and layout.num_row_indices > 0:
+        index_col = layout.first_data_col - layout.num_row_indices
+        index_rows = [list(label) if isinstance(label, tuple) else [label] for label in df.index.tolist()]
+    else:
+        index_rows = None
+
+    if data_cols == None:
+        data_cols = list(range(len(df.columns)))
+
+    # pull each data column out of the dataframe once, with the write method for its dtype
+    column_arrays, column_writers = get_column_writers(df, sheet)
+    # find the cells to be replaced with null_value once for the whole dataframe
+    if null_mask is None:
+        null_mask = get_null_mask(df, replace_nulls)
+
+    # the data_type of each written column and a code for each different data_type
+    if isinstance(data_type, list):
+        col_types = [data_type[col_num] for col_num in data_cols]
+    else:
+        col_types = [data_type] * len(data_cols)
+    unique_types = list(dict.fromkeys(col_types))
+    type_codes = np.array([unique_types.index(col_type) for col_type in col_types], dtype=np.int32)
+
+    # the class of every cell of the written columns, as rows x data_cols
+    cell_classes = null_mask[:, data_cols].astype(np.int32) + type_codes[None, :] * 8
+    if row_borders == True:
+        cell_classes += layout.major_group_ends.astype(np.int32)[:, None] * 2
+    if col_borders == True:
+        cell_classes += layout.column_group_ends[0][data_cols].astype(np.int32)[None, :] * 4
+
+    # the (cell_format, is_null) pair of each class. only the classes that are used get a format, so no unused
+    ## formats are added to the workbook
+    class_formats = [None] * (8 * len(unique_types))
+    for cell_class in np.unique(cell_classes).tolist():
+        if cell_class & 1:
+            cell_format = get_null_format(wb, null_align, bottom=bool(cell_class & 2), right=bool(cell_class & 4))
+        else:
+            cell_format = get_data_type_format(wb, unique_types[cell_class // 8], bottom=bool(cell_class & 2), \
+                right=bool(cell_class & 4))
+        class_formats[cell_class] = (cell_format, bool(cell_class & 1))
+
+    # the position of the first data row and the worksheet column of each written data column
+    first_row = layout.first_data_row
+    sheet_cols = [col_num + layout.first_data_col for col_num in data_cols]
+
+    # bulk writing
+    if bulk_write == True:
+        if row_major == True:
+            # written columns next to each other are written across the row together
+            col_breaks = (np.flatnonzero(np.diff(data_cols) != 1) + 1).tolist()
+            col_spans = list(zip([0] + col_breaks, col_breaks + [len(data_cols)]))
+            # rows are taken from the column arrays in chunks so the whole dataframe is never held as python values
+            chunk_size = 1024
+            # iterating over the chunks of rows:
+            for chunk_start in range(0, len(df), chunk_size):
+                chunk_columns = [column_arrays[col_num][chunk_start:chunk_start + chunk_size].tolist() for col_num in data_cols]
+                # iterating over the rows in the chunk:
+                for chunk_row in range(min(chunk_size, len(df) - chunk_start)):
+                    row_num = chunk_start + chunk_row
+                    if index_rows is not None:
+                        sheet.write_row(first_row + data_rows[row_num], index_col, index_rows[row_num], index_format)
+                    # write the row's runs of cells across each span of columns
+                    for span_start, span_end in col_spans:
+                        write_runs(sheet, first_row + data_rows[row_num], sheet_cols[span_start], \
+                            [column[chunk_row] for column in chunk_columns[span_start:span_end]], \
+                            cell_classes[row_num, span_start:span_end], class_formats, null_value, by_row=True, \
+                            writer=[column_writers[col_num] for col_num in data_cols[span_start:span_end]])
+        else:
+            # iterating over the written data columns:
+            for position, col_num in enumerate(data_cols):
+                # write the column's runs of cells down the column
+                write_runs(sheet, first_row, sheet_cols[position], column_arrays[col_num], cell_classes[:, position], \
+                    class_formats, null_value, writer=column_writers[col_num])
+        return
+
+    # cell by cell writing, one class lookup per cell
+    column_values = [column_arrays[col_num].tolist() for col_num in data_cols]
+    column_classes = [cell_classes[:, position].tolist() for position in range(len(data_cols))]
+
+    if row_major == True:
+        cells = ((row_num, position) for row_num in range(len(df)) for position in range(len(data_cols)))
+    else:
+        cells = ((row_num, position) for position in range(len(data_cols)) for row_num in range(len(df)))
+
+    for row_num, position in cells:
+        if index_rows is not None and position == 0:
+            sheet.write_row(first_row + data_rows[row_num], index_col, index_rows[row_num], index_format)
+        cell_format, is_null = class_formats[column_classes[position][row_num]]
+        # if data is null insert the null value, otherwise insert the data with the column's write method
+        if is_null == True:
+            sheet.write(first_row + data_rows[row_num], sheet_cols[position], null_value, cell_format)
+        else:
+            column_writers[data_cols[position]](first_row + data_rows[row_num], sheet_cols[position], \
+                column_values[position][row_num], cell_format)
+
+
+class FormatRegistry:
+
+    # this class will hold one xlsxwriter Format per distinct set of format properties for a workbook
+    ## every function asks the registry for its formats instead of calling wb.add_format, so formats that are the same
+    ## (ex the null format of every insert call) are only added to the workbook once
+    ## hits counts the formats handed back from the registry and misses counts the formats added to the workbook
+
+    # MANDATORY:
+    ## wb is the workbook the formats are added to
+
+    def __init__(self, wb):
+        self.wb = wb
+        self.formats = {}
+        # the properties of each format, so formats can be combined with more properties (see get_border_format)
+        self.properties = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, properties):
+
+        # this method will return the format for the properties, adding it to the workbook the first time it is asked for
+
+        # MANDATORY:
+        ## properties is the dict of xlsxwriter format properties (ex {'bold':True,'align':'center'})
+
+        # properties that are the same but written differently (ex True and 1, or in another order) share a format
+        key = tuple(sorted((name, int(value) if isinstance(value, bool) else value) for name, value in properties.items()))
+
+        if key in self.formats:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.formats[key] = self.wb.add_format(dict(properties))
+            self.properties[self.formats[key]] = dict(properties)
+
+        return self.formats[key]
+
+    def stats(self):
+
+        # this method will return the number of formats in the registry and the hit and miss counts
+
+        return {'formats':len(self.formats), 'hits':self.hits, 'misses':self.misses}
+
+
+def get_format(wb, properties):
+
+    # this function will return the format for the properties from the workbook's format registry
+    ## the registry is created the first time a format is asked for on the workbook
+    ## formats from the registry are shared, so do not change them with the Format set_ methods
+
+    # MANDATORY:
+    ## wb is your workbook
+    ## properties is the dict of xlsxwriter format properties (ex {'bold':True,'align':'center'})
+
+    # add a registry to the workbook if it does not have one yet
+    if not hasattr(wb, 'format_registry'):
+        wb.format_registry = FormatRegistry(wb)
+
+    return wb.format_registry.get(properties)
+
+
+def get_border_format(wb, cell_format, sides):
+
+    # this function will return the format of a cell with borders added on the given sides, so a table border can be
+    ## drawn with the cell's own format instead of an extra cell outside the table
+    ## the combined format comes from the format registry, so every cell with the same format and borders shares it
+    ## formats that did not come from the registry cannot be combined, so they are returned as they are with a warning
+
+    # MANDATORY:
+    ## wb is your workbook
+    ## cell_format is the format of the cell, or None
+    ## sides is a list of the sides to add a border to: 'top', 'bottom', 'left', 'right'
+
+    # get the properties of the cell's format
+    if cell_format == None:
+        properties = {}
+    elif hasattr(wb, 'format_registry') and cell_format in wb.format_registry.properties:
+        properties = dict(wb.format_registry.properties[cell_format])
+    else:
+        warn("The cell format was not made with get_format, so the border could not be added to it.")
+        return cell_format
+
+    for side in sides:
+        # a border that is already there keeps its style
+        if not properties.get(side):
+            properties[side] = True
+
+    return get_format(wb, properties)
+
+
+def get_format_stats(wb):
+
+    # this function will return how many formats the workbook's format registry holds and how many times a format was
+    ## reused (hits) or added to the workbook (misses)
+    ## ex {'formats': 12, 'hits': 340, 'misses': 12}
+
+    # MANDATORY:
+    ## wb is your workbook
+
+    # a workbook with no registry has not had any formats asked for yet
+    if not hasattr(wb, 'format_registry'):
+        return {'formats':0, 'hits':0, 'misses':0}
+
+    return wb.format_registry.stats()
+
+
+# number format for each data_type argument
+## to add a new data type, add its name and number format here
+DATA_TYPE_FORMATS = {
+    'numeric':{'num_format':'#,##0'},
+    'decimal_1':{'num_format':'#,##0.0'},
+    'decimal_2':{'num_format':'#,##0.00'},
+    'dollar':{'num_format':'$#,##0'},
+    'dollar_cents':{'num_format':'$#,##0.00'},
+    'percent':{'num_format':'0%'},
+    'percent_1':{'num_format':'0.0%'},
+    'percent_2':{'num_format':'0.00%'},
+    'date':{'num_format':'yyyy-mm-dd'},
+    'date_alt':{'num_format':'m/d/yyyy'},
+    'datetime':{'num_format':'yyyy-mm-dd h:mm'},
+    'datetime_alt':{'num_format':'m/d/yyyy h:mm AM/PM'},
+}
+
+
+def get_data_type_format(wb, data_type, bottom=False, right=False):
+
+    # this function will return the format for a data_type, with a bottom and/or right border if asked for
+    ## the format comes from the workbook's format registry, so each variant is only added to the workbook the first
+    ## time a function uses it
+    ## None and 'text' have no number format, so they return None unless a border is asked for
+
+    # MANDATORY:
+    ## wb is your workbook
+    ## data_type is a key of DATA_TYPE_FORMATS, 'text' or None
+
+    # OPTIONAL:
+    ## bottom will add a bottom border. defaults to False
+    ## right will add a right border. defaults to False
+
+    # raise an error if the data_type is not valid
+    if data_type in DATA_TYPE_FORMATS:
+        properties = dict(DATA_TYPE_FORMATS[data_type])
+    elif data_type == None or data_type == 'text':
+        properties = {}
+    else:
+        raise ValueError(f"{data_type} is not a valid data_format option. Valid options are: {list(DATA_TYPE_FORMATS)}")
+
+    if bottom == True:
+        properties['bottom'] = True
+    if right == True:
+        properties['right'] = True
+
+    # text with no border is written with no format
+    if properties == {}:
+        return None
+
+    return get_format(wb, properties)
+
+
+def get_null_format(wb, null_align='center', bottom=False, right=False):
+
+    # this function will return the format for null values, with a bottom and/or right border if asked for
+
+    # MANDATORY:
+    ## wb is your workbook
+
+    # OPTIONAL:
+    ## null_align is the horizontal alignment for null values. defaults to center
+    ## bottom will add a bottom border. defaults to False
+    ## right will add a right border. defaults to False
+
+    properties = {'align':null_align}
+
+    if bottom == True:
+        properties['bottom'] = True
+    if right == True:
+        properties['right'] = True
+
+    return get_format(wb, properties)
+
+
+def get_max_width(values, data_type=None):
+
+    # this function will return the length of the longest value in a column or index level as it would be shown by str()
+    ## the lengths are worked out with numpy instead of calling len(str(value)) on every value in a python loop
+    ## integer columns only need their min and max, and datetimes have a fixed width, so neither is turned into strings
+    ## returns 0 if there are no values
+
+    # MANDATORY:
+    ## values is a pandas series or index (ex df[col_name] or df.index.get_level_values(0))
+
+    # OPTIONAL:
+    ## data_type is the data_type the values will be formatted with. when given, the width is the width of the values
+    ##     as Excel shows them with that number format (ex 2145115.54 as 'dollar_cents' is $2,145,115.54). defaults to None
+
+    import numpy as np
+    import pandas as pd
+
+    if len(values) == 0:
+        return 0
+
+    values = pd.Series(values)
+    kind = values.dtype.kind
+
+    # formatted numbers and dates
+    if data_type in DATA_TYPE_FORMATS:
+        num_format = DATA_TYPE_FORMATS[data_type]['num_format']
+        # number formats need numeric values and date formats need datetime values
+        ## anything else is shown as is by Excel, so it falls through to the str() width below
+        if is_date_format(num_format):
+            if kind == 'M':
+                return get_date_format_width(values, num_format)
+        elif kind in 'iuf':
+            return get_number_format_width(values, num_format)
+
+    # booleans (with no nulls) are shown as 'True' or 'False', so only whether there is a False matters
+    if kind == 'b' and not values.hasnans:
+        return 5 if (~values.astype(bool)).any() else 4
+
+    # integers (with no nulls): the longest value is the largest or the most negative one
+    if kind in 'iu' and not values.hasnans:
+        return max(len(str(values.min())), len(str(values.max())))
+
+    # datetimes are written as 'yyyy-mm-dd hh:mm:ss', plus any fraction of a second and timezone offset
+    if kind == 'M':
+        dates = values.dropna()
+        # NaT is shown as 'NaT'
+        if len(dates) == 0:
+            return 3
+        width = 19
+        # pandas shows 6 digits after the second for microseconds and 9 for nanoseconds
+        if (dates.dt.nanosecond != 0).any():
+            width += 10
+        elif (dates.dt.microsecond != 0).any():
+            width += 7
+        # timezone offset ex +05:00
+        if dates.dt.tz != None:
+            width += 6
+        return width
+
+    return int(get_str_lengths(values).max())
+
+
+def get_str_lengths(values):
+
+    # this function will return a numpy array with the length of every value in a pandas series as shown by str()
+
+    # MANDATORY:
+    ## values is a pandas series
+
+    import numpy as np
+
+    # floats are measured as float64 so they match python's str()
+    if values.dtype.kind == 'f':
+        strings = values.to_numpy(dtype=float, na_value=np.nan).astype(str)
+    # booleans, strings and everything else go through numpy's str conversion, which matches str() for every value
+    ## (ex None is 'None' and NaN is 'nan')
+    else:
+        strings = values.to_numpy(dtype=object).astype(str)
+
+    return np.char.str_len(strings)
+
+
+def estimate_max_width(values, sample_size=1000, quantile=1.0, cap=255, seed=0):
+
+    # this function will estimate the length of the longest value in a column from a random sample of its values
+    ## for very large dataframes, where measuring every value is not worth it
+    ## exact cheap statistics are used where they exist: integer widths come from the min and max, boolean widths from
+    ## whether there is a False, the smallest and largest values of float and datetime columns are always measured, and
+    ## categorical columns are measured from their categories
+    ## columns with no more than sample_size values are measured in full
+
+    # MANDATORY:
+    ## values is a pandas series (ex df[col_name])
+
+    # OPTIONAL:
+    ## sample_size is the number of values to sample. defaults to 1000
+    ## quantile is the quantile of the sampled lengths to use, ex 0.99 ignores the longest 1% of values. defaults to 1.0 (the
+    ##     longest sampled value)
+    ## cap is the largest width that will be returned. defaults to 255, the widest column Excel allows
+    ## seed is the random seed for the sample so the widths are the same every run. defaults to 0
+
+    import numpy as np
+    import pandas as pd
+
+    values = pd.Series(values)
+
+    if len(values) == 0:
+        return 0
+
+    # categories are usually far fewer than rows, so they are measured in full
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        width = get_max_width(pd.Series(values.cat.categories))
+        # nulls are shown as 'nan'
+        if values.hasnans:
+            width = max(width, 3)
+        return min(width, cap)
+
+    # integer widths only need the min and max and boolean widths whether there is a False, which are exact and cheap
+    if values.dtype.kind in 'iub' and not values.hasnans:
+        return min(get_max_width(values), cap)
+
+    # take the sample
+    if len(values) > sample_size:
+        sample = values.sample(n=sample_size, random_state=seed)
+    else:
+        sample = values
+
+    width = int(np.ceil(np.quantile(get_str_lengths(sample), quantile)))
+
+    # the smallest and largest values are measured exactly since they are often the widest
+    if values.dtype.kind in 'ifM':
+        extremes = pd.Series([values.min(), values.max()]).astype(values.dtype)
+        width = max(width, get_max_width(extremes))
+
+    return min(width, cap)
+
+
+def estimate_column_widths(df, sample_size=1000, quantile=1.0, cap=255):
+
+    # this function will return a list with the estimated length of the longest value in each data column of a dataframe
+    ## see estimate_max_width for how the estimate is made
+
+    # MANDATORY:
+    ## df is the dataframe to measure
+
+    # OPTIONAL:
+    ## sample_size is the number of values to sample per column. defaults to 1000
+    ## quantile is the quantile of the sampled lengths to use. defaults to 1.0
+    ## cap is the largest width that will be returned. defaults to 255
+
+    return [estimate_max_width(df.iloc[:, col_num], sample_size, quantile, cap) for col_num in range(len(df.columns))]
+
+
+def get_column_widths(df, data_type=None):
+
+    # this function will return a list with the length of the longest value in each data column of a dataframe
+    ## columns are taken by position so duplicate column names are not an issue
+
+    # MANDATORY:
+    ## df is the dataframe to measure
+
+    # OPTIONAL:
+    ## data_type is the data_type all the columns will be formatted with. defaults to None
+
+    return [get_max_width(df.iloc[:, col_num], data_type) for col_num in range(len(df.columns))]
+
+
+def is_date_format(num_format):
+
+    # this function will return True if an Excel number format shows dates or times
+    ## ex 'yyyy-mm-dd' or 'm/d/yyyy h:mm AM/PM' are date formats, '$#,##0.00' is not
+
+    # MANDATORY:
+    ## num_format is the Excel number format
+
+    return any(char in num_format.lower() for char in 'ymdhs')
+
+
+def get_number_format_width(values, num_format):
+
+    # this function will return the width of the widest value in a numeric column as Excel shows it with num_format
+    ## the width is worked out from the smallest and largest values only, by counting digits with log10 and adding the
+    ## thousands separators, currency sign, percent sign, decimals and minus sign the format adds
+    ## supports the number formats of DATA_TYPE_FORMATS (ex '#,##0', '$#,##0.00', '0.0%')
+
+    # MANDATORY:
+    ## values is a pandas series of numbers
+    ## num_format is the Excel number format
+
+    import numpy as np
+
+    # read the parts of the format
+    has_commas = ',' in num_format
+    is_percent = '%' in num_format
+    # the decimal places are the 0s after the decimal point
+    if '.' in num_format:
+        decimals = len(num_format.split('.')[1].rstrip('%'))
+    else:
+        decimals = 0
+    # everything that is not a digit placeholder or separator is shown as is (ex '$' and '%')
+    extra_chars = len(num_format.replace('#','').replace('0','').replace(',','').replace('.',''))
+
+    # only the smallest and largest values are needed, nulls and infs are left out since they are not shown as numbers
+    numbers = values.to_numpy(dtype=float, na_value=np.nan)
+    numbers = numbers[np.isfinite(numbers)]
+    if len(numbers) == 0:
+        return 0
+
+    widths = []
+    for number in [numbers.min(), numbers.max()]:
+        is_negative = number < 0
+        # percent formats show the value times 100
+        if is_percent == True:
+            number = number * 100
+        # round the way the format shows it, since rounding can add a digit (ex 999.6 shows as 1,000)
+        number = round(abs(number), decimals)
+        # digits before the decimal point, at least 1 since values below 1 show a leading 0
+        if number >= 1:
+            digits = int(np.floor(np.log10(number))) + 1
+        else:
+            digits = 1
+        width = digits + extra_chars
+        # a thousands separator for every 3 digits
+        if has_commas == True:
+            width += (digits - 1) // 3
+        # decimal point and decimals
+        if decimals > 0:
+            width += decimals + 1
+        # minus sign
+        if is_negative == True:
+            width += 1
+        widths.append(width)
+
+    return max(widths)
+
+
+def get_index_widths(df):
+
+    # this function will return a list with the length of the longest value in each row index level of a dataframe
+    ## index values do not need to be strings (ex years or dates as an index)
+
+    # MANDATORY:
+    ## df is the dataframe to measure
+
+    return [get_max_width(df.index.get_level_values(level)) for level in range(df.index.nlevels)]
+
+
+def get_date_format_width(values, num_format):
+
+    # this function will return the width of the widest value in a datetime column as Excel shows it with num_format
+    ## every part of a date format has a fixed width except the ones without a leading 0 (m, d and h), which are 2 wide
+    ## only if some value has a 2 digit month, day or hour, so those are checked once for the whole column
+    ## supports the date formats of DATA_TYPE_FORMATS (ex 'yyyy-mm-dd', 'm/d/yyyy h:mm AM/PM')
+
+    # MANDATORY:
+    ## values is a pandas series of datetimes
+    ## num_format is the Excel number format
+
+    import re
+
+    dates = values.dropna()
+    if len(dates) == 0:
+        return 0
+
+    # 12 hour formats show hours 10, 11 and 12 with 2 digits, 24 hour formats show 10 to 23 with 2 digits
+    if 'AM/PM' in num_format:
+        hours = dates.dt.hour % 12
+        wide_hours = ((hours >= 10) | (hours == 0)).any()
+    else:
+        wide_hours = (dates.dt.hour >= 10).any()
+
+    # the widths of the parts that do not depend on the data
+    fixed_widths = {'yyyy':4, 'yy':2, 'mm':2, 'dd':2, 'hh':2, 'ss':2, 'AM/PM':2}
+
+    width = 0
+    after_hour = False
+    # split the format into its parts (ex 'm/d/yyyy h:mm AM/PM' into m, /, d, /, yyyy, ' ', h, :, mm, ' ', AM/PM)
+    for part in re.findall(r'AM/PM|yyyy|yy|mm|m|dd|d|hh|h|ss|s|.', num_format):
+        # m right after an hour is minutes, which always have 2 digits
+        if part in ['m','mm'] and after_hour == True:
+            width += 2
+        elif part in fixed_widths:
+            width += fixed_widths[part]
+        elif part == 'm':
+            width += 2 if (dates.dt.month >= 10).any() else 1
+        elif part == 'd':
+            width += 2 if (dates.dt.day >= 10).any() else 1
+        elif part == 'h':
+            width += 2 if wide_hours else 1
+        elif part == 's':
+            width += 2 if (dates.dt.second >= 10).any() else 1
+        else:
+            # separators are shown as is
+            width += 1
+        # keep track of whether the last date part was an hour
+        if part in ['h','hh']:
+            after_hour = True
+        elif part.isalpha():
+            after_hour = False
+
+    return width
+
+
+def get_insert_widths(df, null_mask, data_type=None, null_value='-', method='data'):
+
+    # this function will return a list with the width of each data column as the insert functions write it
+    ## null cells are measured as null_value and the rest as they are shown with the data_type's number format
+    ## it is a separate vectorized pass over the data (get_max_width), made before the data is written. it reuses the
+    ## null mask the insert function made for writing instead of finding the nulls again, and only columns that hold
+    ## nulls are copied to drop them before they are measured
+
+    # MANDATORY:
+    ## df is the dataframe being inserted
+    ## null_mask is the null mask of the dataframe from get_null_mask
+
+    # OPTIONAL:
+    ## data_type is the data_type of the insert, or a list with the data_type of each data column. defaults to None
+    ## null_value is what replaces nulls. defaults to '-'
+    ## method is how the width is set. defaults to 'data':
+    #       'headers' sets width based on the length of column names
+    #       'data' sets width based on the length of the longest data point in the column
+    #       'all' sets width based off the column name or longest data point, whichever is larger
+
+    # create empty list to hold the widths
+    col_widths = []
+
+    # iterating over the positions of the data columns:
+    for col_num in range(len(df.columns)):
+        # the header is the last level of the column name
+        ## + 1 for 'wiggle room'
+        header_width = len(str(df.columns.get_level_values(-1)[col_num])) + 1
+        if method == 'headers':
+            col_widths.append(header_width)
+            continue
+
+        column_nulls = null_mask[:, col_num]
+        has_nulls = column_nulls.any()
+        # measure the values that are written as data
+        column = df.iloc[:, col_num]
+        if has_nulls:
+            column = column[~column_nulls]
+        if isinstance(data_type, list):
+            data_width = get_max_width(column, data_type[col_num])
+        else:
+            data_width = get_max_width(column, data_type)
+        # and the null value if any nulls are written
+        if has_nulls:
+            data_width = max(data_width, len(str(null_value)))
+        ## + 1 for 'wiggle room'
+        data_width = data_width + 1
+
+        if method == 'data':
+            col_widths.append(data_width)
+        else:
+            col_widths.append(max(header_width, data_width))
+
+    return col_widths
+
+
+
+def get_column_spans(column_specs):
+
+    # this function will join the (col_num, width, cell_format) specs of single worksheet columns into spans of next to
+    ## each other columns with the same width and format, so each span can be set with one sheet.set_column call
+    ## when a column has more than one spec, the last one is used
+
+    # MANDATORY:
+    ## column_specs is a list of (col_num, width, cell_format) tuples
+
+    # keep the last spec of each column, in column order
+    last_specs = {}
+    for col_num, width, cell_format in column_specs:
+        last_specs[col_num] = (width, cell_format)
+
+    # create empty list to hold the (first_col, last_col, width, cell_format) spans
+    column_spans = []
+
+    for col_num in sorted(last_specs):
+        width, cell_format = last_specs[col_num]
+        # extend the last span if this column is next to it and looks the same
+        if column_spans and column_spans[-1][1] == col_num - 1 and column_spans[-1][2] == width \
+            and column_spans[-1][3] is cell_format:
+            column_spans[-1][1] = col_num
+        else:
+            column_spans.append([col_num, col_num, width, cell_format])
+
+    return [tuple(column_span) for column_span in column_spans]
+
+
+def defer_column_specs(sheet):
+
+    # this function will make the formatting functions hold the column widths and formats they set on the worksheet
+    ## instead of calling sheet.set_column each time. flush_column_specs then sets them all at once, with one set_column
+    ## call for each span of next to each other columns with the same width and format
+    ### NOTE: call flush_column_specs before closing the workbook or the held widths and formats are never set
+    ### set_column calls made directly on the worksheet before the flush are overridden by the held specs of the same columns
+    ## the held specs are kept on the worksheet itself (its deferred_column_specs attribute), so every worksheet of every
+    ## workbook holds its own. they are read from the worksheet's own attributes, so a PlanSheet holds its own specs
+    ## instead of seeing the ones of the worksheet it stands in for
+
+    # MANDATORY:
+    ## sheet is your worksheet
+
+    # start holding specs, keeping any the worksheet is already holding
+    if vars(sheet).get('deferred_column_specs') is None:
+        sheet.deferred_column_specs = []
+
+
+def set_column_spec(sheet, first_col, last_col, width=None, cell_format=None):
+
+    # this function will set the width and format of a range of columns like sheet.set_column, or hold them to be set
+    ## later if the worksheet is deferring its column specs
+    ## like set_column, the last width and format given for a column is the one it gets
+
+    # MANDATORY:
+    ## sheet is your worksheet
+    ## first_col is the first column of the range
+    ## last_col is the last column of the range
+
+    # OPTIONAL:
+    ## width is the column width. defaults to None
+    ## cell_format is the column format. defaults to None
+
+    column_specs = vars(sheet).get('deferred_column_specs')
+    if column_specs is not None:
+        for col_num in range(first_col, last_col + 1):
+            column_specs.append((col_num, width, cell_format))
+    else:
+        sheet.set_column(first_col, last_col, width, cell_format)
+
+
+def flush_column_specs(sheet):
+
+    # this function will set the column specs held since defer_column_specs and stop holding them
+    ## each span of next to each other columns with the same width and format is set with one set_column call
+    ## nothing is done if the worksheet is not deferring its column specs
+
+    # MANDATORY:
+    ## sheet is your worksheet
+
+    # take the held specs off the worksheet, which stops holding them
+    column_specs = vars(sheet).get('deferred_column_specs') or []
+    sheet.deferred_column_specs = None
+
+    for first_col, last_col, width, cell_format in get_column_spans(column_specs):
+        sheet.set_column(first_col, last_col, width, cell_format)
+
+
+def get_group_ends(index):
+
+    # this function will return a list with a boolean array for each level of a pandas index that is True on the last
+    ## position of each run of the same category
+    ## a run ends where the category of the level, or of any level before it, changes at the next position
+    ## runs are found from the index codes, so categories do not need the same number of positions (ragged indexes)
+
+    # MANDATORY:
+    ## index is the row index (df.index) or the columns (df.columns) of your dataframe
+
+    import numpy as np
+
+    # a MultiIndex has the codes of each level, a single index is turned into codes
+    if hasattr(index, 'codes'):
+        level_codes = [np.asarray(codes) for codes in index.codes]
+    else:
+        level_codes = [index.factorize()[0]]
+
+    # the positions where the next position starts a new run
+    changes = np.zeros(max(len(index) - 1, 0), dtype=bool)
+    group_ends = []
+    for codes in level_codes:
+        changes = changes | (np.diff(codes) != 0)
+        # the last position always ends a run
+        group_ends.append(np.append(changes, len(index) > 0))
+
+    return group_ends
+
+
+def get_group_runs(group_ends):
+
+    # this function will return a tuple of arrays with the first position and the length of each run from get_group_ends
+
+    # MANDATORY:
+    ## group_ends is one of the boolean arrays from get_group_ends
+
+    import numpy as np
+
+    run_ends = np.flatnonzero(group_ends)
+    run_starts = np.concatenate(([0], run_ends[:-1] + 1)).astype(run_ends.dtype)
+
+    return run_starts, run_ends - run_starts + 1
+
+
+def get_outline_rows(group_ends):
+
+    # this function will return where each row goes when a label row is put above every run of each outlined level
+    ## the label row of a run is the summary row of its outline group, so the run's rows (and the label rows of the runs
+    ## inside it) are grouped one level below it. the label rows of runs that start on the same row are put in level order
+    ## returns a tuple of arrays:
+    ##     the row of each position, counted from the first row of the outlined table
+    ##     the row of each label row, in row order
+    ##     the level of each label row, which is also its outline level
+    ##     the position each label row is above (the first position of its run)
+
+    # MANDATORY:
+    ## group_ends is a list of boolean arrays from get_group_ends, one for each level to outline
+
+    import numpy as np
+
+    num_levels = len(group_ends)
+    num_positions = len(group_ends[0]) if group_ends else 0
+    if num_positions == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+
+    # a position starts a run when the position before it ended one, as levels x positions
+    run_firsts = np.array([np.concatenate(([True], level_ends[:-1])) for level_ends in group_ends])
+
+    # every position moves down by the label rows above it and its own label rows
+    label_counts = run_firsts.sum(axis=0)
+    position_rows = np.arange(num_positions) + np.cumsum(label_counts)
+
+    # runs are nested, so a position that starts a run of a level starts a run of every level after it too
+    ## its label rows are the last label_counts rows above it, one per level, in level order
+    label_levels, label_positions = np.nonzero(run_firsts)
+    label_rows = position_rows[label_positions] - num_levels + label_levels
+    order = np.argsort(label_rows, kind='stable')
+
+    return position_rows, label_rows[order], label_levels[order], label_positions[order]
+
+
+class TableLayout:
+
+    # this class will hold the shape of a dataframe's table on the worksheet so it only has to be worked out once
+    ## every formatting function takes a layout argument. make one layout per table and pass it to each function used on
+    ## that table, so the index runs and other shape facts are worked out once per table instead of once per function
+    ## each value is worked out the first time it is asked for and then kept
+
+    # MANDATORY:
+    ## df is your data from your dataframe
+
+    # OPTIONAL:
+    ## header_offset is the number of rows to skip if you want blank rows on top for title etc. defaults to 0
+    ## column_offset is the number of columns to shift to the right if you do not want your table to start on column A. defaults to 0
+
+    def __init__(self, df, header_offset=0, column_offset=0):
+        self.df = df
+        self.header_offset = header_offset
+        self.column_offset = column_offset
+        # the label rows written between the data rows (see outline_row_multiindex), which move the last row down
+        self.num_label_rows = 0
+
+    @cached_property
+    def num_row_indices(self):
+        # pandas has a default index with no name, which is not written, so it counts as 0 row index columns
+        if None in self.df.index.names:
+            return 0
+        return len(self.df.index.names)
+
+    @cached_property
+    def num_col_indices(self):
+        # the number of column header rows
+        return self.df.columns.nlevels
+
+    @cached_property
+    def num_cols(self):
+        # the number of data columns
+        return len(self.df.columns)
+
+    @cached_property
+    def total_cols(self):
+        # the number of row index columns and data columns
+        return self.num_row_indices + self.num_cols
+
+    @cached_property
+    def num_rows(self):
+        # the number of data rows
+        return len(self.df)
+
+    @cached_property
+    def first_data_row(self):
+        # the worksheet row of the first data row
+        return self.num_col_indices + self.header_offset
+
+    @property
+    def last_data_row(self):
+        # the worksheet row of the last data row, below any label rows written between the data rows
+        ## it is not kept, since outline_row_multiindex adds its label rows to the layout after it is made
+        return self.num_rows + self.num_label_rows + self.num_col_indices + self.header_offset - 1
+
+    @cached_property
+    def first_data_col(self):
+        # the worksheet column of the first data column
+        return self.num_row_indices + self.column_offset
+
+    @cached_property
+    def last_col(self):
+        # the worksheet column of the last column of the table
+        return self.total_cols + self.column_offset - 1
+
+    @cached_property
+    def index_group_ends(self):
+        # for each row index level, a boolean array that is True on the last row of each run of the same category
+        return get_group_ends(self.df.index)
+
+    @cached_property
+    def index_runs(self):
+        # for each row index level, a tuple of arrays with the first row and the row count of each run of the same category
+        return [get_group_runs(group_ends) for group_ends in self.index_group_ends]
+
+    @cached_property
+    def column_group_ends(self):
+        # for each column level, a boolean array that is True on the last data column of each run of the same label
+        return get_group_ends(self.df.columns)
+
+    @cached_property
+    def column_runs(self):
+        # for each column level, a tuple of arrays with the first data column and the column count of each run of the same label
+        return [get_group_runs(group_ends) for group_ends in self.column_group_ends]
+
+    @cached_property
+    def major_group_ends(self):
+        # a boolean array that is True on the last row per major index category
+        return self.index_group_ends[0]
+
+    @cached_property
+    def index_outline_rows(self):
+        # where each data row and label row goes when every row index level but the last is outlined with a label row
+        ## above each of its runs (see get_outline_rows)
+        return get_outline_rows(self.index_group_ends[:-1])
+
+
+def get_table_layout(df, header_offset=0, column_offset=0, layout=None):
+
+    # this function will return the layout passed in, or make a new TableLayout for df when no layout is passed in
+    ## the formatting functions call this so they can be given a layout or left to work one out for themselves
+
+    # MANDATORY:
+    ## df is your data from your dataframe
+
+    # OPTIONAL:
+    ## header_offset is the header_offset for a new layout. defaults to 0
+    ## column_offset is the column_offset for a new layout. defaults to 0
+    ##     when a layout is passed in, an offset left at 0 uses the layout's offset and any other offset must match it
+    ## layout is a TableLayout made for df. defaults to None
+
+    if layout is None:
+        return TableLayout(df, header_offset, column_offset)
+
+    # a layout only describes the dataframe it was made for
+    if layout.df is not df:
+        raise ValueError("layout was made for a different dataframe. Make a TableLayout for this dataframe or pass layout=None.")
+
+    # an offset passed along with the layout would otherwise be ignored without the user knowing
+    for offset_name, offset, layout_offset in [('header_offset', header_offset, layout.header_offset), \
+        ('column_offset', column_offset, layout.column_offset)]:
+        if offset != 0 and offset != layout_offset:
+            raise ValueError(f"{offset_name} of {offset} does not match the layout's {offset_name} of {layout_offset}. "
+                f"Make the TableLayout with {offset_name}={offset}, or leave {offset_name} at 0 when passing a layout.")
+
+    return layout
+
+
+def write_header_runs(wb, sheet, row_num, col_num, labels, run_starts, run_lengths, run_properties, merge_cells=True, \
+    center_across=False, sparse_labels=False):
+
+    # this function will write a header row with each label written once per run of columns with the same label
+    ## runs of more than one column are merged when merge_cells is True, or centered across their cells when center_across
+    ## is also True. otherwise the label is written in every column of the run, or only in the first column when
+    ## sparse_labels is True, with the rest of the run given the format with no value
+
+    # MANDATORY:
+    ## wb is your workbook
+    ## sheet is your worksheet
+    ## row_num is the worksheet row of the header row
+    ## col_num is the worksheet column of the first data column
+    ## labels is the list of labels for the header row, one per data column
+    ## run_starts and run_lengths are the first column and column count of each run (from get_group_runs)
+    ## run_properties is the dict of format properties for all runs, or a list with a dict for each run
+
+    # OPTIONAL:
+    ## merge_cells will merge the cells of each run of more than one column. defaults to True
+    ## center_across will center each label across its run with a 'center_across' format instead of merging the cells.
+    ##     only used when merge_cells is True. defaults to False
+    ## sparse_labels will write the label of an unmerged run only in its first column. defaults to False
+
+    # use the same format properties for every run if only one dict is given
+    if not isinstance(run_properties, list):
+        run_properties = [run_properties] * len(run_starts)
+
+    # iterating over the runs:
+    for run_start, run_length, properties in zip(run_starts.tolist(), run_lengths.tolist(), run_properties):
+        first_col = run_start + col_num
+        last_col = run_start + run_length - 1 + col_num
+        run_format = get_format(wb, properties)
+        if run_length > 1 and merge_cells == True and center_across == True:
+            # center the label across the run
+            ## only the last cell of the run keeps the right border so the run looks like one cell
+            inner_format = get_format(wb, {**{name: value for name, value in properties.items() if name != 'right'}, \
+                'align':'center_across'})
+            last_format = get_format(wb, {**properties, 'align':'center_across'})
+            sheet.write(row_num, first_col, labels[run_start], inner_format)
+            for blank_col in range(first_col + 1, last_col):
+                sheet.write_blank(row_num, blank_col, None, inner_format)
+            sheet.write_blank(row_num, last_col, None, last_format)
+        elif run_length > 1 and merge_cells == True:
+            # merge the run and write its label once
+            sheet.merge_range(row_num, first_col, row_num, last_col, labels[run_start], run_format)
+        elif sparse_labels == True:
+            # write the label in the first column of the run and format the rest
+            sheet.write(row_num, first_col, labels[run_start], run_format)
+            for blank_col in range(first_col + 1, last_col + 1):
+                sheet.write_blank(row_num, blank_col, None, run_format)
+        else:
+            # write the label in every column of the run
+            for label_col in range(first_col, last_col + 1):
+                sheet.write(row_num, label_col, labels[run_start], run_format)
+
+
+class PlanSheet:
+
+    # this class will stand in for a worksheet and record the cell writes and merges the formatting functions make,
+    ## then write each cell once when it is flushed
+    ## a normal table writes many cells more than once (merge placeholders that the index labels replace, header cells
+    ## that are written and then rewritten, data cells rewritten by the set_*_dtype functions). the plan keeps only the
+    ## last write of each cell, like the worksheet would, so the overwritten writes are never made
+    ## cells are written in row order, so a plan can be flushed to a worksheet from a constant_memory workbook. merges
+    ## that cover more than one row cannot be written to those worksheets, since their rows are written out one at a time
+    ## column widths and formats are held like defer_column_specs and set once per span of columns
+    ## borders asked for with add_border are combined into the format of the cell they are on when it is flushed, so a
+    ## border needs no write of its own (see the outside option of the table border functions)
+    ## anything else (set_column, outline_settings, conditional_format etc) goes straight to the worksheet
+    ### NOTE: pass the plan to the formatting functions in place of the worksheet, and call flush() before closing the workbook
+
+    # MANDATORY:
+    ## sheet is your worksheet
+
+    # the write methods that write a single cell, which are recorded instead of written
+    cell_methods = ['write', 'write_string', 'write_number', 'write_blank', 'write_boolean', 'write_datetime', \
+        'write_formula', 'write_url', 'write_rich_string']
+
+    def __init__(self, sheet):
+        self.worksheet = sheet
+        # the last (write method, arguments) of each cell, keyed by (row, col)
+        self.cells = {}
+        # the (last_row, last_col) of each merge, keyed by its first (row, col)
+        self.merges = {}
+        # the first (row, col) of the merge each merged cell is in
+        self.merged_cells = {}
+        # the last set_row arguments of each row
+        self.row_specs = {}
+        # the sides of each cell to add a border to
+        self.borders = {}
+        # the workbook the border formats are made in
+        self.wb = None
+        defer_column_specs(self)
+
+    def __getattr__(self, name):
+        # the worksheet is only missing while the plan is being set up or copied
+        if name == 'worksheet':
+            raise AttributeError(name)
+        # single cell writes are recorded
+        if name in PlanSheet.cell_methods:
+            return lambda row_num, col_num, *args: self.record(name, row_num, col_num, args)
+        # everything else is the worksheet's
+        return getattr(self.worksheet, name)
+
+    def record(self, method, row_num, col_num, args):
+        # keep the write as the cell's last write, turning 'A1' notation into a row and column first
+        if isinstance(row_num, str):
+            (row_num, col_num), args = xl_cell_to_rowcol(row_num), (col_num,) + args
+        # the worksheet does not write a blank cell that has no format (write turns None and '' into a blank), so
+        ## it leaves the cell's last write as it was
+        value = args[0] if len(args) > 0 else None
+        cell_format = args[1] if len(args) > 1 else None
+        if cell_format is None and (method == 'write_blank' or (method == 'write' and (value is None or value == ''))):
+            return 0
+        self.cells[(row_num, col_num)] = (method, args)
+        return 0
+
+    def write_column(self, row_num, col_num, data, cell_format=None):
+        # record each value down the column as its own cell
+        for offset, value in enumerate(data):
+            self.record('write', row_num + offset, col_num, (value, cell_format))
+        return 0
+
+    def write_row(self, row_num, col_num, data, cell_format=None):
+        # record each value across the row as its own cell
+        for offset, value in enumerate(data):
+            self.record('write', row_num, col_num + offset, (value, cell_format))
+        return 0
+
+    def add_border(self, wb, row_num, col_num, side):
+        # the border is added to the format of the cell when it is flushed, or written on a blank cell if nothing else is
+        self.wb = wb
+        self.borders.setdefault((row_num, col_num), set()).add(side)
+        return 0
+
+    def set_row(self, row_num, height=None, cell_format=None, options=None):
+        # the last settings of the row are set when the row is flushed
+        self.row_specs[row_num] = (height, cell_format, options)
+        return 0
+
+    def merge_range(self, first_row, first_col, last_row, last_col, data, cell_format=None):
+        # check the merge like the worksheet would
+        if first_row == last_row and first_col == last_col:
+            warn("Can't merge single cell")
+            return -1
+        if last_row > first_row and getattr(self.worksheet, 'constant_memory', False):
+            raise ValueError("Merges over more than one row cannot be written to a constant_memory worksheet. "
+                "Use sparse_labels or outline_row_multiindex() instead of merge_row_index_cells().")
+        for row_num in range(first_row, last_row + 1):
+            for col_num in range(first_col, last_col + 1):
+                if (row_num, col_num) in self.merged_cells:
+                    raise OverlappingRange(f"Merge range '{xl_range(first_row, first_col, last_row, last_col)}' "
+                        "overlaps a previous merge range.")
+
+        self.merges[(first_row, first_col)] = (last_row, last_col)
+        # the merge writes its data to the first cell and blanks with the same format to the rest, like the worksheet
+        ## the cells are set directly since the merge is flushed from its first cell even when it has no data or format
+        for row_num in range(first_row, last_row + 1):
+            for col_num in range(first_col, last_col + 1):
+                self.merged_cells[(row_num, col_num)] = (first_row, first_col)
+                if row_num == first_row and col_num == first_col:
+                    self.cells[(row_num, col_num)] = ('write', (data, cell_format))
+                else:
+                    self.cells[(row_num, col_num)] = ('write_blank', (None, cell_format))
+        return 0
+
+    def flush(self):
+        # write every recorded cell once, row by row, then start a new empty plan
+
+        # set the held column widths and formats
+        flush_column_specs(self)
+
+        # add the borders to the formats of their cells, writing a blank cell where nothing was written
+        for (row_num, col_num), sides in self.borders.items():
+            method, args = self.cells.get((row_num, col_num), ('write_blank', (None, None)))
+            # rich strings have their format last, so they keep it
+            if method == 'write_rich_string':
+                continue
+            args = tuple(args) + (None,) * (2 - len(args))
+            self.cells[(row_num, col_num)] = (method, args[:1] + (get_border_format(self.wb, args[1], sorted(sides)),) + args[2:])
+
+        # get the recorded columns of each row
+        row_cells = {}
+        for row_num, col_num in sorted(self.cells):
+            row_cells.setdefault(row_num, []).append(col_num)
+
+        # the format each merge was written with, so cells the merge already wrote blank are not written again
+        merge_formats = {}
+
+        # iterating over the rows in order:
+        for row_num in sorted(set(row_cells) | set(self.row_specs)):
+            if row_num in self.row_specs:
+                self.worksheet.set_row(row_num, *self.row_specs[row_num])
+            # iterating over the row's cells left to right:
+            for col_num in row_cells.get(row_num, []):
+                method, args = self.cells[(row_num, col_num)]
+                value = args[0] if len(args) > 0 else None
+                cell_format = args[1] if len(args) > 1 else None
+                # a merge is written at its first cell with the cell's last value and format
+                if (row_num, col_num) in self.merges:
+                    last_row, last_col = self.merges[(row_num, col_num)]
+                    self.worksheet.merge_range(row_num, col_num, last_row, last_col, value, cell_format)
+                    merge_formats[(row_num, col_num)] = cell_format
+                    continue
+                # skip the other cells of a merge that are still the blank the merge wrote
+                if (row_num, col_num) in self.merged_cells:
+                    merge_format = merge_formats[self.merged_cells[(row_num, col_num)]]
+                    if method in ['write', 'write_blank'] and value in [None, ''] and cell_format is merge_format:
+                        continue
+                getattr(self.worksheet, method)(row_num, col_num, *args)
+
+        self.cells = {}
+        self.merges = {}
+        self.merged_cells = {}
+        self.row_specs = {}
+        self.borders = {}
+        defer_column_specs(self)